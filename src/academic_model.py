@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Compact in-memory model for MGP academic records.
+
+The cached JSON is a dict of plain nested dicts per academic
+(person["MGP_academic"]["student_data"]["degrees"][i]["schools"]...).
+Academic and Degree use __slots__, intern repeated strings (schools,
+countries, degree types, names) and keep integer ID lists in arrays, so the
+full dataset takes a fraction of the memory. Thesis titles are kept as UTF-8
+bytes and only decoded when accessed.
+
+Tools opt in with load_academics(path). Only the fields above are kept:
+to_record() gives back an API-shaped dict of them, and anything else in the
+original record (e.g. extra fields the API adds later) is dropped.
+"""
+
+import sys
+from array import array
+
+import record_store
+
+_intern = sys.intern
+
+
+# -----------------------------------------------------------
+# Helpers for walking plain record dicts
+# -----------------------------------------------------------
+def iter_degrees(record):
+    """Yield the degree dicts of a raw record."""
+    mgp = record.get("MGP_academic") or {}
+    student = mgp.get("student_data") or {}
+    for degree in student.get("degrees") or []:
+        if isinstance(degree, dict):
+            yield degree
+
+
+def parse_year(value):
+    """Degree years come as strings like "1799" or "1999/2000"; return an int or None."""
+    text = str(value or "").strip()[:4]
+    return int(text) if text.isdigit() else None
+
+
+def degree_advisor_ids(degree):
+    """Advisor IDs of a degree ("advised by" is {"1": id, "2": id} or a list)."""
+    advisors = degree.get("advised by") or {}
+    if isinstance(advisors, dict):
+        advisors = [advisors[k] for k in sorted(advisors, key=lambda k: (len(k), k))]
+    ids = []
+    for advisor_id in advisors:
+        try:
+            advisor_id = int(advisor_id)
+        except (TypeError, ValueError):
+            continue
+        if advisor_id not in ids:
+            ids.append(advisor_id)
+    return ids
+
+
+def advisor_ids(record):
+    """All distinct advisor IDs over every degree of a raw record."""
+    ids = []
+    for degree in iter_degrees(record):
+        for advisor_id in degree_advisor_ids(degree):
+            if advisor_id not in ids:
+                ids.append(advisor_id)
+    return ids
+
+
+def _strings(value):
+    if isinstance(value, str):
+        value = [value]
+    return tuple(_intern(v) for v in (value or []) if isinstance(v, str) and v)
+
+
+# -----------------------------------------------------------
+# Compact record classes
+# -----------------------------------------------------------
+class Degree:
+    __slots__ = ("degree_type", "schools", "year", "countries", "advisor_ids", "_thesis")
+
+    def __init__(self, degree_type, schools, year, countries, advisor_ids, thesis=b""):
+        self.degree_type = degree_type
+        self.schools = schools
+        self.year = year
+        self.countries = countries
+        self.advisor_ids = advisor_ids
+        self._thesis = thesis
+
+    @property
+    def thesis_title(self):
+        return self._thesis.decode("utf-8")
+
+    @classmethod
+    def from_dict(cls, degree):
+        thesis = degree.get("thesis_title") or ""
+        return cls(
+            _intern(degree.get("degree_type") or ""),
+            _strings(degree.get("schools")),
+            parse_year(degree.get("degree_year")),
+            _strings(degree.get("country")),
+            array('i', degree_advisor_ids(degree)),
+            thesis.encode("utf-8"),
+        )
+
+    def to_dict(self):
+        return {
+            "degree_type": self.degree_type,
+            "schools": list(self.schools),
+            "degree_year": "" if self.year is None else str(self.year),
+            "country": list(self.countries),
+            "thesis_title": self.thesis_title,
+            "advised by": {str(i): a for i, a in enumerate(self.advisor_ids, 1)},
+        }
+
+    def __repr__(self):
+        return f"Degree({self.degree_type!r}, {self.schools!r}, {self.year!r})"
+
+
+class Academic:
+    __slots__ = ("id", "given_name", "other_names", "family_name", "msc",
+                 "degrees", "advisee_ids", "descendant_count")
+
+    def __init__(self, id, given_name, other_names, family_name, msc,
+                 degrees, advisee_ids, descendant_count):
+        self.id = id
+        self.given_name = given_name
+        self.other_names = other_names
+        self.family_name = family_name
+        self.msc = msc
+        self.degrees = degrees
+        self.advisee_ids = advisee_ids
+        self.descendant_count = descendant_count
+
+    @classmethod
+    def from_record(cls, record):
+        mgp = record.get("MGP_academic") or {}
+        descendants = (mgp.get("student_data") or {}).get("descendants") or {}
+        advisees = []
+        for advisee_id in descendants.get("advisees") or []:
+            try:
+                advisees.append(int(advisee_id))
+            except (TypeError, ValueError):
+                continue
+        return cls(
+            int(mgp["ID"]),
+            _intern(mgp.get("given_name") or ""),
+            _intern(mgp.get("other_names") or ""),
+            _intern(mgp.get("family_name") or ""),
+            _intern(str(mgp.get("MSC") or "")),
+            tuple(Degree.from_dict(d) for d in iter_degrees(record)),
+            array('i', advisees),
+            int(descendants.get("descendant_count") or 0),
+        )
+
+    def to_record(self):
+        """Rebuild the API-shaped dict for this academic (modelled fields only; lossy)."""
+        return {
+            "MGP_academic": {
+                "ID": self.id,
+                "given_name": self.given_name,
+                "other_names": self.other_names,
+                "family_name": self.family_name,
+                "MSC": self.msc,
+                "student_data": {
+                    "degrees": [d.to_dict() for d in self.degrees],
+                    "descendants": {
+                        "advisees": list(self.advisee_ids),
+                        "descendant_count": self.descendant_count,
+                    },
+                },
+            }
+        }
+
+    @property
+    def schools(self):
+        return [s for d in self.degrees for s in d.schools]
+
+    @property
+    def advisor_ids(self):
+        ids = []
+        for degree in self.degrees:
+            for advisor_id in degree.advisor_ids:
+                if advisor_id not in ids:
+                    ids.append(advisor_id)
+        return ids
+
+    @property
+    def year(self):
+        """Year of the first dated degree, or None."""
+        for degree in self.degrees:
+            if degree.year is not None:
+                return degree.year
+        return None
+
+    def __repr__(self):
+        return f"Academic({self.id}, {self.given_name!r} {self.family_name!r})"
+
+
+def load_academics(path):
+    """
+    Load a records file as {int ID: Academic}.
+
+    The file is streamed, so raw dicts never exist for more than one record
+    at a time. Records without MGP_academic.ID are skipped.
+    """
+    academics = {}
+    for _, record in record_store.iter_records(path):
+        try:
+            academic = Academic.from_record(record)
+        except (KeyError, TypeError, ValueError):
+            continue
+        academics[academic.id] = academic
+    return academics
+
+
+if __name__ == '__main__':
+    import os
+    import tracemalloc
+
+    path = sys.argv[1] if len(sys.argv) > 1 else "mgp_cache/all_academics_merged_complete.json"
+    print(f"Loading {os.path.basename(path)} as compact records...")
+    tracemalloc.start()
+    academics = load_academics(path)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"Loaded {len(academics):,} academics")
+    print(f"Memory in use: {current / (1024 * 1024):.1f} MB (peak {peak / (1024 * 1024):.1f} MB)")
@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+"""
+Degree counts by school, country and decade, precomputed with NumPy.
+
+A full school × country × decade array would be almost entirely zeros (a
+school sits in one country, occasionally two), so DegreeCube stores the
+non-empty (school, country) pairs as rows:
+
+    counts[row, d]     degrees awarded in decade first_decade + 10 * d
+    undated[row]       degrees without a usable year
+    row_school[row]    index into schools
+    row_country[row]   index into countries
+
+Slices (one school, one country, a decade range) and roll-ups (by country,
+by school, by decade) are masks and bincounts over a few thousand rows, so
+they take microseconds instead of a pass over every record's
+student_data.degrees.
+
+The cube also keeps which cells each academic contributed (CSR arrays keyed
+by sorted ID). apply() uses them to take out the old contribution of a
+changed or removed academic and add the new one, so a record_delta.Delta
+updates the cube without a rebuild.
+
+Usage:
+    python aggregate_cube.py build all_academics_merged_complete.json [degree_cube.npz]
+    python aggregate_cube.py update degree_cube.npz delta.json
+    python aggregate_cube.py query degree_cube.npz [country=Germany] [school=...] [from=1900] [to=1950]
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+import academic_model
+import profiling
+import record_delta
+import record_schema
+import record_store
+
+DECADE = 10
+
+
+def degree_cells(record):
+    """(school, country, decade or -1) for each school of each degree of a raw record."""
+    cells = []
+    for degree in academic_model.iter_degrees(record):
+        year = academic_model.parse_year(degree.get("degree_year"))
+        decade = -1 if year is None else year // DECADE * DECADE
+        schools = [record_schema.canonical_school(s) for s in degree.get("schools") or [] if isinstance(s, str)]
+        countries = degree.get("country") or []
+        if isinstance(countries, str):
+            countries = [countries]
+        countries = [c.strip() for c in countries if isinstance(c, str)]
+        if not schools:
+            schools = [""]
+        for i, school in enumerate(schools):
+            # country lists are parallel to schools; a single country covers them all
+            if len(countries) == len(schools):
+                country = countries[i]
+            else:
+                country = countries[0] if len(countries) == 1 else ""
+            cells.append((school or "", country, decade))
+    return cells
+
+
+class DegreeCube:
+    def __init__(self):
+        self.schools, self.countries = [], []
+        self.school_index, self.country_index, self.row_index = {}, {}, {}
+        self.row_school = np.zeros(0, dtype=np.int32)
+        self.row_country = np.zeros(0, dtype=np.int32)
+        self.first_decade = 0
+        self.counts = np.zeros((0, 0), dtype=np.int32)
+        self.undated = np.zeros(0, dtype=np.int32)
+        # Per-academic contributions: the cells of acad_ids[i] are
+        # (cell_rows, cell_decades)[acad_offsets[i]:acad_offsets[i + 1]]
+        self.acad_ids = np.zeros(0, dtype=np.int64)
+        self.acad_offsets = np.zeros(1, dtype=np.int64)
+        self.cell_rows = np.zeros(0, dtype=np.int32)
+        self.cell_decades = np.zeros(0, dtype=np.int16)
+
+    # -------------------------------------------------------
+    # Building and updating
+    # -------------------------------------------------------
+    def _row(self, school, country):
+        row = self.row_index.get((school, country))
+        if row is None:
+            if school not in self.school_index:
+                self.school_index[school] = len(self.schools)
+                self.schools.append(school)
+            if country not in self.country_index:
+                self.country_index[country] = len(self.countries)
+                self.countries.append(country)
+            row = self.row_index[(school, country)] = len(self.row_index)
+        return row
+
+    def _encode(self, items):
+        """(ids, offsets, rows, decades) arrays for (ID, record) pairs; new rows are registered."""
+        ids, offsets, rows, decades = [], [0], [], []
+        for key, record in items:
+            ids.append(int(key))
+            for school, country, decade in degree_cells(record):
+                rows.append(self._row(school, country))
+                decades.append(decade)
+            offsets.append(len(rows))
+        return (np.array(ids, dtype=np.int64), np.array(offsets, dtype=np.int64),
+                np.array(rows, dtype=np.int32), np.array(decades, dtype=np.int16))
+
+    def _fit(self, decades):
+        """Grow counts to the registered rows and to cover the given decades."""
+        n_rows = len(self.row_index)
+        dated = decades[decades >= 0]
+        first, n_decades = self.first_decade, self.counts.shape[1]
+        if len(dated):
+            lo, hi = int(dated.min()), int(dated.max())
+            if n_decades:
+                lo, hi = min(lo, first), max(hi, first + DECADE * (n_decades - 1))
+            first, n_decades = lo, (hi - lo) // DECADE + 1
+        counts = np.zeros((n_rows, n_decades), dtype=np.int32)
+        shift = (self.first_decade - first) // DECADE
+        old_rows, old_decades = self.counts.shape
+        counts[:old_rows, shift:shift + old_decades] = self.counts
+        self.counts, self.first_decade = counts, first
+        self.undated = np.concatenate([self.undated, np.zeros(n_rows - len(self.undated), dtype=np.int32)])
+        self.row_school = np.array([self.school_index[s] for s, _ in self.row_index], dtype=np.int32)
+        self.row_country = np.array([self.country_index[c] for _, c in self.row_index], dtype=np.int32)
+
+    def _add_cells(self, rows, decades, sign):
+        dated = decades >= 0
+        cols = (decades[dated].astype(np.int64) - self.first_decade) // DECADE
+        np.add.at(self.counts, (rows[dated], cols), sign)
+        np.add.at(self.undated, rows[~dated], sign)
+
+    @classmethod
+    def build(cls, items):
+        """Cube over (ID, record) pairs, e.g. record_store.iter_records(path)."""
+        cube = cls()
+        ids, offsets, rows, decades = cube._encode(items)
+        cube._fit(decades)
+        cube._add_cells(rows, decades, 1)
+        order = np.argsort(ids, kind="stable")
+        cube._set_contributions(ids, offsets, rows, decades, order)
+        return cube
+
+    def _set_contributions(self, ids, offsets, rows, decades, order):
+        """Store contributions, reordered so acad_ids is sorted."""
+        lengths = np.diff(offsets)[order]
+        take = np.repeat(offsets[:-1][order] - np.concatenate([[0], np.cumsum(lengths)[:-1]]), lengths) \
+            + np.arange(lengths.sum())
+        self.acad_ids = ids[order]
+        self.acad_offsets = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+        self.cell_rows = rows[take]
+        self.cell_decades = decades[take]
+
+    def _positions(self, ids):
+        """Positions in acad_ids of those ids that are present."""
+        ids = np.asarray(sorted(ids), dtype=np.int64)
+        pos = np.searchsorted(self.acad_ids, ids)
+        found = pos < len(self.acad_ids)
+        found[found] = self.acad_ids[pos[found]] == ids[found]
+        return pos[found]
+
+    def apply(self, delta):
+        """Apply a record_delta.Delta in place."""
+        upserts = delta.upserts
+        # Take out the current contribution of every academic being replaced or removed
+        drop = self._positions([int(k) for k in upserts] + [int(k) for k in delta.removed])
+        lengths = np.diff(self.acad_offsets)
+        cell_mask = np.repeat(np.isin(np.arange(len(self.acad_ids)), drop), lengths)
+        self._add_cells(self.cell_rows[cell_mask], self.cell_decades[cell_mask], -1)
+
+        # Add the new versions
+        ids, offsets, rows, decades = self._encode(upserts.items())
+        self._fit(decades)
+        self._add_cells(rows, decades, 1)
+
+        keep = np.ones(len(self.acad_ids), dtype=bool)
+        keep[drop] = False
+        kept_lengths = lengths[keep]
+        all_ids = np.concatenate([self.acad_ids[keep], ids])
+        all_offsets = np.concatenate([[0], np.cumsum(np.concatenate([kept_lengths, np.diff(offsets)]))])
+        all_rows = np.concatenate([self.cell_rows[~cell_mask], rows])
+        all_decades = np.concatenate([self.cell_decades[~cell_mask], decades])
+        self._set_contributions(all_ids, all_offsets.astype(np.int64), all_rows, all_decades,
+                                np.argsort(all_ids, kind="stable"))
+
+    # -------------------------------------------------------
+    # Queries
+    # -------------------------------------------------------
+    @property
+    def decades(self):
+        return self.first_decade + DECADE * np.arange(self.counts.shape[1])
+
+    def _mask(self, school=None, country=None):
+        mask = np.ones(len(self.row_school), dtype=bool)
+        if school is not None:
+            mask &= self.row_school == self.school_index.get(record_schema.canonical_school(school) or "", -1)
+        if country is not None:
+            mask &= self.row_country == self.country_index.get(country, -1)
+        return mask
+
+    def _columns(self, decade_from=None, decade_to=None):
+        decades = self.decades
+        lo = 0 if decade_from is None else int(np.searchsorted(decades, decade_from // DECADE * DECADE))
+        hi = len(decades) if decade_to is None else int(np.searchsorted(decades, decade_to, side="right"))
+        return slice(lo, hi)
+
+    def by_decade(self, school=None, country=None, decade_from=None, decade_to=None):
+        """{decade: degrees} for an optional school and/or country."""
+        cols = self._columns(decade_from, decade_to)
+        totals = self.counts[self._mask(school, country), cols].sum(axis=0)
+        return {int(d): int(n) for d, n in zip(self.decades[cols], totals) if n}
+
+    def _roll_up(self, groups, names, school, country, decade_from, decade_to, include_undated):
+        cols = self._columns(decade_from, decade_to)
+        per_row = self.counts[:, cols].sum(axis=1)
+        if include_undated:
+            per_row = per_row + self.undated
+        per_row = np.where(self._mask(school, country), per_row, 0)
+        totals = np.bincount(groups, weights=per_row, minlength=len(names)).astype(np.int64)
+        order = np.argsort(-totals, kind="stable")
+        return {names[i]: int(totals[i]) for i in order if totals[i]}
+
+    def by_country(self, school=None, decade_from=None, decade_to=None, include_undated=None):
+        """{country: degrees}, largest first. Undated degrees count unless a decade range is given."""
+        if include_undated is None:
+            include_undated = decade_from is None and decade_to is None
+        return self._roll_up(self.row_country, self.countries, school, None, decade_from, decade_to,
+                             include_undated)
+
+    def by_school(self, country=None, decade_from=None, decade_to=None, include_undated=None):
+        """{school: degrees}, largest first. Undated degrees count unless a decade range is given."""
+        if include_undated is None:
+            include_undated = decade_from is None and decade_to is None
+        return self._roll_up(self.row_school, self.schools, None, country, decade_from, decade_to,
+                             include_undated)
+
+    def total(self):
+        return int(self.counts.sum() + self.undated.sum())
+
+    # -------------------------------------------------------
+    # Persistence
+    # -------------------------------------------------------
+    def save(self, path):
+        np.savez_compressed(
+            path,
+            schools=np.array(self.schools, dtype=str), countries=np.array(self.countries, dtype=str),
+            row_school=self.row_school, row_country=self.row_country,
+            first_decade=np.array(self.first_decade), counts=self.counts, undated=self.undated,
+            acad_ids=self.acad_ids, acad_offsets=self.acad_offsets,
+            cell_rows=self.cell_rows, cell_decades=self.cell_decades)
+
+    @classmethod
+    def load(cls, path):
+        cube = cls()
+        with np.load(path, allow_pickle=False) as z:
+            cube.schools, cube.countries = z["schools"].tolist(), z["countries"].tolist()
+            cube.row_school, cube.row_country = z["row_school"], z["row_country"]
+            cube.first_decade = int(z["first_decade"])
+            cube.counts, cube.undated = z["counts"], z["undated"]
+            cube.acad_ids, cube.acad_offsets = z["acad_ids"], z["acad_offsets"]
+            cube.cell_rows, cube.cell_decades = z["cell_rows"], z["cell_decades"]
+        cube.school_index = {s: i for i, s in enumerate(cube.schools)}
+        cube.country_index = {c: i for i, c in enumerate(cube.countries)}
+        cube.row_index = {(cube.schools[s], cube.countries[c]): r
+                          for r, (s, c) in enumerate(zip(cube.row_school.tolist(), cube.row_country.tolist()))}
+        return cube
+
+
+def build_cube(records_file, output_file="degree_cube.npz"):
+    print(f"Scanning {os.path.basename(records_file)}...")
+    start = time.perf_counter()
+    with profiling.stage("build"):
+        cube = DegreeCube.build(record_store.iter_records(records_file))
+    with profiling.stage("dump"):
+        cube.save(output_file)
+    print(f"✓ {cube.total():,} degrees of {len(cube.acad_ids):,} academics: {len(cube.schools):,} schools, "
+          f"{len(cube.countries):,} countries, {cube.counts.shape[1]} decades in {time.perf_counter() - start:.1f}s")
+    print(f"Saved to {output_file} ({os.path.getsize(output_file) / 1024:.0f} KB)")
+    return cube
+
+
+def update_cube(cube_file, delta_file):
+    with profiling.stage("load"):
+        cube = DegreeCube.load(cube_file)
+        delta = record_delta.Delta.load(delta_file)
+    start = time.perf_counter()
+    with profiling.stage("update"):
+        cube.apply(delta)
+    with profiling.stage("dump"):
+        cube.save(cube_file)
+    print(f"✓ Applied {delta.summary()} in {time.perf_counter() - start:.2f}s; "
+          f"{cube.total():,} degrees of {len(cube.acad_ids):,} academics")
+    return cube
+
+
+if __name__ == '__main__':
+    profiling.from_argv("aggregate_cube")
+    if len(sys.argv) >= 3 and sys.argv[1] == "build":
+        build_cube(sys.argv[2], sys.argv[3] if len(sys.argv) > 3 else "degree_cube.npz")
+    elif len(sys.argv) >= 4 and sys.argv[1] == "update":
+        update_cube(sys.argv[2], sys.argv[3])
+    elif len(sys.argv) >= 3 and sys.argv[1] == "query":
+        cube = DegreeCube.load(sys.argv[2])
+        args = dict(arg.split("=", 1) for arg in sys.argv[3:])
+        decade_from = int(args["from"]) if "from" in args else None
+        decade_to = int(args["to"]) if "to" in args else None
+        school, country = args.get("school"), args.get("country")
+        print("By decade: " + ", ".join(f"{d}s {n:,}" for d, n in
+                                         cube.by_decade(school, country, decade_from, decade_to).items()))
+        if school is None:
+            top = list(cube.by_school(country, decade_from, decade_to).items())[:10]
+            print("Top schools: " + ", ".join(f"{s or '(none)'} ({n:,})" for s, n in top))
+        if country is None:
+            top = list(cube.by_country(school, decade_from, decade_to).items())[:10]
+            print("Top countries: " + ", ".join(f"{c or '(none)'} ({n:,})" for c, n in top))
+    else:
+        print(__doc__)
+        sys.exit(1)
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Repeatable benchmarks for the src/ tools, run against synthetic data and
+the local MGP stub server (no network, no multi-GB dataset needed).
+
+Each benchmark reports the best wall time over a few runs and the peak
+traced memory of one extra run under tracemalloc.
+
+Usage: python benchmark.py [n_records]
+"""
+
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import synthetic_data
+import mgp_stub_server
+
+
+def measure(run, setup=None, repeat=3):
+    """
+    Time run() `repeat` times (best wall time), then once more under
+    tracemalloc for the peak. setup() is called before every run, untimed,
+    and its return value is passed to run().
+    """
+    times = []
+    for _ in range(repeat):
+        arg = setup() if setup else None
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            run(arg) if setup else run()
+            times.append(time.perf_counter() - start)
+
+    arg = setup() if setup else None
+    tracemalloc.start()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            run(arg) if setup else run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "best_s": min(times),
+        "mean_s": sum(times) / len(times),
+        "peak_mb": peak / (1024 * 1024),
+    }
+
+
+def bench_harvest(data, workdir, n_ids=2000, latency=0.002, error_rate=0.0):
+    """cache_all_academics over n_ids IDs against the stub server."""
+    import cache_mgp
+
+    server = mgp_stub_server.start_server(data, latency=latency, error_rate=error_rate)
+    host, port = server.server_address
+    saved = (cache_mgp.PROTOCOL, cache_mgp.HOSTNAME, cache_mgp.PORT, cache_mgp.TOKEN)
+    cache_mgp.PROTOCOL, cache_mgp.HOSTNAME, cache_mgp.PORT = "http", host, str(port)
+    cache_mgp.TOKEN = mgp_stub_server.STUB_TOKEN
+
+    output_dir = os.path.join(workdir, "harvest")
+
+    def setup():
+        shutil.rmtree(output_dir, ignore_errors=True)
+
+    def run(_):
+        cache_mgp.cache_all_academics(start_id=1, max_id=n_ids, batch_size=10,
+                                      output_dir=output_dir, rate_limit=0)
+
+    try:
+        result = measure(run, setup, repeat=1)
+    finally:
+        cache_mgp.PROTOCOL, cache_mgp.HOSTNAME, cache_mgp.PORT, cache_mgp.TOKEN = saved
+        server.shutdown()
+        server.server_close()
+
+    result["requests"] = server.request_count
+    return result
+
+
+def bench_merge(data, workdir):
+    """merge_checkpoints over overlapping checkpoint files."""
+    import merge_checkpoints
+
+    cache_dir = os.path.join(workdir, "merge")
+    synthetic_data.write_checkpoints(data, cache_dir, batch_ids=max(1000, len(data) // 10))
+    return measure(lambda: merge_checkpoints.merge_checkpoints(cache_dir=cache_dir))
+
+
+def bench_gaps(merged_file):
+    """check_missing_ids on a merged file."""
+    import check_backup_gaps
+
+    return measure(lambda: check_backup_gaps.check_missing_ids(merged_file))
+
+
+def bench_reorder(data, workdir):
+    """reorder_json_by_id on a shuffled copy of the dataset."""
+    import reorder_json
+
+    path = os.path.join(workdir, "shuffled.json")
+    keys = list(data.keys())
+    random.Random(0).shuffle(keys)
+
+    def setup():
+        with open(path, 'w') as f:
+            json.dump({k: data[k] for k in keys}, f, indent=2)
+
+    return measure(lambda _: reorder_json.reorder_json_by_id(path), setup)
+
+
+def bench_geocode_extract(merged_file):
+    """load_data + extract_universities (no geocoding requests)."""
+    import geocode_uni
+
+    def run():
+        geocode_uni.extract_universities(geocode_uni.load_data(merged_file))
+
+    return measure(run)
+
+
+def run_benchmarks(n_records=20000, seed=0, output_file="bench_results.json"):
+    """
+    Generate a synthetic dataset and run every benchmark on it.
+    Results are printed and written to output_file as JSON.
+    """
+    print(f"Generating {n_records:,} synthetic academics (seed {seed})...")
+    data = synthetic_data.generate_dataset(n_records=n_records, seed=seed)
+
+    workdir = tempfile.mkdtemp(prefix="mgp_bench_")
+    merged_file = os.path.join(workdir, "all_academics_merged.json")
+    with open(merged_file, 'w') as f:
+        json.dump(data, f, indent=2)
+    print(f"Working directory: {workdir}")
+    print(f"Dataset file size: {os.path.getsize(merged_file) / (1024 * 1024):.2f} MB\n")
+
+    benchmarks = [
+        ("harvest", lambda: bench_harvest(data, workdir)),
+        ("merge", lambda: bench_merge(data, workdir)),
+        ("gap_analysis", lambda: bench_gaps(merged_file)),
+        ("reorder", lambda: bench_reorder(data, workdir)),
+        ("geocode_extract", lambda: bench_geocode_extract(merged_file)),
+    ]
+
+    results = {}
+    try:
+        for name, bench in benchmarks:
+            print(f"Running {name}...", end=" ", flush=True)
+            try:
+                results[name] = bench()
+            except ImportError as e:
+                results[name] = {"skipped": str(e)}
+                print(f"skipped ({e})")
+                continue
+            r = results[name]
+            print(f"{r['best_s']:.3f}s best, {r['peak_mb']:.1f} MB peak")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "n_records": n_records,
+        "seed": seed,
+        "python": platform.python_version(),
+        "timestamp": time.strftime('%Y-%m-%d %H:%M:%S'),
+        "results": results,
+    }
+    with open(output_file, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults saved to: {output_file}")
+    return report
+
+
+if __name__ == '__main__':
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    run_benchmarks(n_records=n, seed=0)
@@ -3,6 +3,47 @@
 import json
 import os
 
+import profiling
+import record_store
+import sqlite_store
+
+def group_gaps(missing_ids):
+    """Group sorted missing IDs into (start, end) ranges of consecutive IDs."""
+    gaps = []
+    if missing_ids:
+        gap_start = missing_ids[0]
+        gap_end = missing_ids[0]
+        
+        for i in range(1, len(missing_ids)):
+            if missing_ids[i] == gap_end + 1:
+                # Consecutive, extend the gap
+                gap_end = missing_ids[i]
+            else:
+                # Gap ended, save it
+                gaps.append((gap_start, gap_end))
+                gap_start = missing_ids[i]
+                gap_end = missing_ids[i]
+        
+        # Don't forget the last gap
+        gaps.append((gap_start, gap_end))
+    return gaps
+
+def save_missing_report(output_file, missing_ids, gaps):
+    """Write the <file>_missing_ids.json report."""
+    with open(output_file, 'w') as f:
+        json.dump({
+            "total_missing": len(missing_ids),
+            "gaps": [
+                {
+                    "start": gap_start,
+                    "end": gap_end,
+                    "size": gap_end - gap_start + 1
+                }
+                for gap_start, gap_end in gaps
+            ],
+            "missing_ids": missing_ids
+        }, f, indent=2)
+
 def check_missing_ids(backup_file="mgp_cache/all_academics_merged.json"):
     """
     Check how many IDs are missing in the backup file.
@@ -13,53 +54,47 @@ def check_missing_ids(backup_file="mgp_cache/all_academics_merged.json"):
         print(f"File not found: {backup_file}")
         return
     
-    # Load the data
-    print("Loading file:")
-    with open(backup_file, 'r') as f:
-        data = json.load(f)
-    
-    print(f"Loaded {len(data):,} academics\n")
-    
-    # Get all IDs
-    existing_ids = sorted([int(id) for id in data.keys()])
+    if record_store.is_sqlite(backup_file):
+        # Coverage and gaps come straight from the ID index
+        min_id, max_id, present = sqlite_store.coverage(backup_file)
+        print(f"Indexed database with {present:,} academics\n")
+        missing_ids = [i for start, end in sqlite_store.gap_ranges(backup_file)
+                       for i in range(start, end + 1)]
+    else:
+        # Load the data
+        print("Loading file:")
+        with profiling.stage("load"):
+            data = record_store.load_records(backup_file)
+        
+        print(f"Loaded {len(data):,} academics\n")
+        
+        # Get all IDs
+        existing_ids = sorted([int(id) for id in data.keys()])
+        
+        min_id = existing_ids[0]
+        max_id = existing_ids[-1]
+        present = len(existing_ids)
+        
+        # Find all missing IDs
+        with profiling.stage("analyse"):
+            all_possible_ids = set(range(min_id, max_id + 1))
+            existing_id_set = set(existing_ids)
+            missing_ids = sorted(all_possible_ids - existing_id_set)
     
-    min_id = existing_ids[0]
-    max_id = existing_ids[-1]
     total_range = max_id - min_id + 1
     
     print(f"ID Range: {min_id:,} to {max_id:,}")
     print(f"Total possible IDs in range: {total_range:,}")
-    print(f"IDs present: {len(existing_ids):,}")
-    print(f"IDs missing: {total_range - len(existing_ids):,}")
-    print(f"Coverage: {100 * len(existing_ids) / total_range:.2f}%")
-    
-    # Find all missing IDs
-    all_possible_ids = set(range(min_id, max_id + 1))
-    existing_id_set = set(existing_ids)
-    missing_ids = sorted(all_possible_ids - existing_id_set)
+    print(f"IDs present: {present:,}")
+    print(f"IDs missing: {total_range - present:,}")
+    print(f"Coverage: {100 * present / total_range:.2f}%")
     
     if missing_ids:
         print(f"Missing IDs")
         print(f"Total missing: {len(missing_ids):,}\n")
         
         # Group consecutive missing IDs into ranges
-        gaps = []
-        if missing_ids:
-            gap_start = missing_ids[0]
-            gap_end = missing_ids[0]
-            
-            for i in range(1, len(missing_ids)):
-                if missing_ids[i] == gap_end + 1:
-                    # Consecutive, extend the gap
-                    gap_end = missing_ids[i]
-                else:
-                    # Gap ended, save it
-                    gaps.append((gap_start, gap_end))
-                    gap_start = missing_ids[i]
-                    gap_end = missing_ids[i]
-            
-            # Don't forget the last gap
-            gaps.append((gap_start, gap_end))
+        gaps = group_gaps(missing_ids)
         
         print(f"Number of gaps: {len(gaps)}\n")
         
@@ -83,20 +118,9 @@ def check_missing_ids(backup_file="mgp_cache/all_academics_merged.json"):
             print(f"  ... and {len(gaps)-30} more gaps")
         
         # Save missing IDs to file
-        output_file = backup_file.replace('.json', '_missing_ids.json')
-        with open(output_file, 'w') as f:
-            json.dump({
-                "total_missing": len(missing_ids),
-                "gaps": [
-                    {
-                        "start": gap_start,
-                        "end": gap_end,
-                        "size": gap_end - gap_start + 1
-                    }
-                    for gap_start, gap_end in gaps
-                ],
-                "missing_ids": missing_ids
-            }, f, indent=2)
+        output_file = record_store.base_name(backup_file) + '_missing_ids.json'
+        with profiling.stage("dump"):
+            save_missing_report(output_file, missing_ids, gaps)
         
         print(f"Detailed missing IDs saved to: {os.path.basename(output_file)}")
         
@@ -116,4 +140,5 @@ def check_missing_ids(backup_file="mgp_cache/all_academics_merged.json"):
     print(f"\nFile size: {file_size:.2f} MB")
 
 if __name__ == '__main__':
+    profiling.from_argv("check_backup_gaps")
     check_missing_ids("mgp_cache/all_academics_merged.json")
\ No newline at end of file
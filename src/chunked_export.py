@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Chunked, content-hashed JS/JSON bundles for the front end.
+
+ChunkedExport takes (key, value) pairs in key order and writes them, minified,
+as a series of chunk files of at most max_bytes each, plus a manifest:
+
+    <name>-<hash>.js       export default {"key":value,...};   (or .json)
+    <name>.manifest.json   {"chunks": [{"file", "first", "last", "count", "bytes"}], ...}
+
+Only one chunk is held in memory at a time. The front end reads the manifest,
+binary-searches first/last for the ID or school it needs and import()s or
+fetches just that chunk.
+
+File names carry a hash of the content, so a chunk whose content did not
+change keeps its file (and stays cached in browsers) and is not rewritten.
+Chunk boundaries are content-defined: once a chunk has min_bytes, it ends
+after the first key whose hash has its low bits clear (or when max_bytes is
+reached). An added or changed record therefore only alters its own chunk
+and perhaps the next one, not every chunk after it as fixed-size splitting
+would. Chunks no longer in the manifest are deleted.
+
+Usage: python chunked_export.py all_academics_merged_complete.json [bundles] [js|json]
+"""
+
+import glob
+import hashlib
+import json
+import os
+import sys
+
+import academic_model
+import profiling
+import record_schema
+import record_store
+
+CHUNK_BYTES = 256 * 1024
+BOUNDARY_BITS = 5          # after min_bytes, about one key in 32 ends a chunk
+
+
+def _minify(value):
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+def _is_boundary(key):
+    digest = hashlib.blake2b(str(key).encode("utf-8"), digest_size=4).digest()
+    return int.from_bytes(digest, "little") & ((1 << BOUNDARY_BITS) - 1) == 0
+
+
+class ChunkedExport:
+    def __init__(self, output_dir, name, fmt="js", max_bytes=CHUNK_BYTES, min_bytes=None):
+        if fmt not in ("js", "json"):
+            raise ValueError(f"unknown format {fmt!r}")
+        self.output_dir = output_dir
+        self.name = name
+        self.fmt = fmt
+        self.max_bytes = max_bytes
+        self.min_bytes = max_bytes // 2 if min_bytes is None else min_bytes
+        self.chunks = []
+        self.written = 0
+        self._entries = []
+        self._bytes = 0
+        self._first = self._last = None
+        os.makedirs(output_dir, exist_ok=True)
+
+    def add(self, key, value):
+        """Add one entry; keys must come in increasing order."""
+        if self._last is not None and key <= self._last:
+            raise ValueError(f"keys out of order: {key!r} after {self._last!r}")
+        entry = f"{_minify(str(key))}:{_minify(value)}"
+        size = len(entry.encode("utf-8")) + 1
+        if self._entries and self._bytes + size > self.max_bytes:
+            self._flush()
+        if not self._entries:
+            self._first = key
+        self._entries.append(entry)
+        self._bytes += size
+        self._last = key
+        if self._bytes >= self.min_bytes and _is_boundary(key):
+            self._flush()
+
+    def _flush(self):
+        if not self._entries:
+            return
+        body = "{" + ",".join(self._entries) + "}"
+        if self.fmt == "js":
+            body = f"export default {body};\n"
+        data = body.encode("utf-8")
+        digest = hashlib.blake2b(data, digest_size=8).hexdigest()
+        file_name = f"{self.name}-{digest}.{self.fmt}"
+        path = os.path.join(self.output_dir, file_name)
+        if not os.path.exists(path):
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+            self.written += 1
+        self.chunks.append({"file": file_name, "first": self._first, "last": self._last,
+                            "count": len(self._entries), "bytes": len(data)})
+        self._entries, self._bytes = [], 0
+
+    def close(self, **extra):
+        """Write the last chunk and the manifest, delete stale chunks; returns the manifest."""
+        self._flush()
+        manifest = {"name": self.name, "format": self.fmt,
+                    "total": sum(c["count"] for c in self.chunks),
+                    "bytes": sum(c["bytes"] for c in self.chunks),
+                    "chunks": self.chunks, **extra}
+        manifest_path = os.path.join(self.output_dir, f"{self.name}.manifest.json")
+        text = _minify(manifest)
+        old = None
+        if os.path.exists(manifest_path):
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                old = f.read()
+        if text != old:
+            with open(manifest_path, "w", encoding="utf-8") as f:
+                f.write(text)
+
+        current = {c["file"] for c in self.chunks}
+        for path in glob.glob(os.path.join(self.output_dir, f"{glob.escape(self.name)}-*.{self.fmt}")):
+            if os.path.basename(path) not in current:
+                os.remove(path)
+
+        print(f"✓ {self.name}: {manifest['total']:,} entries in {len(self.chunks)} chunks "
+              f"({manifest['bytes'] / 1024:.0f} KB), {self.written} written, "
+              f"{len(self.chunks) - self.written} unchanged")
+        return manifest
+
+
+def export_mapping(mapping, output_dir, name, fmt="js", **kwargs):
+    """Export a {key: value} dict, in key order."""
+    export = ChunkedExport(output_dir, name, fmt, **kwargs)
+    for key in sorted(mapping):
+        export.add(key, mapping[key])
+    return export.close(key="name")
+
+
+def slim_record(record):
+    """The fields the visualisation uses, with short keys."""
+    mgp = record["MGP_academic"]
+    degrees = list(academic_model.iter_degrees(record))
+    name = " ".join(p for p in (mgp.get("given_name"), mgp.get("other_names"), mgp.get("family_name")) if p)
+    schools, advisors, year = [], [], None
+    for degree in degrees:
+        if year is None:
+            year = academic_model.parse_year(degree.get("degree_year"))
+        for school in degree.get("schools") or []:
+            school = record_schema.canonical_school(school or "")
+            if school and school not in schools:
+                schools.append(school)
+        for advisor_id in academic_model.degree_advisor_ids(degree):
+            if advisor_id not in advisors:
+                advisors.append(advisor_id)
+    return {"n": name, "y": year, "s": schools, "a": advisors}
+
+
+def export_academics(records_file, output_dir="bundles", fmt="js", **kwargs):
+    """
+    Write academics-<hash> chunks keyed by ID (lazy loading by ID range) and
+    schools-<hash> chunks mapping each school to its academic IDs (by school).
+    Only the slim records are kept in memory, never the full dataset.
+    """
+    print(f"Scanning {os.path.basename(records_file)}...")
+    slim = []
+    by_school = {}
+    with profiling.stage("extract"):
+        for key, record in record_store.iter_records(records_file):
+            try:
+                entry = slim_record(record)
+            except (KeyError, TypeError, ValueError):
+                continue
+            slim.append((int(key), entry))
+            for school in entry["s"]:
+                by_school.setdefault(school, []).append(int(key))
+        slim.sort(key=lambda item: item[0])
+
+    with profiling.stage("dump"):
+        academics = ChunkedExport(output_dir, "academics", fmt, **kwargs)
+        for acad_id, entry in slim:
+            academics.add(acad_id, entry)
+        academics.close(key="id")
+
+        schools = ChunkedExport(output_dir, "schools", fmt, **kwargs)
+        for school in sorted(by_school):
+            schools.add(school, sorted(by_school[school]))
+        schools.close(key="name")
+
+
+if __name__ == '__main__':
+    profiling.from_argv("chunked_export")
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    export_academics(sys.argv[1],
+                     sys.argv[2] if len(sys.argv) > 2 else "bundles",
+                     sys.argv[3] if len(sys.argv) > 3 else "js")
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Convert records files to zstd-compressed segments (.json.zst) and report
+the compression ratio and read throughput against the original JSON.
+
+Usage: python compress_store.py mgp_cache/all_academics_merged_complete.json [...]
+"""
+
+import os
+import sys
+import time
+
+import record_store
+
+
+def _read_throughput(path, size_mb):
+    """MB/s (of uncompressed JSON) for a full load and for a streamed scan."""
+    start = time.perf_counter()
+    data = record_store.load_records(path)
+    load_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    count = sum(1 for _ in record_store.iter_records(path))
+    stream_s = time.perf_counter() - start
+
+    return data, count, size_mb / load_s, size_mb / stream_s
+
+
+def compress_file(json_file, train=True):
+    """
+    Write json_file as json_file + ".zst" (with a trained dictionary) and
+    compare sizes and read speeds. The original file is left untouched.
+    """
+    zst_file = json_file + ".zst"
+    print(f"\n=== {os.path.basename(json_file)} ===")
+
+    json_mb = os.path.getsize(json_file) / (1024 * 1024)
+    data, count, json_load, json_stream = _read_throughput(json_file, json_mb)
+    print(f"  Records: {count:,}")
+
+    start = time.perf_counter()
+    record_store.write_records(data, zst_file, train=train)
+    write_s = time.perf_counter() - start
+
+    zst_mb = os.path.getsize(zst_file) / (1024 * 1024)
+    dict_file = record_store.dictionary_path(zst_file)
+    dict_mb = os.path.getsize(dict_file) / (1024 * 1024) if os.path.exists(dict_file) else 0.0
+
+    check, zst_count, zst_load, zst_stream = _read_throughput(zst_file, json_mb)
+    if check != data or zst_count != count:
+        raise RuntimeError(f"{zst_file} does not round-trip!")
+
+    print(f"  JSON size:       {json_mb:.2f} MB")
+    print(f"  Compressed size: {zst_mb:.2f} MB (+ {dict_mb * 1024:.0f} KB dictionary) "
+          f"in {write_s:.1f}s")
+    print(f"  Ratio:           {json_mb / (zst_mb + dict_mb):.1f}x")
+    print(f"  Full load:       {json_load:.0f} MB/s JSON vs {zst_load:.0f} MB/s zstd "
+          f"({100 * (zst_load / json_load - 1):+.0f}%)")
+    print(f"  Streamed scan:   {json_stream:.0f} MB/s JSON vs {zst_stream:.0f} MB/s zstd "
+          f"({100 * (zst_stream / json_stream - 1):+.0f}%)")
+
+    return {
+        "records": count,
+        "json_mb": json_mb,
+        "zst_mb": zst_mb,
+        "dict_mb": dict_mb,
+        "ratio": json_mb / (zst_mb + dict_mb),
+        "json_load_mb_s": json_load,
+        "zst_load_mb_s": zst_load,
+        "json_stream_mb_s": json_stream,
+        "zst_stream_mb_s": zst_stream,
+    }
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print("Usage: python compress_store.py file.json [file.json ...]")
+        sys.exit(1)
+    for path in sys.argv[1:]:
+        compress_file(path)
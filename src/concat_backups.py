@@ -1,9 +1,18 @@
 #!/usr/bin/env python3
 
-import json
 import os
 import glob
 
+import profiling
+import record_store
+
+def find_backup_files(cache_dir="mgp_cache"):
+    """all_academics_merged_backup* files (.json or .json.zst), sorted by name."""
+    backup_pattern = os.path.join(cache_dir, "all_academics_merged_backup*.json*")
+    # Filter out .zip files and only keep .json / .json.zst
+    return [f for f in sorted(glob.glob(backup_pattern))
+            if f.endswith('.json') or f.endswith('.json.zst')]
+
 def concat_all_backups(cache_dir="mgp_cache", output_file="all_academics_merged_complete.json"):
     """
     Concatenate all backup files (backup1, backup2, backup3, etc.) into one file.
@@ -13,11 +22,7 @@ def concat_all_backups(cache_dir="mgp_cache", output_file="all_academics_merged_
     print(f"\n=== Concatenating All Backup Files ===\n")
     
     # Find all backup files
-    backup_pattern = os.path.join(cache_dir, "all_academics_merged_backup*.json")
-    backup_files = sorted(glob.glob(backup_pattern))
-    
-    # Filter out .zip files and only keep .json
-    backup_files = [f for f in backup_files if f.endswith('.json')]
+    backup_files = find_backup_files(cache_dir)
     
     if not backup_files:
         print("❌ No backup files found!")
@@ -35,11 +40,12 @@ def concat_all_backups(cache_dir="mgp_cache", output_file="all_academics_merged_
         print(f"Loading {os.path.basename(backup_file)}...", end=" ")
         
         try:
-            with open(backup_file, 'r') as f:
-                backup_data = json.load(f)
+            with profiling.stage("load"):
+                backup_data = record_store.load_records(backup_file)
             
             before_count = len(all_data)
-            all_data.update(backup_data)
+            with profiling.stage("merge"):
+                all_data.update(backup_data)
             new_count = len(all_data) - before_count
             duplicate_count = len(backup_data) - new_count
             
@@ -59,8 +65,8 @@ def concat_all_backups(cache_dir="mgp_cache", output_file="all_academics_merged_
     output_path = os.path.join(cache_dir, output_file)
     print(f"Saving combined file to {output_file}...")
     
-    with open(output_path, 'w') as f:
-        json.dump(all_data, f, indent=2)
+    with profiling.stage("dump"):
+        record_store.write_records(all_data, output_path)
     
     file_size = os.path.getsize(output_path) / (1024 * 1024)
     
@@ -98,6 +104,7 @@ def concat_all_backups(cache_dir="mgp_cache", output_file="all_academics_merged_
     print(f"\n✓ All backups combined into: {output_file}")
 
 if __name__ == '__main__':
+    profiling.from_argv("concat_backups")
     concat_all_backups(
         cache_dir="mgp_cache",
         output_file="all_academics_merged_complete.json"
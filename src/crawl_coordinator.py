@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+Sharded crawl of the MGP ID space with leases stored in a SQLite file.
+
+The ID range is split into leases (e.g. 1000 IDs each). Worker processes
+claim a lease, fetch it in /acad/range batches, heartbeat while working and
+mark it done; a lease whose worker stops heartbeating expires and is
+reclaimed by another worker. All workers draw from one token bucket in the
+same file, so the combined request rate stays within a global budget.
+
+Each finished lease is written as checkpoint_lease_<start>_<stop>.json in the
+output directory, which merge_checkpoints.py picks up like any checkpoint.
+Per-lease state replaces the single cache_progress.json resume point, so
+several processes (or machines sharing the file) can crawl in parallel.
+
+Usage:
+    python crawl_coordinator.py init crawl.sqlite 1 350000
+    python crawl_coordinator.py run crawl.sqlite 4
+    python crawl_coordinator.py status crawl.sqlite
+
+Add --no-wal to every command when the file is shared over a network
+filesystem; it switches the database back to a rollback journal.
+"""
+
+import multiprocessing
+import os
+import socket
+import sqlite3
+import sys
+import time
+
+import cache_mgp
+import profiling
+import record_schema
+import record_store
+import retry_policy
+
+LEASE_SIZE = 1000
+LEASE_TTL = 120          # seconds without heartbeat before a lease is reclaimed
+MAX_ATTEMPTS = 5
+RATE_PER_SECOND = 1.0    # combined across all workers
+BURST = 2.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS leases (
+    start INTEGER PRIMARY KEY,
+    stop INTEGER NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    worker TEXT,
+    expires_at REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    records INTEGER NOT NULL DEFAULT 0,
+    updated_at REAL,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS leases_state ON leases (state, expires_at);
+CREATE TABLE IF NOT EXISTS rate_budget (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    tokens REAL NOT NULL,
+    rate REAL NOT NULL,
+    burst REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+
+def connect(db_path, wal=True):
+    """
+    Open the coordination database in autocommit mode; transactions are
+    explicit BEGIN IMMEDIATE blocks. Use wal=False when the file lives on a
+    network filesystem, where WAL's shared memory is not available. The
+    journal mode is stored in the file, so it is set either way.
+    """
+    conn = sqlite3.connect(db_path, timeout=60, isolation_level=None)
+    conn.execute("PRAGMA busy_timeout = 60000")
+    conn.execute(f"PRAGMA journal_mode = {'WAL' if wal else 'DELETE'}")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def init_crawl(db_path, start_id=1, max_id=350000, lease_size=LEASE_SIZE,
+               rate_per_second=RATE_PER_SECOND, burst=BURST, wal=True):
+    """Create leases covering start_id..max_id (existing leases are kept)."""
+    conn = connect(db_path, wal=wal)
+    now = time.time()
+    conn.execute("BEGIN IMMEDIATE")
+    conn.executemany(
+        "INSERT OR IGNORE INTO leases (start, stop, updated_at) VALUES (?, ?, ?)",
+        [(s, min(s + lease_size, max_id + 1), now) for s in range(start_id, max_id + 1, lease_size)])
+    conn.execute(
+        "INSERT INTO rate_budget (id, tokens, rate, burst, updated_at) VALUES (1, ?, ?, ?, ?) "
+        "ON CONFLICT(id) DO UPDATE SET rate = excluded.rate, burst = excluded.burst",
+        (burst, rate_per_second, burst, now))
+    conn.execute("COMMIT")
+    total = conn.execute("SELECT COUNT(*) FROM leases").fetchone()[0]
+    conn.close()
+    print(f"Crawl initialised: {total:,} leases of {lease_size} IDs ({start_id} to {max_id})")
+    print(f"Global rate budget: {rate_per_second} requests/s (burst {burst})")
+
+
+# -----------------------------------------------------------
+# Lease operations
+# -----------------------------------------------------------
+def claim_lease(conn, worker_id, ttl=LEASE_TTL):
+    """Claim the lowest pending (or expired) lease. Returns (start, stop) or None."""
+    now = time.time()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        row = conn.execute(
+            "SELECT start, stop FROM leases "
+            "WHERE state = 'pending' OR (state = 'leased' AND expires_at < ?) "
+            "ORDER BY start LIMIT 1", (now,)).fetchone()
+        if row is not None:
+            conn.execute(
+                "UPDATE leases SET state = 'leased', worker = ?, expires_at = ?, "
+                "attempts = attempts + 1, updated_at = ? WHERE start = ?",
+                (worker_id, now + ttl, now, row[0]))
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    return row
+
+
+def heartbeat(conn, start, worker_id, ttl=LEASE_TTL):
+    """Extend a lease. Returns False if it was lost to another worker."""
+    now = time.time()
+    cur = conn.execute(
+        "UPDATE leases SET expires_at = ?, updated_at = ? "
+        "WHERE start = ? AND worker = ? AND state = 'leased'",
+        (now + ttl, now, start, worker_id))
+    return cur.rowcount == 1
+
+
+def complete_lease(conn, start, worker_id, records):
+    cur = conn.execute(
+        "UPDATE leases SET state = 'done', records = ?, expires_at = NULL, error = NULL, "
+        "updated_at = ? WHERE start = ? AND worker = ? AND state = 'leased'",
+        (records, time.time(), start, worker_id))
+    return cur.rowcount == 1
+
+
+def lease_sleep(conn, start, worker_id, ttl=LEASE_TTL):
+    """
+    A time.sleep for retry backoffs that heartbeats the lease at least every
+    ttl / 3 seconds, so a long backoff does not let it expire. Raises
+    RuntimeError if the lease was lost.
+    """
+    def sleep(seconds):
+        end = time.monotonic() + seconds
+        while True:
+            if not heartbeat(conn, start, worker_id, ttl):
+                raise RuntimeError("lease expired and was reclaimed")
+            remaining = end - time.monotonic()
+            if remaining <= 0:
+                return
+            time.sleep(min(remaining, ttl / 3))
+    return sleep
+
+
+def release_lease(conn, start, worker_id, error, max_attempts=MAX_ATTEMPTS):
+    """Give a lease back after an error; after max_attempts it is marked failed."""
+    conn.execute(
+        "UPDATE leases SET state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+        "worker = NULL, expires_at = NULL, error = ?, updated_at = ? "
+        "WHERE start = ? AND worker = ?",
+        (max_attempts, str(error)[:500], time.time(), start, worker_id))
+
+
+def acquire_token(conn):
+    """Block until the shared token bucket allows one more request."""
+    while True:
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            tokens, rate, burst, updated_at = conn.execute(
+                "SELECT tokens, rate, burst, updated_at FROM rate_budget WHERE id = 1").fetchone()
+            tokens = min(burst, tokens + (now - updated_at) * rate)
+            if tokens >= 1.0:
+                tokens -= 1.0
+                wait = 0.0
+            else:
+                wait = (1.0 - tokens) / rate
+            conn.execute("UPDATE rate_budget SET tokens = ?, updated_at = ? WHERE id = 1", (tokens, now))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        if wait == 0.0:
+            return
+        time.sleep(wait)
+
+
+# -----------------------------------------------------------
+# Worker
+# -----------------------------------------------------------
+def _fetch_batch(conn, range_start, range_stop, quarantine=None):
+    """One rate-budgeted /acad/range request (retries are applied by the caller)."""
+    acquire_token(conn)
+    return cache_mgp.fetch_batch(range_start, range_stop,
+                                 policy=retry_policy.RetryPolicy(max_attempts=1), quarantine=quarantine)
+
+
+def lease_file(output_dir, start, stop, extension=".json"):
+    return os.path.join(output_dir, f"checkpoint_lease_{start:07d}_{stop:07d}{extension}")
+
+
+def run_worker(db_path, output_dir="mgp_cache", worker_id=None, batch_size=10,
+               ttl=LEASE_TTL, extension=".json", wal=True, policy=None):
+    """
+    Claim and fetch leases until none are left. A failing batch is retried
+    according to policy (a retry_policy.RetryPolicy) before the whole lease
+    is given back. Returns the number of records fetched.
+    """
+    policy = policy or retry_policy.RetryPolicy(max_attempts=4, base_delay=2.0, max_delay=60.0)
+    breaker = retry_policy.CircuitBreaker()
+    worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+    os.makedirs(output_dir, exist_ok=True)
+    quarantine = record_schema.Quarantine(os.path.join(output_dir, "quarantine.jsonl"))
+    conn = connect(db_path, wal=wal)
+    total = 0
+
+    while True:
+        lease = claim_lease(conn, worker_id, ttl)
+        if lease is None:
+            break
+        start, stop = lease
+        print(f"[{worker_id}] Lease {start}-{stop - 1}")
+
+        records = {}
+        sleep = lease_sleep(conn, start, worker_id, ttl)
+        try:
+            for range_start in range(start, stop, batch_size):
+                range_stop = min(range_start + batch_size, stop)
+                records.update(retry_policy.call_with_retry(
+                    lambda: _fetch_batch(conn, range_start, range_stop, quarantine), policy, breaker, sleep))
+                if not heartbeat(conn, start, worker_id, ttl):
+                    raise RuntimeError("lease expired and was reclaimed")
+        except Exception as e:
+            print(f"[{worker_id}] ✗ Lease {start}-{stop - 1}: {e}")
+            release_lease(conn, start, worker_id, e)
+            if retry_policy.classify(e) == "auth":
+                print(f"[{worker_id}] Token expired! Get a new token and restart.")
+                break
+            continue
+
+        record_store.write_records(records, lease_file(output_dir, start, stop, extension))
+        if complete_lease(conn, start, worker_id, len(records)):
+            total += len(records)
+            print(f"[{worker_id}] ✓ Lease {start}-{stop - 1}: {len(records)} records")
+
+    conn.close()
+    return total
+
+
+def run_crawl(db_path, n_workers=4, output_dir="mgp_cache", **worker_args):
+    """Start n_workers worker processes on this machine and wait for them."""
+    workers = [
+        multiprocessing.Process(target=run_worker, args=(db_path, output_dir),
+                                kwargs=dict(worker_args, worker_id=f"{socket.gethostname()}:w{i}"))
+        for i in range(n_workers)
+    ]
+    # Only this process is profiled; the workers' own CPU time is not counted
+    with profiling.stage("fetch"):
+        for w in workers:
+            w.start()
+        for w in workers:
+            w.join()
+    crawl_status(db_path, wal=worker_args.get("wal", True))
+
+
+def crawl_status(db_path, wal=True):
+    conn = connect(db_path, wal=wal)
+    rows = conn.execute(
+        "SELECT state, COUNT(*), SUM(records) FROM leases GROUP BY state ORDER BY state").fetchall()
+    expired = conn.execute(
+        "SELECT COUNT(*) FROM leases WHERE state = 'leased' AND expires_at < ?",
+        (time.time(),)).fetchone()[0]
+    conn.close()
+
+    print(f"\nCrawl status ({os.path.basename(db_path)}):")
+    for state, count, records in rows:
+        print(f"  {state:8s} {count:7,} leases  {records or 0:9,} records")
+    if expired:
+        print(f"  ({expired} leased but expired, will be reclaimed)")
+    return {state: count for state, count, _ in rows}
+
+
+if __name__ == '__main__':
+    profiling.from_argv("crawl_coordinator")
+    use_wal = "--no-wal" not in sys.argv
+    sys.argv = [arg for arg in sys.argv if arg != "--no-wal"]
+    if len(sys.argv) < 3 or sys.argv[1] not in ("init", "run", "status"):
+        print(__doc__)
+        sys.exit(1)
+
+    command, db = sys.argv[1], sys.argv[2]
+    if command == "init":
+        init_crawl(db, start_id=int(sys.argv[3]) if len(sys.argv) > 3 else 1,
+                   max_id=int(sys.argv[4]) if len(sys.argv) > 4 else 350000, wal=use_wal)
+    elif command == "run":
+        run_crawl(db, n_workers=int(sys.argv[3]) if len(sys.argv) > 3 else 4, wal=use_wal)
+    else:
+        crawl_status(db, wal=use_wal)
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Export geocoded universities as zoom-level map tiles for the front end.
+
+Joins university_coordinates_partial.json with per-school academic counts and
+degree-year (decade) histograms from the MGP data, clusters nearby schools
+per zoom level on a Web Mercator pixel grid, and writes minified
+tiles/<z>/<x>/<y>.json files plus tiles/index.json. The map then fetches only
+the tiles in view instead of the whole UNIVERSITY_COORDS bundle.
+
+Usage: python export_geo_tiles.py everything.json [university_coordinates_partial.json] [tiles]
+"""
+
+import json
+import math
+import os
+import sys
+from collections import defaultdict
+
+import academic_model
+import profiling
+import record_schema
+import record_store
+
+TILE_SIZE = 256
+CLUSTER_PX = 64       # schools closer than this many pixels merge into one cluster
+MIN_ZOOM = 0
+MAX_ZOOM = 8          # from this zoom on every school is shown individually
+DECADE = 10
+
+
+# -----------------------------------------------------------
+# Per-school statistics from the MGP data
+# -----------------------------------------------------------
+def _school_years(person):
+    if isinstance(person, academic_model.Academic):
+        for degree in person.degrees:
+            for school in degree.schools:
+                yield school, degree.year
+    else:
+        for degree in academic_model.iter_degrees(person):
+            year = academic_model.parse_year(degree.get("degree_year"))
+            for school in degree.get("schools") or []:
+                yield school, year
+
+
+def school_stats(records):
+    """
+    {school: {"count": academics, "years": {decade: degrees}}} over an
+    iterable of records (raw dicts or Academic objects).
+    """
+    stats = defaultdict(lambda: {"count": 0, "years": defaultdict(int)})
+    for person in records:
+        seen = set()
+        for school, year in _school_years(person):
+            school = record_schema.canonical_school(school or "")
+            if not school:
+                continue
+            entry = stats[school]
+            if school not in seen:
+                entry["count"] += 1
+                seen.add(school)
+            if year is not None:
+                entry["years"][year // DECADE * DECADE] += 1
+    return stats
+
+
+# -----------------------------------------------------------
+# Web Mercator helpers
+# -----------------------------------------------------------
+def to_pixels(lat, lon, zoom):
+    """World pixel coordinates of lat/lon at a zoom level."""
+    lat = max(-85.05112878, min(85.05112878, lat))
+    scale = TILE_SIZE * (2 ** zoom)
+    x = (lon + 180.0) / 360.0 * scale
+    sin_lat = math.sin(math.radians(lat))
+    y = (0.5 - math.log((1 + sin_lat) / (1 - sin_lat)) / (4 * math.pi)) * scale
+    return x, y
+
+
+def _merge_years(target, years):
+    for decade, n in years.items():
+        target[decade] = target.get(decade, 0) + n
+
+
+def cluster_points(points, zoom, cluster_px=CLUSTER_PX):
+    """
+    Grid clustering: schools whose pixels fall in the same cluster_px cell
+    become one feature at their count-weighted centroid.
+    """
+    cells = defaultdict(list)
+    for point in points:
+        x, y = to_pixels(point["lat"], point["lon"], zoom)
+        cells[(int(x // cluster_px), int(y // cluster_px))].append(point)
+
+    features = []
+    for members in cells.values():
+        if len(members) == 1:
+            features.append(dict(members[0], schools=1))
+            continue
+        weight = sum(max(1, m["count"]) for m in members)
+        years = {}
+        for m in members:
+            _merge_years(years, m["years"])
+        top = max(members, key=lambda m: m["count"])
+        features.append({
+            "lat": round(sum(m["lat"] * max(1, m["count"]) for m in members) / weight, 5),
+            "lon": round(sum(m["lon"] * max(1, m["count"]) for m in members) / weight, 5),
+            "count": sum(m["count"] for m in members),
+            "schools": len(members),
+            "top": top["name"],
+            "years": years,
+        })
+    return features
+
+
+def build_points(coords, stats):
+    """Join coordinates with per-school statistics (schools with no academics keep count 0)."""
+    points = []
+    for name, latlon in coords.items():
+        if not latlon:
+            continue
+        entry = stats.get(record_schema.canonical_school(name) or name, {"count": 0, "years": {}})
+        points.append({
+            "name": name,
+            "lat": round(float(latlon[0]), 5),
+            "lon": round(float(latlon[1]), 5),
+            "count": entry["count"],
+            "years": {str(d): n for d, n in sorted(entry["years"].items())},
+        })
+    return points
+
+
+def _write_minified(path, obj):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(obj, f, ensure_ascii=False, separators=(",", ":"))
+
+
+def tile_index(x, y, zoom):
+    """Tile (x, y) holding world pixel x, y; lon=180 and the poles stay on the grid."""
+    last = 2 ** zoom - 1
+    return (min(last, max(0, int(x // TILE_SIZE))),
+            min(last, max(0, int(y // TILE_SIZE))))
+
+
+def remove_old_tiles(output_dir):
+    """
+    Delete the tiles listed in output_dir/index.json by a previous export,
+    and the directories they leave empty. Nothing else in output_dir is
+    touched; a non-empty directory without an index is refused.
+    """
+    if not os.path.isdir(output_dir):
+        return
+    index_path = os.path.join(output_dir, "index.json")
+    if not os.path.exists(index_path):
+        if os.listdir(output_dir):
+            raise FileExistsError(f"{output_dir} is not empty and has no tile index.json; "
+                                  f"choose an empty or new output directory")
+        return
+    with open(index_path, "r", encoding="utf-8") as f:
+        old = json.load(f)
+    for zoom, listing in old.get("zooms", {}).items():
+        for key in listing:
+            tx, ty = key.split("/")
+            path = os.path.join(output_dir, zoom, tx, f"{ty}.json")
+            if os.path.exists(path):
+                os.remove(path)
+        zoom_dir = os.path.join(output_dir, zoom)
+        if os.path.isdir(zoom_dir):
+            for tx in os.listdir(zoom_dir):
+                column = os.path.join(zoom_dir, tx)
+                if os.path.isdir(column) and not os.listdir(column):
+                    os.rmdir(column)
+            if not os.listdir(zoom_dir):
+                os.rmdir(zoom_dir)
+    os.remove(index_path)
+
+
+def export_tiles(points, output_dir="tiles", min_zoom=MIN_ZOOM, max_zoom=MAX_ZOOM):
+    """
+    Write one JSON file per non-empty tile per zoom level and an index.json
+    listing every tile with its feature and academic counts. Tiles from a
+    previous export to output_dir are replaced.
+    """
+    remove_old_tiles(output_dir)
+
+    index = {
+        "tile_size": TILE_SIZE,
+        "min_zoom": min_zoom,
+        "max_zoom": max_zoom,
+        "total_schools": len(points),
+        "total_academics": sum(p["count"] for p in points),
+        "zooms": {},
+    }
+    total_bytes = 0
+
+    for zoom in range(min_zoom, max_zoom + 1):
+        if zoom == max_zoom:
+            features = [dict(p, schools=1) for p in points]
+        else:
+            features = cluster_points(points, zoom)
+        tiles = defaultdict(list)
+        for feature in features:
+            x, y = to_pixels(feature["lat"], feature["lon"], zoom)
+            tiles[tile_index(x, y, zoom)].append(feature)
+
+        listing = {}
+        for (tx, ty), members in sorted(tiles.items()):
+            members.sort(key=lambda f: f["count"], reverse=True)
+            path = os.path.join(output_dir, str(zoom), str(tx), f"{ty}.json")
+            _write_minified(path, members)
+            total_bytes += os.path.getsize(path)
+            listing[f"{tx}/{ty}"] = [len(members), sum(f["count"] for f in members)]
+
+        index["zooms"][str(zoom)] = listing
+        print(f"  Zoom {zoom}: {len(features):,} features in {len(tiles):,} tiles")
+
+    _write_minified(os.path.join(output_dir, "index.json"), index)
+    print(f"✓ Wrote tiles to {output_dir}/ ({total_bytes / 1024:.1f} KB total)")
+    return index
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python export_geo_tiles.py everything.json [coords.json] [output_dir]")
+        return
+
+    json_path = sys.argv[1]
+    coords_path = sys.argv[2] if len(sys.argv) > 2 else "university_coordinates_partial.json"
+    output_dir = sys.argv[3] if len(sys.argv) > 3 else "tiles"
+
+    print(f"Loading {coords_path}...")
+    with open(coords_path, "r", encoding="utf-8") as f:
+        coords = json.load(f)
+
+    print(f"Scanning {json_path}...")
+    with profiling.stage("extract"):
+        stats = school_stats(record for _, record in record_store.iter_records(json_path))
+    print(f"✓ {len(stats):,} schools with academics")
+
+    points = build_points(coords, stats)
+    matched = sum(1 for p in points if p["count"])
+    print(f"✓ {matched:,}/{len(points):,} geocoded schools matched to academics\n")
+
+    with profiling.stage("dump"):
+        try:
+            export_tiles(points, output_dir)
+        except FileExistsError as e:
+            print(f"✗ {e}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    profiling.from_argv("export_geo_tiles")
+    main()
@@ -0,0 +1,414 @@
+#!/usr/bin/env python3
+"""
+Advisor/student graph built from the cached MGP records.
+
+Edges come from each degree's "advised by" IDs, so the graph is built from
+the students' side and does not depend on advisors' advisee lists being
+complete. Subgraph queries (ancestors, descendants, neighbourhood) are
+breadth-first walks bounded by depth and by a node budget.
+
+compute_metrics() derives, for every academic, the number of distinct
+descendants and the number of generations below them (the longest chain of
+students). It is one bottom-up pass: strongly connected components (cycles
+from data errors) are collapsed, and each component's set of reachable IDs
+is built from its students' sets, reusing the largest one and dropping each
+set once its last advisor has consumed it. Time is still proportional to
+the sum of the descendant-set sizes, but the unions run in C rather than as
+one walk per academic, and only the sets of the current frontier are held
+in memory.
+
+Both metrics depend only on what can be reached through students, so
+apply_delta() (a
+record_delta.Delta of added, changed and removed academics) patches the
+adjacency and recomputes them just for the touched academics and their
+ancestors, before and after the change. compare() checks a patched graph
+against a full rebuild.
+
+Usage:
+    python genealogy_graph.py build all_academics_merged_complete.json [graph.json]
+    python genealogy_graph.py update graph.json delta.json
+    python genealogy_graph.py check graph.json all_academics_merged_complete.json
+"""
+
+import json
+import os
+import sys
+import time
+from collections import deque
+
+import academic_model
+import profiling
+import record_delta
+import record_store
+
+# Above this share of affected academics a delta recomputes all metrics
+FULL_RECOMPUTE_SHARE = 0.25
+
+
+class GenealogyGraph:
+    def __init__(self):
+        self.advisors = {}   # ID -> tuple of advisor IDs
+        self.students = {}   # ID -> list of student IDs
+        self.info = {}       # ID -> (name, first degree year)
+        self.metrics = None  # ID -> (descendant count, generations below), see compute_metrics()
+
+    @classmethod
+    def from_data(cls, data):
+        return cls.from_records(data.values())
+
+    @classmethod
+    def from_file(cls, path):
+        return cls.from_records(record for _, record in record_store.iter_records(path))
+
+    @classmethod
+    def from_records(cls, records):
+        graph = cls()
+        for record in records:
+            try:
+                if isinstance(record, academic_model.Academic):
+                    academic = record
+                else:
+                    academic = academic_model.Academic.from_record(record)
+            except (KeyError, TypeError, ValueError):
+                continue
+            graph._add_node(academic)
+        return graph
+
+    def _add_node(self, academic):
+        acad_id = academic.id
+        name = " ".join(p for p in (academic.given_name, academic.other_names, academic.family_name) if p)
+        self.info[acad_id] = (name, academic.year)
+        self.advisors[acad_id] = tuple(academic.advisor_ids)
+        for advisor_id in self.advisors[acad_id]:
+            self.students.setdefault(advisor_id, []).append(acad_id)
+
+    def _remove_node(self, acad_id):
+        """Drop a node and its advisor edges; its students keep pointing at it."""
+        for advisor_id in self.advisors.pop(acad_id, ()):
+            students = self.students.get(advisor_id)
+            if students and acad_id in students:
+                students.remove(acad_id)
+                if not students:
+                    del self.students[advisor_id]
+        self.info.pop(acad_id, None)
+
+    def __contains__(self, acad_id):
+        return acad_id in self.info
+
+    def __len__(self):
+        return len(self.info)
+
+    def node(self, acad_id):
+        name, year = self.info.get(acad_id, ("", None))
+        return {"id": acad_id, "name": name, "year": year}
+
+    # -------------------------------------------------------
+    # Subgraph queries
+    # -------------------------------------------------------
+    def _walk(self, root, depth, neighbours, max_nodes):
+        """BFS from root; returns ({ID: distance}, truncated)."""
+        dist = {root: 0}
+        queue = deque([root])
+        while queue:
+            current = queue.popleft()
+            if dist[current] >= depth:
+                continue
+            for nxt in neighbours(current):
+                if nxt in dist:
+                    continue
+                if len(dist) >= max_nodes:
+                    return dist, True
+                dist[nxt] = dist[current] + 1
+                queue.append(nxt)
+        return dist, False
+
+    def _subgraph(self, root, depth, neighbours, max_nodes):
+        dist, truncated = self._walk(root, depth, neighbours, max_nodes)
+        edges = []
+        for acad_id in dist:
+            for advisor_id in self.advisors.get(acad_id, ()):
+                if advisor_id in dist:
+                    edges.append([advisor_id, acad_id])
+        nodes = []
+        for acad_id, d in dist.items():
+            node = self.node(acad_id)
+            node["depth"] = d
+            nodes.append(node)
+        return {"root": root, "depth": depth, "nodes": nodes, "edges": edges, "truncated": truncated}
+
+    def ancestors(self, root, depth=3, max_nodes=10000):
+        """Advisors, their advisors, ... up to depth generations."""
+        return self._subgraph(root, depth, lambda i: self.advisors.get(i, ()), max_nodes)
+
+    def descendants(self, root, depth=3, max_nodes=10000):
+        """Students, their students, ... down to depth generations."""
+        return self._subgraph(root, depth, lambda i: self.students.get(i, ()), max_nodes)
+
+    def neighbourhood(self, root, depth=2, max_nodes=10000):
+        """Everything within depth advisor/student links, in either direction."""
+        def neighbours(i):
+            return list(self.advisors.get(i, ())) + self.students.get(i, [])
+        return self._subgraph(root, depth, neighbours, max_nodes)
+
+    # -------------------------------------------------------
+    # Derived metrics
+    # -------------------------------------------------------
+    def _components(self, ids):
+        """
+        Strongly connected components of the student links within ids
+        (iterative Tarjan), each listed after the components it reaches.
+        """
+        index, low = {}, {}
+        stack, on_stack, components = [], set(), []
+        for root in ids:
+            if root in index:
+                continue
+            index[root] = low[root] = len(index)
+            stack.append(root)
+            on_stack.add(root)
+            work = [(root, iter(self.students.get(root, ())))]
+            while work:
+                node, students = work[-1]
+                for student in students:
+                    if student not in ids:
+                        continue
+                    if student not in index:
+                        index[student] = low[student] = len(index)
+                        stack.append(student)
+                        on_stack.add(student)
+                        work.append((student, iter(self.students.get(student, ()))))
+                        break
+                    if student in on_stack:
+                        low[node] = min(low[node], index[student])
+                else:
+                    work.pop()
+                    if work:
+                        parent = work[-1][0]
+                        low[parent] = min(low[parent], low[node])
+                    if low[node] == index[node]:
+                        component = []
+                        while True:
+                            member = stack.pop()
+                            on_stack.discard(member)
+                            component.append(member)
+                            if member == node:
+                                break
+                        components.append(component)
+        return components
+
+    def _metrics(self, ids):
+        """{ID: (distinct descendants, generations below)} for ids, which must be closed under students."""
+        components = self._components(ids)
+        component_of = {}
+        for c, members in enumerate(components):
+            for member in members:
+                component_of[member] = c
+        successors, pending = [], [0] * len(components)
+        for c, members in enumerate(components):
+            below = {component_of[s] for m in members for s in self.students.get(m, ()) if s in ids}
+            below.discard(c)
+            successors.append(below)
+            for d in below:
+                pending[d] += 1
+
+        # Reachable IDs (itself included) of components some advisor still needs
+        reach_of = {}
+        depth = [0] * len(components)
+        metrics = {}
+        for c, members in enumerate(components):
+            reach = None
+            for d in sorted(successors[c], key=lambda d: len(reach_of[d]), reverse=True):
+                pending[d] -= 1
+                if reach is None:
+                    # The largest set is taken over when this is its last user
+                    reach = reach_of[d] if pending[d] == 0 else set(reach_of[d])
+                else:
+                    reach |= reach_of[d]
+                if pending[d] == 0:
+                    del reach_of[d]
+                depth[c] = max(depth[c], depth[d] + 1)
+            reach = reach if reach is not None else set()
+            reach.update(members)
+            for member in members:
+                metrics[member] = (len(reach) - 1, depth[c])
+            if pending[c]:
+                reach_of[c] = reach
+        return metrics
+
+    def _with_descendants(self, ids):
+        """ids plus everything reachable from them through students."""
+        seen = set(ids)
+        queue = deque(seen)
+        while queue:
+            for student in self.students.get(queue.popleft(), ()):
+                if student not in seen:
+                    seen.add(student)
+                    queue.append(student)
+        return seen
+
+    def node_metrics(self, acad_id):
+        """(distinct descendants, generations below) of one academic."""
+        return self._metrics(self._with_descendants([acad_id]))[acad_id]
+
+    def compute_metrics(self):
+        self.metrics = self._metrics(self.info)
+        return self.metrics
+
+    def _with_ancestors(self, ids):
+        """ids plus everything reachable from them through advisors."""
+        seen = set(ids)
+        queue = deque(seen)
+        while queue:
+            for advisor_id in self.advisors.get(queue.popleft(), ()):
+                if advisor_id not in seen:
+                    seen.add(advisor_id)
+                    queue.append(advisor_id)
+        return seen
+
+    # -------------------------------------------------------
+    # Incremental updates
+    # -------------------------------------------------------
+    def apply_delta(self, delta):
+        """
+        Patch the graph with a record_delta.Delta. If metrics were computed,
+        they are recomputed for the affected academics only, from the part of
+        the graph below them (or for all academics when that part is more
+        than FULL_RECOMPUTE_SHARE of the graph). Returns the set of affected
+        IDs.
+        """
+        upserts = delta.upserts
+        touched = [int(k) for k in upserts] + [int(k) for k in delta.removed]
+        # Ancestors along the old advisor links lose descendants...
+        affected = self._with_ancestors(touched)
+        for acad_id in touched:
+            self._remove_node(acad_id)
+        for record in upserts.values():
+            try:
+                self._add_node(academic_model.Academic.from_record(record))
+            except (KeyError, TypeError, ValueError):
+                continue
+        # ...and those along the new ones gain them
+        affected |= self._with_ancestors(touched)
+
+        if self.metrics is not None:
+            region = self._with_descendants(i for i in affected if i in self.info)
+            if len(region) > FULL_RECOMPUTE_SHARE * len(self):
+                self.compute_metrics()
+            else:
+                metrics = self._metrics(region)
+                for acad_id in affected:
+                    if acad_id in self.info:
+                        self.metrics[acad_id] = metrics[acad_id]
+                    else:
+                        self.metrics.pop(acad_id, None)
+        return affected
+
+    def compare(self, other, limit=20):
+        """Differences between two graphs (e.g. patched vs rebuilt), at most limit of them."""
+        problems = []
+        for acad_id in self.info.keys() ^ other.info.keys():
+            problems.append(f"{acad_id}: only in {'this' if acad_id in self.info else 'other'} graph")
+        for acad_id in self.info.keys() & other.info.keys():
+            if self.info[acad_id] != other.info[acad_id]:
+                problems.append(f"{acad_id}: info {self.info[acad_id]} != {other.info[acad_id]}")
+            if self.advisors[acad_id] != other.advisors[acad_id]:
+                problems.append(f"{acad_id}: advisors {self.advisors[acad_id]} != {other.advisors[acad_id]}")
+        for acad_id in self.students.keys() | other.students.keys():
+            mine, theirs = sorted(self.students.get(acad_id, ())), sorted(other.students.get(acad_id, ()))
+            if mine != theirs:
+                problems.append(f"{acad_id}: students {mine} != {theirs}")
+        if self.metrics is not None and other.metrics is not None:
+            for acad_id in self.metrics.keys() | other.metrics.keys():
+                if self.metrics.get(acad_id) != other.metrics.get(acad_id):
+                    problems.append(f"{acad_id}: metrics {self.metrics.get(acad_id)} != {other.metrics.get(acad_id)}")
+        return problems[:limit]
+
+    # -------------------------------------------------------
+    # Persistence
+    # -------------------------------------------------------
+    def save(self, path):
+        data = {
+            "advisors": {str(i): list(a) for i, a in self.advisors.items()},
+            "info": {str(i): list(v) for i, v in self.info.items()},
+        }
+        if self.metrics is not None:
+            data["metrics"] = {str(i): list(m) for i, m in self.metrics.items()}
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        graph = cls()
+        for key, (name, year) in data["info"].items():
+            acad_id = int(key)
+            graph.info[acad_id] = (name, year)
+            graph.advisors[acad_id] = tuple(data["advisors"].get(key, ()))
+            for advisor_id in graph.advisors[acad_id]:
+                graph.students.setdefault(advisor_id, []).append(acad_id)
+        if "metrics" in data:
+            graph.metrics = {int(k): tuple(m) for k, m in data["metrics"].items()}
+        return graph
+
+
+def build_graph(records_file, output_file="graph.json"):
+    start = time.perf_counter()
+    with profiling.stage("load"):
+        graph = GenealogyGraph.from_file(records_file)
+    with profiling.stage("metrics"):
+        graph.compute_metrics()
+    with profiling.stage("dump"):
+        graph.save(output_file)
+    print(f"✓ {len(graph):,} academics, metrics computed in {time.perf_counter() - start:.1f}s → {output_file}")
+    return graph
+
+
+def update_graph(graph_file, delta_file):
+    with profiling.stage("load"):
+        graph = GenealogyGraph.load(graph_file)
+        delta = record_delta.Delta.load(delta_file)
+    if graph.metrics is None:
+        with profiling.stage("metrics"):
+            graph.compute_metrics()
+    start = time.perf_counter()
+    with profiling.stage("update"):
+        affected = graph.apply_delta(delta)
+    with profiling.stage("dump"):
+        graph.save(graph_file)
+    print(f"✓ Applied {delta.summary()}: {len(affected):,} academics affected, "
+          f"{time.perf_counter() - start:.2f}s")
+    return graph
+
+
+def check_graph(graph_file, records_file):
+    """Compare a (patched) saved graph with a full rebuild from records_file."""
+    with profiling.stage("load"):
+        graph = GenealogyGraph.load(graph_file)
+        rebuilt = GenealogyGraph.from_file(records_file)
+    if graph.metrics is not None:
+        with profiling.stage("metrics"):
+            rebuilt.compute_metrics()
+    problems = graph.compare(rebuilt)
+    if problems:
+        print(f"✗ {graph_file} differs from a rebuild of {os.path.basename(records_file)}:")
+        for problem in problems:
+            print(f"  {problem}")
+    else:
+        print(f"✓ {graph_file} matches a rebuild ({len(graph):,} academics)")
+    return not problems
+
+
+if __name__ == '__main__':
+    profiling.from_argv("genealogy_graph")
+    if len(sys.argv) >= 3 and sys.argv[1] == "build":
+        build_graph(sys.argv[2], sys.argv[3] if len(sys.argv) > 3 else "graph.json")
+    elif len(sys.argv) >= 4 and sys.argv[1] == "update":
+        update_graph(sys.argv[2], sys.argv[3])
+    elif len(sys.argv) >= 4 and sys.argv[1] == "check":
+        sys.exit(0 if check_graph(sys.argv[2], sys.argv[3]) else 1)
+    else:
+        print(__doc__)
+        sys.exit(1)
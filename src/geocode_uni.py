@@ -13,19 +13,33 @@ import os
 import sys
 from collections import defaultdict
 
+import academic_model
+import chunked_export
+import profiling
+import record_schema
+import record_store
+import retry_policy
+
+GEOCODE_POLICY = retry_policy.RetryPolicy(max_attempts=4, base_delay=2.0, max_delay=60.0)
+GEOCODE_BREAKER = retry_policy.CircuitBreaker(failure_threshold=5, reset_timeout=120.0)
+
 CHECKPOINT_FILE = "university_coordinates_partial.json"
 OUTPUT_JS = "university_coordinates.js"
 NOT_FOUND_JSON = "universities_not_found.json"
 NOT_FOUND_JS = "universities_not_found.js"
+CHUNK_DIR = "university_coords"     # chunked, lazily loadable copy of OUTPUT_JS
 
 
 # -----------------------------------------------------------
 # Load MGP master JSON
 # -----------------------------------------------------------
-def load_data(json_file):
+def load_data(json_file, compact=False):
     print(f"Loading {json_file}...")
-    with open(json_file, "r", encoding="utf-8") as f:
-        data = json.load(f)
+    if compact:
+        # Streamed into __slots__ records, a fraction of the dict memory
+        data = academic_model.load_academics(json_file)
+    else:
+        data = record_store.load_records(json_file)
     print(f"✓ Loaded {len(data)} records")
     return data
 
@@ -38,17 +52,21 @@ def extract_universities(data):
     counts = defaultdict(int)
 
     for _, person in data.items():
-        mgp = person.get("MGP_academic", {})
-        student = mgp.get("student_data", {})
-        degrees = student.get("degrees", [])
-
-        for degree in degrees:
-            schools = degree.get("schools", [])
-            if isinstance(schools, list):
-                for school in schools:
-                    if school and school.lower() not in ["unknown", "", "none"]:
-                        universities.add(school)
-                        counts[school] += 1
+        if isinstance(person, academic_model.Academic):
+            all_schools = person.schools
+        else:
+            all_schools = []
+            for degree in academic_model.iter_degrees(person):
+                schools = degree.get("schools", [])
+                if isinstance(schools, list):
+                    all_schools.extend(schools)
+
+        for school in all_schools:
+            # Same canonical names as ingest; placeholders come back as None
+            school = record_schema.canonical_school(school or "")
+            if school:
+                universities.add(school)
+                counts[school] += 1
 
     universities = sorted(universities, key=lambda u: counts[u], reverse=True)
 
@@ -59,21 +77,23 @@ def extract_universities(data):
 # -----------------------------------------------------------
 # Geocode via Nominatim API
 # -----------------------------------------------------------
+# Returns None only when Nominatim has no match; errors are retried and
+# re-raised, so a network problem is never recorded as "not found".
 def geocode(university_name):
     url = "https://nominatim.openstreetmap.org/search"
     params = {"q": university_name, "format": "json", "limit": 1}
     headers = {"User-Agent": "MGP-Geocoder/1.0 (contact: example@example.com)"}
 
-    try:
+    def query():
         r = requests.get(url, params=params, headers=headers, timeout=10)
-        r.raise_for_status()
-        data = r.json()
+        retry_policy.raise_for_status(r, "Geocoding failed")
+        return r.json()
 
-        if data:
-            return float(data[0]["lat"]), float(data[0]["lon"])
-        return None
-    except Exception:
-        return None
+    data = retry_policy.call_with_retry(query, GEOCODE_POLICY, GEOCODE_BREAKER)
+
+    if data:
+        return float(data[0]["lat"]), float(data[0]["lon"])
+    return None
 
 
 # -----------------------------------------------------------
@@ -138,10 +158,12 @@ def main():
     json_path = sys.argv[1]
 
     # Load everything.json
-    data = load_data(json_path)
+    with profiling.stage("load"):
+        data = load_data(json_path, compact=True)
 
     # Extract university list
-    universities = extract_universities(data)
+    with profiling.stage("extract"):
+        universities = extract_universities(data)
 
     # Load checkpoint if exists
     found = {}
@@ -150,12 +172,12 @@ def main():
     if os.path.exists(CHECKPOINT_FILE):
         print(f"🔄 Loading checkpoint: {CHECKPOINT_FILE}")
         with open(CHECKPOINT_FILE, "r", encoding="utf-8") as f:
-            found = json.load(f)
+            found = {record_schema.canonical_school(k) or k: v for k, v in json.load(f).items()}
 
     if os.path.exists(NOT_FOUND_JSON):
         print(f"🔄 Loading NOT-FOUND record: {NOT_FOUND_JSON}")
         with open(NOT_FOUND_JSON, "r", encoding="utf-8") as f:
-            not_found = set(json.load(f))
+            not_found = {record_schema.canonical_school(k) or k for k in json.load(f)}
 
     # Determine remaining universities
     remaining = [
@@ -164,12 +186,21 @@ def main():
     ]
 
     print(f"\n→ Need to geocode {len(remaining)} universities\n")
+    failed = 0
 
     # Loop through remaining universities
     for i, uni in enumerate(remaining, 1):
         print(f"[{i}/{len(remaining)}] {uni[:60]}...", end=" ")
 
-        coords = geocode(uni)
+        try:
+            with profiling.stage("fetch"):
+                coords = geocode(uni)
+        except Exception as e:
+            # Left out of both lists, so the next run tries it again
+            print(f"⚠ {e}")
+            failed += 1
+            time.sleep(1.1)
+            continue
 
         if coords:
             print(f"✓ {coords}")
@@ -185,12 +216,17 @@ def main():
         time.sleep(1.1)
 
     # Final save
-    save_checkpoint(found, not_found)
-    write_js(found)
-    write_not_found_js(not_found)
-
+    with profiling.stage("dump"):
+        save_checkpoint(found, not_found)
+        write_js(found)
+        write_not_found_js(not_found)
+        chunked_export.export_mapping({k: v for k, v in found.items() if v}, CHUNK_DIR, "university_coords")
+
+    if failed:
+        print(f"\n⚠ {failed} universities failed with errors; run again to retry them")
     print("\n✨ DONE: All possible universities processed!")
 
 
 if __name__ == "__main__":
+    profiling.from_argv("geocode_uni")
     main()
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Conditional, compressed GETs for re-crawls.
+
+- Accept-Encoding offers every encoding urllib3 can decode here: gzip and
+  deflate always, br with brotli installed, zstd with zstandard installed.
+- ValidatorCache keeps the ETag / Last-Modified of each fetched ID or range
+  (plus a hash and the size of the body) in a JSON file. On the next crawl
+  the request carries If-None-Match / If-Modified-Since and a 304 is a cache
+  hit: nothing is downloaded and the caller keeps its stored records.
+- When the server sends no validators, the body hash is compared with the
+  stored one, so unchanged content is still recognised (it is downloaded,
+  but callers can skip re-processing it).
+- TransferStats counts wire bytes against decoded bytes and the bytes 304s
+  avoided, for a per-run "bytes saved" report.
+"""
+
+import hashlib
+import json
+import os
+import threading
+
+import requests
+from urllib3.util.request import ACCEPT_ENCODING
+
+import retry_policy
+
+
+def new_session():
+    """requests.Session offering every content encoding urllib3 can decode."""
+    session = requests.Session()
+    session.headers["Accept-Encoding"] = ACCEPT_ENCODING
+    return session
+
+
+def body_hash(content):
+    return hashlib.blake2b(content, digest_size=16).hexdigest()
+
+
+class ValidatorCache:
+    """{key: {"etag", "last_modified", "hash", "bytes"}} persisted as JSON."""
+
+    def __init__(self, path, load=True):
+        """With load=False existing entries are ignored (and overwritten on save)."""
+        self.path = path
+        self.entries = {}
+        self._lock = threading.Lock()
+        if load and os.path.exists(path):
+            with open(path, 'r') as f:
+                self.entries = json.load(f)
+
+    def get(self, key):
+        return self.entries.get(key)
+
+    def note(self, key, **fields):
+        """Store extra fields (e.g. the number of records parsed) with a key's entry."""
+        with self._lock:
+            if key in self.entries:
+                self.entries[key].update(fields)
+
+    def forget(self, key):
+        """Drop a key's entry, so its next request is unconditional."""
+        with self._lock:
+            self.entries.pop(key, None)
+
+    def put(self, key, response, content):
+        entry = {"hash": body_hash(content), "bytes": len(content)}
+        if response.headers.get("ETag"):
+            entry["etag"] = response.headers["ETag"]
+        if response.headers.get("Last-Modified"):
+            entry["last_modified"] = response.headers["Last-Modified"]
+        with self._lock:
+            self.entries[key] = entry
+
+    def save(self):
+        with self._lock:
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(self.entries, f, separators=(',', ':'))
+            os.replace(tmp_path, self.path)
+
+
+class TransferStats:
+    def __init__(self):
+        self.requests = 0
+        self.not_modified = 0
+        self.unchanged = 0         # 200 with the same body hash as last time
+        self.wire_bytes = 0        # bytes received (compressed)
+        self.decoded_bytes = 0     # bytes after decompression
+        self.avoided_bytes = 0     # decoded size of bodies a 304 made unnecessary
+        self._lock = threading.Lock()
+
+    def record(self, wire=0, decoded=0, avoided=0, not_modified=False, unchanged=False):
+        with self._lock:
+            self.requests += 1
+            self.wire_bytes += wire
+            self.decoded_bytes += decoded
+            self.avoided_bytes += avoided
+            self.not_modified += not_modified
+            self.unchanged += unchanged
+
+    @property
+    def saved_bytes(self):
+        """Bytes not transferred thanks to compression and 304s."""
+        return (self.decoded_bytes - self.wire_bytes) + self.avoided_bytes
+
+    def summary(self):
+        return {
+            "requests": self.requests,
+            "not_modified": self.not_modified,
+            "unchanged_by_hash": self.unchanged,
+            "wire_bytes": self.wire_bytes,
+            "decoded_bytes": self.decoded_bytes,
+            "saved_by_compression": self.decoded_bytes - self.wire_bytes,
+            "saved_by_304": self.avoided_bytes,
+            "saved_bytes": self.saved_bytes,
+        }
+
+    def report(self):
+        full = self.decoded_bytes + self.avoided_bytes
+        mb = 1024 * 1024
+        print(f"HTTP: {self.requests} requests, {self.not_modified} not modified (304), "
+              f"{self.unchanged} unchanged by hash")
+        print(f"  Received {self.wire_bytes / mb:.2f} MB for {full / mb:.2f} MB of content; "
+              f"saved {self.saved_bytes / mb:.2f} MB "
+              f"({100 * self.saved_bytes / full if full else 0:.1f}%)")
+
+
+def conditional_get(session, url, key=None, validators=None, stats=None, **kwargs):
+    """
+    GET url (kwargs go to session.get). With a ValidatorCache and a key, the
+    request is conditional on what was stored for that key.
+
+    Returns (content, changed): content is None for a 304; changed is False
+    for a 304 or a body whose hash matches the stored one. Non-2xx responses
+    raise retry_policy.HTTPStatusError.
+    """
+    entry = validators.get(key) if validators is not None and key is not None else None
+    headers = dict(kwargs.pop("headers", None) or {})
+    if entry:
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+
+    r = session.get(url, headers=headers, **kwargs)
+    try:
+        if r.status_code == 304 and entry:
+            if stats is not None:
+                stats.record(avoided=entry.get("bytes", 0), not_modified=True)
+            return None, False
+        retry_policy.raise_for_status(r)
+        content = r.content
+        wire = r.raw.tell() if hasattr(r.raw, "tell") else len(content)
+    finally:
+        r.close()
+
+    unchanged = bool(entry) and entry.get("hash") == body_hash(content)
+    if validators is not None and key is not None:
+        validators.put(key, r, content)
+    if stats is not None:
+        stats.record(wire=wire or len(content), decoded=len(content), unchanged=unchanged)
+    return content, not unchanged
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Load test for lineage_service.py: queries per second and tail latency.
+
+IDs are drawn from /sample with a Zipf-like skew, so a few hot lineages are
+requested far more often than the rest, as in real map browsing.
+
+Usage: python lineage_loadtest.py [host:port] [seconds] [threads]
+"""
+
+import http.client
+import itertools
+import json
+import random
+import sys
+import threading
+import time
+
+QUERIES = [("descendants", 3), ("ancestors", 5), ("neighbourhood", 2)]
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    k = min(len(sorted_values) - 1, int(round(p / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[k]
+
+
+def _get_json(host, port, path):
+    conn = http.client.HTTPConnection(host, port, timeout=30)
+    try:
+        conn.request("GET", path)
+        return json.loads(conn.getresponse().read())
+    finally:
+        conn.close()
+
+
+def run_load_test(host="127.0.0.1", port=8080, duration=10.0, threads=8, pool_size=2000, skew=1.2, seed=0):
+    """
+    Hammer the service from `threads` keep-alive connections for `duration`
+    seconds. Returns a dict with QPS, latency percentiles (ms) and errors.
+    """
+    ids = _get_json(host, port, f"/sample?n={pool_size}")
+    cum_weights = list(itertools.accumulate(1.0 / (rank + 1) ** skew for rank in range(len(ids))))
+    before = _get_json(host, port, "/stats")["cache"]
+
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker(worker_seed):
+        rng = random.Random(worker_seed)
+        conn = http.client.HTTPConnection(host, port, timeout=30)
+        local = []
+        local_errors = 0
+        while time.perf_counter() < deadline:
+            acad_id = rng.choices(ids, cum_weights=cum_weights)[0]
+            kind, depth = rng.choice(QUERIES)
+            start = time.perf_counter()
+            try:
+                conn.request("GET", f"/{kind}?id={acad_id}&depth={depth}")
+                response = conn.getresponse()
+                response.read()
+                if response.status != 200:
+                    local_errors += 1
+            except (OSError, http.client.HTTPException):
+                local_errors += 1
+                conn.close()
+                conn = http.client.HTTPConnection(host, port, timeout=30)
+                continue
+            local.append(time.perf_counter() - start)
+        conn.close()
+        with lock:
+            latencies.extend(local)
+            errors[0] += local_errors
+
+    pool = [threading.Thread(target=worker, args=(seed + i,)) for i in range(threads)]
+    started = time.perf_counter()
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    after = _get_json(host, port, "/stats")["cache"]
+    latencies.sort()
+    hits = after["hits"] - before["hits"]
+    lookups = hits + after["misses"] - before["misses"]
+    return {
+        "requests": len(latencies),
+        "errors": errors[0],
+        "seconds": elapsed,
+        "qps": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p90_ms": percentile(latencies, 90) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "max_ms": (latencies[-1] * 1000) if latencies else 0.0,
+        "cache_hit_ratio": hits / lookups if lookups else 0.0,
+    }
+
+
+if __name__ == '__main__':
+    target = sys.argv[1] if len(sys.argv) > 1 else "127.0.0.1:8080"
+    host, _, port = target.partition(":")
+    duration = float(sys.argv[2]) if len(sys.argv) > 2 else 10.0
+    threads = int(sys.argv[3]) if len(sys.argv) > 3 else 8
+
+    print(f"Load testing http://{host}:{port} for {duration:.0f}s with {threads} threads...")
+    result = run_load_test(host, int(port or 8080), duration, threads)
+    print(f"Requests: {result['requests']:,} ({result['errors']} errors)")
+    print(f"Throughput: {result['qps']:.0f} queries/s")
+    print(f"Latency p50 {result['p50_ms']:.2f} ms, p90 {result['p90_ms']:.2f} ms, "
+          f"p99 {result['p99_ms']:.2f} ms, max {result['max_ms']:.2f} ms")
+    print(f"Cache hit ratio: {100 * result['cache_hit_ratio']:.1f}%")
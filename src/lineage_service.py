@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Small local HTTP service answering family-tree queries for the visualisation.
+
+Loads the genealogy graph once and serves:
+
+    GET /ancestors?id=18231&depth=3
+    GET /descendants?id=18231&depth=3
+    GET /neighbourhood?id=18231&depth=2
+    GET /sample?n=100      random IDs (used by lineage_loadtest.py)
+    GET /stats             graph size and cache statistics
+
+Encoded responses are kept in an LRU cache bounded by total bytes, so hot
+subgraphs are served without walking the graph again.
+
+Usage: python lineage_service.py all_academics_merged_complete.json [port]
+"""
+
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import profiling
+from genealogy_graph import GenealogyGraph
+
+DEFAULT_PORT = 8080
+CACHE_BYTES = 64 * 1024 * 1024
+MAX_DEPTH = 25
+MAX_NODES = 20000
+
+
+class LRUCache:
+    """Thread-safe LRU keyed by query, evicting by total size of the cached bytes."""
+
+    def __init__(self, max_bytes=CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._items.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self.bytes -= len(old)
+            self._items[key] = value
+            self.bytes += len(value)
+            while self.bytes > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self.bytes -= len(evicted)
+                self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._items),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": self.hits / total if total else 0.0,
+            }
+
+
+class LineageHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, payload):
+        if not isinstance(payload, bytes):
+            payload = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        server = self.server
+        kind = url.path.strip("/")
+
+        if kind == "stats":
+            self._send(200, {"nodes": len(server.graph), "load_seconds": server.load_seconds,
+                             "cache": server.cache.stats()})
+            return
+
+        if kind == "sample":
+            try:
+                n = max(0, min(int(params.get("n", 100)), 100000))
+            except ValueError:
+                self._send(400, {"error": "n must be an integer"})
+                return
+            self._send(200, random.sample(server.node_ids, min(n, len(server.node_ids))))
+            return
+
+        if kind not in ("ancestors", "descendants", "neighbourhood"):
+            self._send(404, {"error": "unknown endpoint"})
+            return
+
+        try:
+            acad_id = int(params["id"])
+            depth = max(0, min(int(params.get("depth", 3)), MAX_DEPTH))
+        except (KeyError, ValueError):
+            self._send(400, {"error": "id and depth must be integers"})
+            return
+
+        if acad_id not in server.graph:
+            self._send(404, {"error": f"academic {acad_id} not found"})
+            return
+
+        key = (kind, acad_id, depth)
+        payload = server.cache.get(key)
+        if payload is None:
+            subgraph = getattr(server.graph, kind)(acad_id, depth, max_nodes=MAX_NODES)
+            payload = json.dumps(subgraph, separators=(",", ":")).encode("utf-8")
+            server.cache.put(key, payload)
+        self._send(200, payload)
+
+
+class LineageServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, graph, cache_bytes=CACHE_BYTES, load_seconds=0.0):
+        super().__init__(address, LineageHandler)
+        self.graph = graph
+        self.node_ids = list(graph.info)
+        self.cache = LRUCache(cache_bytes)
+        self.load_seconds = load_seconds
+
+
+def serve(json_file, port=DEFAULT_PORT, cache_bytes=CACHE_BYTES):
+    print(f"Loading genealogy graph from {os.path.basename(json_file)}...")
+    start = time.perf_counter()
+    with profiling.stage("load"):
+        graph = GenealogyGraph.from_file(json_file)
+    load_seconds = time.perf_counter() - start
+    print(f"✓ {len(graph):,} academics loaded in {load_seconds:.1f}s")
+
+    server = LineageServer(("127.0.0.1", port), graph, cache_bytes, load_seconds)
+    print(f"Serving on http://127.0.0.1:{port} (cache {cache_bytes / (1024 * 1024):.0f} MB)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    # Request handlers run in worker threads, which cProfile and stages do not cover
+    profiling.from_argv("lineage_service")
+    if len(sys.argv) < 2:
+        print("Usage: python lineage_service.py all_academics_merged_complete.json [port]")
+        sys.exit(1)
+    serve(sys.argv[1], port=int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_PORT)
@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+Answer /api/v2/MGP/search queries locally from the cached dataset.
+
+SearchIndex builds inverted indexes (token -> set of IDs) over names,
+thesis titles, schools, countries and MSC codes, plus a sorted year array.
+Name fields support exact, prefix and fuzzy (trigram + difflib) matching.
+Results come back in the API's shapes: a JSON list of IDs, or CSV.
+
+Usage: python local_search.py all_academics_merged_complete.json family_name=Keller given_name=M [format=csv]
+"""
+
+import bisect
+import csv
+import difflib
+import io
+import json
+import re
+import sys
+import unicodedata
+from collections import defaultdict
+
+import academic_model
+import profiling
+import record_store
+
+TEXT_FIELDS = ["family_name", "given_name", "other_names", "thesis", "school", "country"]
+NAME_FIELDS = ["family_name", "given_name", "other_names"]
+CSV_HEADER = ["ID", "given_name", "other_names", "family_name", "school", "year"]
+
+_TOKEN = re.compile(r"\w+")
+
+
+def normalize(text):
+    """Lowercase and strip accents so "Gauß"/"Göttingen" match "gauss"/"gottingen"."""
+    text = unicodedata.normalize("NFKD", str(text).casefold())
+    return "".join(c for c in text if not unicodedata.combining(c))
+
+
+def tokenize(text):
+    return _TOKEN.findall(normalize(text))
+
+
+def _trigrams(term):
+    padded = f"  {term} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def format_csv(rows, ids):
+    """Render IDs as the API's CSV body, using rows built by csv_row()."""
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(CSV_HEADER)
+    for acad_id in ids:
+        if acad_id in rows:
+            writer.writerow(rows[acad_id])
+    return out.getvalue()
+
+
+def csv_row(fields):
+    """CSV row for one academic, from the dict returned by record_fields()."""
+    return (
+        fields["id"],
+        fields["given_name"],
+        fields["other_names"],
+        fields["family_name"],
+        "; ".join(fields["school"][:1]),
+        str(fields["years"][0]) if fields["years"] else "",
+    )
+
+
+def record_fields(record):
+    """Pull the searchable fields out of a raw record or an Academic."""
+    if isinstance(record, academic_model.Academic):
+        return {
+            "id": record.id,
+            "family_name": record.family_name,
+            "given_name": record.given_name,
+            "other_names": record.other_names,
+            "msc": record.msc,
+            "thesis": [d.thesis_title for d in record.degrees],
+            "school": record.schools,
+            "country": [c for d in record.degrees for c in d.countries],
+            "years": [d.year for d in record.degrees if d.year is not None],
+        }
+
+    mgp = record["MGP_academic"]
+    degrees = list(academic_model.iter_degrees(record))
+    years = [academic_model.parse_year(d.get("degree_year")) for d in degrees]
+    countries = []
+    for d in degrees:
+        country = d.get("country") or []
+        countries.extend([country] if isinstance(country, str) else country)
+    return {
+        "id": int(mgp["ID"]),
+        "family_name": mgp.get("family_name") or "",
+        "given_name": mgp.get("given_name") or "",
+        "other_names": mgp.get("other_names") or "",
+        "msc": str(mgp.get("MSC") or ""),
+        "thesis": [d.get("thesis_title") or "" for d in degrees],
+        "school": [s for d in degrees for s in (d.get("schools") or [])],
+        "country": countries,
+        "years": [y for y in years if y is not None],
+    }
+
+
+class SearchIndex:
+    """Inverted indexes over one dataset. Build once, query many times."""
+
+    def __init__(self):
+        self.postings = {field: defaultdict(set) for field in TEXT_FIELDS}
+        self.vocab = {}
+        self.trigrams = {}
+        self.msc = defaultdict(set)
+        self.years = []      # sorted years, parallel to year_ids
+        self.year_ids = []
+        self.rows = {}       # ID -> CSV row, so results don't need the full data
+        self.all_ids = set()
+
+    @classmethod
+    def from_data(cls, data):
+        """Build from a dict of records (raw dicts or Academic objects)."""
+        return cls.from_records(data.values())
+
+    @classmethod
+    def from_file(cls, path):
+        """Build by streaming a records file."""
+        return cls.from_records(record for _, record in record_store.iter_records(path))
+
+    @classmethod
+    def from_records(cls, records):
+        index = cls()
+        pairs = []
+        for record in records:
+            try:
+                fields = record_fields(record)
+            except (KeyError, TypeError, ValueError):
+                continue
+            acad_id = fields["id"]
+            index.all_ids.add(acad_id)
+
+            for field in TEXT_FIELDS:
+                values = fields[field]
+                for value in [values] if isinstance(values, str) else values:
+                    for token in tokenize(value):
+                        index.postings[field][token].add(acad_id)
+            if fields["msc"]:
+                index.msc[fields["msc"]].add(acad_id)
+            for year in set(fields["years"]):
+                pairs.append((year, acad_id))
+
+            index.rows[acad_id] = csv_row(fields)
+
+        pairs.sort()
+        index.years = [y for y, _ in pairs]
+        index.year_ids = [i for _, i in pairs]
+
+        for field in TEXT_FIELDS:
+            index.vocab[field] = sorted(index.postings[field])
+        for field in NAME_FIELDS:
+            grams = defaultdict(set)
+            for term in index.vocab[field]:
+                for gram in _trigrams(term):
+                    grams[gram].add(term)
+            index.trigrams[field] = grams
+        return index
+
+    # -------------------------------------------------------
+    # Term matching
+    # -------------------------------------------------------
+    def _prefix_terms(self, field, token):
+        vocab = self.vocab[field]
+        i = bisect.bisect_left(vocab, token)
+        terms = []
+        while i < len(vocab) and vocab[i].startswith(token):
+            terms.append(vocab[i])
+            i += 1
+        return terms
+
+    def _fuzzy_terms(self, field, token, cutoff=0.75):
+        grams = _trigrams(token)
+        shared = defaultdict(int)
+        for gram in grams:
+            for term in self.trigrams[field].get(gram, ()):
+                shared[term] += 1
+        # Only score terms sharing a reasonable share of trigrams
+        candidates = [t for t, n in shared.items() if n >= len(grams) // 2]
+        return difflib.get_close_matches(token, candidates, n=20, cutoff=cutoff)
+
+    def _match_token(self, field, token, match, last):
+        postings = self.postings[field]
+        if match == "exact":
+            terms = [token] if token in postings else []
+        elif match == "fuzzy" and field in self.trigrams:
+            terms = self._fuzzy_terms(field, token)
+            if last:
+                terms += [t for t in self._prefix_terms(field, token) if t not in terms]
+        elif last or match == "prefix":
+            terms = self._prefix_terms(field, token)
+        else:
+            terms = [token] if token in postings else []
+
+        if len(terms) == 1:
+            return postings[terms[0]]
+        result = set()
+        for term in terms:
+            result |= postings[term]
+        return result
+
+    def _match_text(self, field, value, match):
+        """IDs matching every token of value; the last token matches as a prefix."""
+        tokens = tokenize(value)
+        if not tokens:
+            return None
+        sets = [self._match_token(field, t, match, i == len(tokens) - 1)
+                for i, t in enumerate(tokens)]
+        sets.sort(key=len)
+        result = set(sets[0])
+        for s in sets[1:]:
+            result &= s
+            if not result:
+                break
+        return result
+
+    def _match_year(self, value):
+        """"1990" or a range "1990-2000"."""
+        parts = [p.strip() for p in str(value).split("-", 1)]
+        try:
+            low = int(parts[0]) if parts[0] else 0
+            high = int(parts[-1]) if parts[-1] else 9999
+        except ValueError:
+            return set()
+        lo = bisect.bisect_left(self.years, low)
+        hi = bisect.bisect_right(self.years, high)
+        return set(self.year_ids[lo:hi])
+
+    # -------------------------------------------------------
+    # Queries
+    # -------------------------------------------------------
+    def search_ids(self, match="prefix", **params):
+        """
+        Sorted list of IDs matching every given field (same fields as /search:
+        family_name, given_name, other_names, school, year, thesis, country, msc).
+
+        match is "exact", "prefix" or "fuzzy" and applies to text fields.
+        """
+        sets = []
+        for field, value in params.items():
+            if value in (None, ""):
+                continue
+            if field in TEXT_FIELDS:
+                found = self._match_text(field, value, match)
+            elif field == "year":
+                found = self._match_year(value)
+            elif field == "msc":
+                code = str(value).strip()
+                found = set()
+                for msc, ids in self.msc.items():
+                    if msc.startswith(code):
+                        found |= ids
+            else:
+                continue
+            if found is None:
+                continue
+            if not found:
+                return []
+            sets.append(found)
+
+        if not sets:
+            return []
+        sets.sort(key=len)
+        result = set(sets[0])
+        for s in sets[1:]:
+            result &= s
+        return sorted(result)
+
+    def search(self, format="json", match="prefix", **params):
+        """Same response body as /api/v2/MGP/search for the given format."""
+        ids = self.search_ids(match=match, **params)
+        if format.lower() == "csv":
+            return self.to_csv(ids)
+        return json.dumps(ids)
+
+    def to_csv(self, ids):
+        return format_csv(self.rows, ids)
+
+
+if __name__ == '__main__':
+    import time
+
+    profiling.from_argv("local_search")
+    if len(sys.argv) < 3:
+        print("Usage: python local_search.py merged.json field=value [field=value ...]")
+        sys.exit(1)
+
+    start = time.perf_counter()
+    with profiling.stage("index"):
+        index = SearchIndex.from_file(sys.argv[1])
+    print(f"Indexed {len(index.all_ids):,} academics in {time.perf_counter() - start:.2f}s",
+          file=sys.stderr)
+
+    query = dict(arg.split("=", 1) for arg in sys.argv[2:])
+    start = time.perf_counter()
+    with profiling.stage("query"):
+        result = index.search(**query)
+    print(f"Query took {(time.perf_counter() - start) * 1000:.3f} ms", file=sys.stderr)
+    print(result)
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Local equivalent of /api/v2/MGP/siblings.
+
+Academic siblings of X are the other students of X's advisors whose degree
+year is within +/- window years of X's. SiblingIndex precomputes, for each
+advisor, the students sorted by degree year, so a query is a bisect and an
+array slice per advisor. Students without a degree year always count.
+
+Responses match the API formats (JSON list of IDs or CSV) and can be
+checked against responses recorded from the live API:
+
+    python local_siblings.py record 1969 18231 ...
+    python local_siblings.py validate all_academics_merged_complete.json
+"""
+
+import bisect
+import csv
+import glob
+import io
+import json
+import os
+import sys
+from array import array
+from collections import defaultdict
+
+import academic_model
+import local_search
+import profiling
+import record_store
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), "..", "data", "fixtures", "siblings")
+
+
+class SiblingIndex:
+    """Per-advisor student lists sorted by degree year."""
+
+    def __init__(self):
+        self.advisors = {}       # academic ID -> tuple of advisor IDs
+        self.years = {}          # academic ID -> degree year or None
+        self.student_years = {}  # advisor ID -> array of years (sorted)
+        self.student_ids = {}    # advisor ID -> array of student IDs, parallel to years
+        self.undated = {}        # advisor ID -> tuple of students without a year
+        self.rows = {}           # academic ID -> CSV row
+
+    @classmethod
+    def from_data(cls, data):
+        return cls.from_records(data.values())
+
+    @classmethod
+    def from_file(cls, path):
+        return cls.from_records(record for _, record in record_store.iter_records(path))
+
+    @classmethod
+    def from_records(cls, records):
+        index = cls()
+        dated = defaultdict(list)
+        undated = defaultdict(list)
+
+        for record in records:
+            try:
+                fields = local_search.record_fields(record)
+            except (KeyError, TypeError, ValueError):
+                continue
+            acad_id = fields["id"]
+            if isinstance(record, academic_model.Academic):
+                advisors = record.advisor_ids
+            else:
+                advisors = academic_model.advisor_ids(record)
+            year = fields["years"][0] if fields["years"] else None
+
+            index.advisors[acad_id] = tuple(advisors)
+            index.years[acad_id] = year
+            index.rows[acad_id] = local_search.csv_row(fields)
+            for advisor_id in advisors:
+                if year is None:
+                    undated[advisor_id].append(acad_id)
+                else:
+                    dated[advisor_id].append((year, acad_id))
+
+        for advisor_id, students in dated.items():
+            students.sort()
+            index.student_years[advisor_id] = array('i', [y for y, _ in students])
+            index.student_ids[advisor_id] = array('i', [i for _, i in students])
+        for advisor_id, students in undated.items():
+            index.undated[advisor_id] = tuple(sorted(students))
+        return index
+
+    def siblings(self, acad_id, window=0):
+        """Sorted sibling IDs, or None if acad_id is not in the dataset."""
+        acad_id = int(acad_id)
+        if acad_id not in self.advisors:
+            return None
+        year = self.years[acad_id]
+
+        found = set()
+        for advisor_id in self.advisors[acad_id]:
+            ids = self.student_ids.get(advisor_id)
+            if ids is not None:
+                if year is None:
+                    found.update(ids)
+                else:
+                    years = self.student_years[advisor_id]
+                    lo = bisect.bisect_left(years, year - window)
+                    hi = bisect.bisect_right(years, year + window)
+                    found.update(ids[lo:hi])
+            found.update(self.undated.get(advisor_id, ()))
+
+        found.discard(acad_id)
+        return sorted(found)
+
+    def siblings_batch(self, acad_ids, window=0):
+        """{ID: sibling list} for many IDs in one call (None for unknown IDs)."""
+        return {int(acad_id): self.siblings(acad_id, window) for acad_id in acad_ids}
+
+    def response(self, acad_id, window=0, format="json"):
+        """Same body as /api/v2/MGP/siblings; None where the API answers 404."""
+        ids = self.siblings(acad_id, window)
+        if ids is None:
+            return None
+        if format.lower() == "csv":
+            return local_search.format_csv(self.rows, ids)
+        return json.dumps(ids)
+
+
+# -----------------------------------------------------------
+# Recorded API fixtures
+# -----------------------------------------------------------
+def _fixture_path(fixture_dir, acad_id, window, format):
+    return os.path.join(fixture_dir, f"siblings_{acad_id}_w{window}.{format.lower()}.json")
+
+
+def record_fixtures(acad_ids, token, windows=(0, 5), formats=("json", "csv"), fixture_dir=FIXTURE_DIR):
+    """
+    Query the live /siblings endpoint and save each response as a fixture.
+    token is the dict returned by mgp_query_example.login().
+    """
+    import mgp_query_example
+
+    os.makedirs(fixture_dir, exist_ok=True)
+    for acad_id in acad_ids:
+        for window in windows:
+            for format in formats:
+                params = {'id': acad_id, 'window': window, 'format': format}
+                body = mgp_query_example.doquery('/api/v2/MGP/siblings', token, params)
+                with open(_fixture_path(fixture_dir, acad_id, window, format), 'w') as f:
+                    json.dump({'params': params, 'response': body}, f, indent=2)
+                print(f"Recorded siblings of {acad_id} (window {window}, {format})")
+
+
+def _ids_from_body(body, format):
+    """Compare by sibling ID set; row order is not part of the contract."""
+    if format.lower() == "csv":
+        rows = list(csv.reader(io.StringIO(body)))
+        return sorted(int(row[0]) for row in rows[1:] if row and row[0].isdigit())
+    return sorted(int(i) for i in json.loads(body))
+
+
+def validate_fixtures(index, fixture_dir=FIXTURE_DIR):
+    """
+    Compare local answers with every recorded fixture.
+    Returns a list of (fixture file, expected IDs, local IDs) mismatches;
+    raises FileNotFoundError if no fixtures have been recorded, since a check
+    against nothing would pass vacuously.
+    """
+    mismatches = []
+    paths = sorted(glob.glob(os.path.join(fixture_dir, "siblings_*.json")))
+    if not paths:
+        raise FileNotFoundError(f"No recorded fixtures in {os.path.abspath(fixture_dir)}; "
+                                f"record some first with: python local_siblings.py record ID [ID ...]")
+    for path in paths:
+        with open(path, 'r') as f:
+            fixture = json.load(f)
+        params = fixture['params']
+        expected = _ids_from_body(fixture['response'], params['format'])
+        local = index.siblings(params['id'], int(params['window'])) or []
+        if expected != local:
+            mismatches.append((os.path.basename(path), expected, local))
+
+    print(f"Checked {len(paths)} fixtures: {len(paths) - len(mismatches)} match, "
+          f"{len(mismatches)} differ")
+    for name, expected, local in mismatches[:20]:
+        print(f"  {name}: API {expected[:10]} vs local {local[:10]}")
+    return mismatches
+
+
+if __name__ == '__main__':
+    profiling.from_argv("local_siblings")
+    if len(sys.argv) < 3 or sys.argv[1] not in ("record", "validate"):
+        print("Usage: python local_siblings.py record ID [ID ...]")
+        print("       python local_siblings.py validate merged.json")
+        sys.exit(1)
+
+    if sys.argv[1] == "record":
+        import mgp_query_example
+        token = mgp_query_example.login(mgp_query_example.getlogin())
+        record_fixtures([int(i) for i in sys.argv[2:]], token)
+    else:
+        print(f"Indexing {os.path.basename(sys.argv[2])}...")
+        with profiling.stage("index"):
+            index = SiblingIndex.from_file(sys.argv[2])
+        print(f"✓ Indexed {len(index.advisors):,} academics")
+        try:
+            with profiling.stage("validate"):
+                mismatches = validate_fixtures(index)
+        except FileNotFoundError as e:
+            print(f"✗ {e}")
+            sys.exit(1)
+        sys.exit(1 if mismatches else 0)
@@ -1,10 +1,26 @@
 #!/usr/bin/env python3
 
-import json
 import os
 import glob
 from pathlib import Path
 
+import profiling
+import record_store
+import sqlite_store
+
+def find_checkpoint_files(cache_dir="mgp_cache"):
+    """Checkpoint files (.json or .json.zst) in cache_dir, sorted by name."""
+    checkpoint_pattern = os.path.join(cache_dir, "checkpoint_*.json*")
+    return sorted(f for f in glob.glob(checkpoint_pattern)
+                  if f.endswith('.json') or f.endswith('.json.zst'))
+
+def find_all_academics_file(cache_dir="mgp_cache"):
+    """all_academics.json (or .json.zst) from cache_mgp.py, or None."""
+    all_academics_file = os.path.join(cache_dir, "all_academics.json")
+    if not os.path.exists(all_academics_file):
+        all_academics_file += ".zst"
+    return all_academics_file if os.path.exists(all_academics_file) else None
+
 def merge_checkpoints(cache_dir="mgp_cache", output_file="all_academics_merged.json"):
     """
     Merge all checkpoint files, removing duplicates.
@@ -15,8 +31,7 @@ def merge_checkpoints(cache_dir="mgp_cache", output_file="all_academics_merged.j
     print(f"Looking in: {cache_dir}/\n")
     
     # Find all checkpoint files
-    checkpoint_pattern = os.path.join(cache_dir, "checkpoint_*.json")
-    checkpoint_files = sorted(glob.glob(checkpoint_pattern))
+    checkpoint_files = find_checkpoint_files(cache_dir)
     
     if not checkpoint_files:
         print(" No checkpoint files found!")
@@ -35,15 +50,16 @@ def merge_checkpoints(cache_dir="mgp_cache", output_file="all_academics_merged.j
     # Process each checkpoint file
     for i, checkpoint_file in enumerate(checkpoint_files, 1):
         try:
-            with open(checkpoint_file, 'r') as f:
-                data = json.load(f)
+            with profiling.stage("load"):
+                data = record_store.load_records(checkpoint_file)
             
             # Count academics before merging
             before_count = len(all_academics)
             
             # Merge the data (dict keys ensure no duplicates)
             if isinstance(data, dict):
-                all_academics.update(data)
+                with profiling.stage("merge"):
+                    all_academics.update(data)
             
             # Count how many new ones were added
             new_count = len(all_academics) - before_count
@@ -58,14 +74,15 @@ def merge_checkpoints(cache_dir="mgp_cache", output_file="all_academics_merged.j
             continue
     
     # Also merge all_academics.json if it exists
-    all_academics_file = os.path.join(cache_dir, "all_academics.json")
-    if os.path.exists(all_academics_file):
+    all_academics_file = find_all_academics_file(cache_dir)
+    if all_academics_file:
         print(f"\nMerging existing all_academics.json...")
         try:
-            with open(all_academics_file, 'r') as f:
-                existing_data = json.load(f)
+            with profiling.stage("load"):
+                existing_data = record_store.load_records(all_academics_file)
             before_count = len(all_academics)
-            all_academics.update(existing_data)
+            with profiling.stage("merge"):
+                all_academics.update(existing_data)
             new_count = len(all_academics) - before_count
             print(f"  Added {new_count} additional records from all_academics.json")
         except Exception as e:
@@ -75,8 +92,8 @@ def merge_checkpoints(cache_dir="mgp_cache", output_file="all_academics_merged.j
     output_path = os.path.join(cache_dir, output_file)
     print(f"\nSaving merged data to: {output_file}")
     
-    with open(output_path, 'w') as f:
-        json.dump(all_academics, f, indent=2)
+    with profiling.stage("dump"):
+        record_store.write_records(all_academics, output_path)
     
     file_size = os.path.getsize(output_path) / (1024 * 1024)
     
@@ -95,32 +112,40 @@ def merge_checkpoints(cache_dir="mgp_cache", output_file="all_academics_merged.j
     
     return all_academics
 
-def find_gaps(cache_dir="mgp_cache"):
+def find_gaps(cache_dir="mgp_cache", merged_file="all_academics_merged.json"):
     """
     Find missing ID ranges in your cached data.
     """
-    all_academics_file = os.path.join(cache_dir, "all_academics_merged.json")
+    all_academics_file = os.path.join(cache_dir, merged_file)
     
     if not os.path.exists(all_academics_file):
         print("Run merge_checkpoints() first!")
         return
     
-    with open(all_academics_file, 'r') as f:
-        data = json.load(f)
-    
-    ids = sorted([int(id) for id in data.keys()])
-    
     print(f"\n=== Finding Gaps ===")
-    print(f"Analyzing {len(ids)} IDs from {ids[0]} to {ids[-1]}")
     
-    # Find gaps
-    gaps = []
-    for i in range(len(ids) - 1):
-        if ids[i+1] - ids[i] > 1:
-            gap_start = ids[i] + 1
-            gap_end = ids[i+1] - 1
-            gap_size = gap_end - gap_start + 1
-            gaps.append((gap_start, gap_end, gap_size))
+    if record_store.is_sqlite(all_academics_file):
+        # Indexed query, no need to load the records
+        min_id, max_id, count = sqlite_store.coverage(all_academics_file)
+        print(f"Analyzing {count} IDs from {min_id} to {max_id}")
+        gaps = [(start, end, end - start + 1)
+                for start, end in sqlite_store.gap_ranges(all_academics_file)]
+    else:
+        with profiling.stage("load"):
+            data = record_store.load_records(all_academics_file)
+        
+        ids = sorted([int(id) for id in data.keys()])
+        
+        print(f"Analyzing {len(ids)} IDs from {ids[0]} to {ids[-1]}")
+        
+        # Find gaps
+        gaps = []
+        for i in range(len(ids) - 1):
+            if ids[i+1] - ids[i] > 1:
+                gap_start = ids[i] + 1
+                gap_end = ids[i+1] - 1
+                gap_size = gap_end - gap_start + 1
+                gaps.append((gap_start, gap_end, gap_size))
     
     if gaps:
         print(f"\nFound {len(gaps)} gaps:")
@@ -139,6 +164,8 @@ def find_gaps(cache_dir="mgp_cache"):
         print("\nNo gaps found! Complete sequential coverage.")
 
 if __name__ == '__main__':
+    profiling.from_argv("merge_checkpoints")
+    
     # Merge all checkpoints
     merged_data = merge_checkpoints(cache_dir="mgp_cache")
     
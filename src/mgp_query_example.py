@@ -90,6 +90,8 @@ if __name__ == '__main__':
                          'given_name' : 'M',
                          'format' : 'csv'
                          }
+    # With the full cache downloaded, local_search.SearchIndex answers the
+    # same queries offline and returns the same JSON/CSV shapes.
     endpoint = '/api/v2/MGP/search'
 
     # To get CSV, run the query with searchparams as above
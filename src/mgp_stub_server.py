@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the MGP API (mathgenealogy.org:8000), for benchmarks.
+
+Serves /login, /api/v2/MGP/acad, /acad/range, /search and /siblings from an
+in-memory dataset with configurable latency and error rate. IDs missing
+from the dataset return 404, so a synthetic dataset from synthetic_data.py
+reproduces the 404 density seen in the real crawl. /search and /siblings
+are answered by local_search.SearchIndex and local_siblings.SiblingIndex.
+
+/acad and /acad/range honour Accept-Encoding: gzip and, with validators=True,
+send an ETag (hash of the body) and Last-Modified and answer matching
+conditional requests with 304, so re-crawls through http_cache can be tested.
+"""
+
+import email.utils
+import gzip
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import local_search
+import local_siblings
+
+STUB_TOKEN = "stub-token"
+ERROR_STATUSES = [500, 502, 503, 429]
+GZIP_MIN_BYTES = 256
+
+
+class MGPStubHandler(BaseHTTPRequestHandler):
+    """Request handler; configuration lives on the server object."""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body, content_type="application/json", headers=None):
+        payload = body.encode("utf-8") if isinstance(body, str) else body
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _send_record_body(self, body):
+        """200 for record data, with validators, 304 handling and gzip."""
+        server = self.server
+        payload = body.encode("utf-8")
+        headers = {}
+        if server.validators:
+            etag = '"' + hashlib.blake2b(payload, digest_size=8).hexdigest() + '"'
+            headers = {"ETag": etag, "Last-Modified": server.last_modified}
+            if_none_match = self.headers.get("If-None-Match")
+            if if_none_match is not None:
+                not_modified = etag in [t.strip() for t in if_none_match.split(",")]
+            else:
+                not_modified = self.headers.get("If-Modified-Since") == server.last_modified
+            if not_modified:
+                self.send_response(304)
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+        if server.compress and len(payload) >= GZIP_MIN_BYTES and \
+                "gzip" in (self.headers.get("Accept-Encoding") or ""):
+            payload = gzip.compress(payload, compresslevel=6)
+            headers["Content-Encoding"] = "gzip"
+            headers["Vary"] = "Accept-Encoding"
+        self._send(200, payload, headers=headers)
+
+    def _simulate(self):
+        """Apply latency and random failures. Returns True if a failure was sent."""
+        server = self.server
+        if server.latency:
+            time.sleep(max(0.0, server.rng.gauss(server.latency, server.latency * server.jitter)))
+        if server.error_rate and server.rng.random() < server.error_rate:
+            status = server.rng.choice(ERROR_STATUSES)
+            headers = {"Retry-After": "1"} if status in (429, 503) else None
+            self._send(status, json.dumps({"error": "simulated failure"}), headers=headers)
+            return True
+        return False
+
+    def do_POST(self):
+        if urlparse(self.path).path != "/login":
+            self._send(404, json.dumps({"error": "not found"}))
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        self.rfile.read(length)
+        if self._simulate():
+            return
+        self._send(200, json.dumps({"token": STUB_TOKEN}))
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        server = self.server
+        server.count_request()
+
+        if self.headers.get("x-access-token") != STUB_TOKEN:
+            self._send(401, json.dumps({"error": "invalid token"}))
+            return
+        if self._simulate():
+            return
+
+        data = server.data
+        as_csv = params.get("format", "json").lower() == "csv"
+
+        if url.path == "/api/v2/MGP/acad":
+            record = data.get(str(params.get("id", "")))
+            if record is None:
+                self._send(404, json.dumps({"error": "academic not found"}))
+            else:
+                self._send_record_body(json.dumps(record))
+
+        elif url.path == "/api/v2/MGP/acad/range":
+            try:
+                start = int(params.get("start", 1))
+                stop = int(params.get("stop", start + 1))
+                step = max(1, int(params.get("step", 1)))
+            except ValueError:
+                self._send(400, json.dumps({"error": "start, stop and step must be integers"}))
+                return
+            records = [data[str(i)] for i in range(start, stop, step) if str(i) in data]
+            self._send_record_body(json.dumps(records))
+
+        elif url.path == "/api/v2/MGP/search":
+            query = {k: v for k, v in params.items() if k != "format"}
+            ids = server.search_index().search_ids(**query)
+            if as_csv:
+                self._send(200, server.search_index().to_csv(ids), content_type="text/csv")
+            else:
+                self._send(200, json.dumps(ids))
+
+        elif url.path == "/api/v2/MGP/siblings":
+            try:
+                ids = server.sibling_index().siblings(params.get("id", 0), int(params.get("window", 0)))
+            except ValueError:
+                self._send(400, json.dumps({"error": "id and window must be integers"}))
+                return
+            if ids is None:
+                self._send(404, json.dumps({"error": "academic not found"}))
+            elif as_csv:
+                self._send(200, server.search_index().to_csv(ids), content_type="text/csv")
+            else:
+                self._send(200, json.dumps(ids))
+
+        else:
+            self._send(404, json.dumps({"error": "unknown endpoint"}))
+
+
+class MGPStubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, data, latency=0.0, jitter=0.25, error_rate=0.0, seed=0,
+                 compress=True, validators=True):
+        super().__init__(address, MGPStubHandler)
+        self.data = data
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.compress = compress
+        self.validators = validators
+        self.last_modified = email.utils.formatdate(usegmt=True)
+        self.rng = random.Random(seed)
+        self.request_count = 0
+        self._lock = threading.Lock()
+        self._index = None
+        self._siblings = None
+
+    def count_request(self):
+        with self._lock:
+            self.request_count += 1
+
+    def search_index(self):
+        """Built on first use, as most benchmarks never call /search."""
+        with self._lock:
+            if self._index is None:
+                self._index = local_search.SearchIndex.from_data(self.data)
+            return self._index
+
+    def sibling_index(self):
+        with self._lock:
+            if self._siblings is None:
+                self._siblings = local_siblings.SiblingIndex.from_data(self.data)
+            return self._siblings
+
+
+def start_server(data, host="127.0.0.1", port=0, latency=0.0, error_rate=0.0, seed=0,
+                 compress=True, validators=True):
+    """
+    Start the stub server in a background thread.
+
+    Args:
+        data: Dataset keyed by stringified ID (e.g. from synthetic_data)
+        port: 0 picks a free port; read it back from server.server_address
+        latency: Mean seconds added to every response
+        error_rate: Fraction of requests answered with 5xx/429
+        compress: gzip record responses when the client accepts it
+        validators: send ETag/Last-Modified and answer conditional requests with 304
+
+    Returns the server; call server.shutdown() when done.
+    """
+    server = MGPStubServer((host, port), data, latency=latency, error_rate=error_rate, seed=seed,
+                           compress=compress, validators=validators)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+if __name__ == '__main__':
+    import synthetic_data
+
+    dataset = synthetic_data.generate_dataset(n_records=5000, seed=0)
+    server = MGPStubServer(("127.0.0.1", 8000), dataset, latency=0.05, error_rate=0.01)
+    print(f"Serving {len(dataset):,} synthetic academics on http://127.0.0.1:8000")
+    print(f"Use token: {STUB_TOKEN}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
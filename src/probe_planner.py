@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Plan which ID ranges to fetch instead of sweeping every ID up to max_id.
+
+The ID space is split into buckets (1000 IDs). For each bucket the planner
+counts IDs already known to exist (a records file), IDs known not to exist
+(ids_not_found*.json from download_missing_ids.py and ids_probed_empty.json
+written after planned runs) and estimates the share of still-unobserved IDs
+that exist, smoothed towards the overall density:
+
+    dense buckets    every unobserved ID is fetched
+    sparse buckets   a few random probe batches (negative-cache IDs included,
+                     as a 404 can go stale), so records appearing in an
+                     "empty" stretch are noticed and the next plan sweeps it
+    beyond the max   /search for recent degree years finds real IDs above
+                     the highest known one; buckets up to the highest found
+                     ID are planned like any other
+
+Batches cover target IDs greedily, so a batch of batch_size IDs is only
+spent where at least one target falls.
+
+Usage:
+    python probe_planner.py plan mgp_cache/all_academics_merged_complete.json [mgp_cache] [max_id]
+    python probe_planner.py run mgp_cache/fetch_plan.json
+"""
+
+import glob
+import hashlib
+import json
+import os
+import random
+import sys
+import time
+from array import array
+
+import cache_mgp
+import profiling
+import record_schema
+import record_store
+import sqlite_store
+
+BUCKET_SIZE = 1000
+BATCH_SIZE = 10
+DENSE_THRESHOLD = 0.05     # expected share of unobserved IDs that exist
+PROBES_PER_BUCKET = 2      # probe batches in a sparse bucket
+PRIOR_WEIGHT = 20          # pseudo-observations pulling buckets towards the global density
+PROBED_EMPTY_FILE = "ids_probed_empty.json"
+PLAN_FILE = "fetch_plan.json"
+
+
+# -----------------------------------------------------------
+# Observations
+# -----------------------------------------------------------
+def load_known_ids(records_file):
+    """Sorted array of the IDs present in a records file."""
+    if record_store.is_sqlite(records_file):
+        ids = sqlite_store.record_ids(records_file)
+    else:
+        ids = (key for key, _ in record_store.iter_records(records_file))
+    return array('i', sorted(int(i) for i in ids))
+
+
+def load_negative_cache(cache_dir):
+    """IDs known not to exist: ids_not_found*.json plus probed-empty IDs."""
+    not_found = set()
+    paths = glob.glob(os.path.join(cache_dir, "ids_not_found*.json"))
+    paths.append(os.path.join(cache_dir, PROBED_EMPTY_FILE))
+    for path in paths:
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                not_found.update(int(i) for i in json.load(f))
+    return not_found
+
+
+def discover_ids(years, known_max):
+    """IDs above known_max returned by /search for the given degree years."""
+    found = set()
+    for year in years:
+        try:
+            ids = json.loads(cache_mgp.doquery('/api/v2/MGP/search', {'year': year}, timeout=60))
+        except Exception as e:
+            print(f"  /search year={year} failed: {e}")
+            continue
+        found.update(int(i) for i in ids if int(i) > known_max)
+    return sorted(found)
+
+
+# -----------------------------------------------------------
+# Planning
+# -----------------------------------------------------------
+def bucket_stats(known_ids, not_found, max_id, bucket_size=BUCKET_SIZE, extra_found=()):
+    """
+    Per-bucket counts: found, not_found, the unobserved IDs and the estimated
+    density of records among them.
+    """
+    n_buckets = max_id // bucket_size + 1
+    found = [0] * n_buckets
+    missing = [0] * n_buckets
+    present = set(known_ids)
+    present.update(extra_found)
+    for acad_id in present:
+        if acad_id <= max_id:
+            found[acad_id // bucket_size] += 1
+    for acad_id in not_found:
+        if acad_id <= max_id and acad_id not in present:
+            missing[acad_id // bucket_size] += 1
+
+    observed = sum(found) + sum(missing)
+    global_density = sum(found) / observed if observed else 0.5
+
+    buckets = []
+    for b in range(n_buckets):
+        start = max(1, b * bucket_size)
+        stop = min((b + 1) * bucket_size, max_id + 1)
+        seen = found[b] + missing[b]
+        density = (found[b] + PRIOR_WEIGHT * global_density) / (seen + PRIOR_WEIGHT)
+        buckets.append({"start": start, "stop": stop, "found": found[b], "not_found": missing[b],
+                        "unobserved": (stop - start) - seen, "density": density})
+    return buckets, present
+
+
+def cover(ids, batch_size=BATCH_SIZE, limit=None):
+    """Greedy (start, stop) batches covering sorted ids, none reaching past limit."""
+    batches = []
+    for acad_id in ids:
+        if not batches or acad_id >= batches[-1][1]:
+            batches.append([acad_id, acad_id + batch_size])
+    if limit is None:
+        return [(start, stop) for start, stop in batches]
+    return [(start, min(stop, limit)) for start, stop in batches]
+
+
+def plan_fetch(known_ids, not_found, max_id, discovered=(), batch_size=BATCH_SIZE,
+               dense_threshold=DENSE_THRESHOLD, probes=PROBES_PER_BUCKET, seed=0):
+    """
+    Returns (batches, summary). batches are sorted, non-overlapping
+    (start, stop) ranges up to max_id; summary compares the plan with a blind sweep.
+    """
+    rng = random.Random(seed)
+    max_id = max([max_id] + list(discovered))
+    buckets, present = bucket_stats(known_ids, not_found, max_id, extra_found=discovered)
+
+    batches = []
+    dense = sparse = expected = 0
+    for bucket in buckets:
+        if bucket["density"] >= dense_threshold:
+            if not bucket["unobserved"]:
+                continue
+            targets = [i for i in range(bucket["start"], bucket["stop"])
+                       if i not in present and i not in not_found]
+            dense += 1
+            expected += bucket["density"] * len(targets)
+            batches.extend(cover(targets, batch_size, bucket["stop"]))
+        else:
+            # Probes may land on negative-cache IDs too: a 404 can go stale
+            candidates = [i for i in range(bucket["start"], bucket["stop"]) if i not in present]
+            if not candidates:
+                continue
+            sparse += 1
+            sample = sorted(rng.sample(candidates, min(probes, len(candidates))))
+            batches.extend(cover(sample, batch_size, bucket["stop"]))
+
+    summary = {
+        "max_id": max_id,
+        "known": len(known_ids),
+        "not_found": len(not_found),
+        "discovered": len(discovered),
+        "dense_buckets": dense,
+        "sparse_buckets": sparse,
+        "planned_requests": len(batches),
+        "sweep_requests": (max_id + batch_size - 1) // batch_size,
+        "expected_new_records": round(expected),
+    }
+    return batches, summary
+
+
+def make_plan(records_file, cache_dir="mgp_cache", max_id=None, search_years=None, **plan_args):
+    """Build a plan from a records file and the negative cache, and save it to fetch_plan.json."""
+    print(f"Loading known IDs from {os.path.basename(records_file)}...")
+    with profiling.stage("load"):
+        known_ids = load_known_ids(records_file)
+        not_found = load_negative_cache(cache_dir)
+    known_max = known_ids[-1] if known_ids else 0
+    print(f"  {len(known_ids):,} known IDs (max {known_max:,}), {len(not_found):,} known missing")
+
+    if search_years is None:
+        this_year = time.localtime().tm_year
+        search_years = range(this_year - 2, this_year + 1)
+    with profiling.stage("fetch"):
+        discovered = discover_ids(search_years, known_max) if search_years else []
+    if discovered:
+        print(f"  /search found {len(discovered):,} IDs above the known max (up to {discovered[-1]:,})")
+
+    with profiling.stage("plan"):
+        batches, summary = plan_fetch(known_ids, not_found, max_id or known_max, discovered, **plan_args)
+    plan_file = os.path.join(cache_dir, PLAN_FILE)
+    with open(plan_file, 'w') as f:
+        json.dump({"summary": summary, "batches": batches}, f)
+
+    print(f"\nPlan: {summary['planned_requests']:,} requests instead of {summary['sweep_requests']:,} "
+          f"({summary['dense_buckets']} dense buckets swept, {summary['sparse_buckets']} sparse buckets probed)")
+    print(f"Expected new records: ~{summary['expected_new_records']:,}")
+    print(f"Saved to: {plan_file}")
+    return batches, summary
+
+
+def run_plan(plan_file, output_dir=None, **cache_args):
+    """
+    Fetch a saved plan with cache_mgp (run_name "plan", so checkpoints are
+    picked up by merge_checkpoints.py). An interrupted run of the same plan
+    is resumed; any other plan starts from its first batch. IDs missing from
+    batches answered in this run are added to ids_probed_empty.json for the
+    next plan, except those that were quarantined as malformed.
+    """
+    output_dir = output_dir or os.path.dirname(plan_file) or "."
+    with open(plan_file, 'r') as f:
+        batches = [tuple(b) for b in json.load(f)["batches"]]
+    if not batches:
+        print("Plan is empty, nothing to fetch.")
+        return
+
+    tag = hashlib.blake2b(json.dumps(batches).encode(), digest_size=8).hexdigest()
+    answered = cache_mgp.cache_all_academics(output_dir=output_dir, batches=batches, run_name="plan",
+                                             progress_tag=tag, **cache_args)
+
+    empty_file = os.path.join(output_dir, PROBED_EMPTY_FILE)
+    empty = set()
+    if os.path.exists(empty_file):
+        with open(empty_file, 'r') as f:
+            empty = set(json.load(f))
+    before = len(empty)
+    quarantined = record_schema.quarantined_ids(os.path.join(output_dir, "plan_quarantine.jsonl"))
+    for (start, stop), found in answered.items():
+        found = set(found) | quarantined
+        empty.update(i for i in range(start, stop) if str(i) not in found)
+        empty.difference_update(int(i) for i in found if i.isdigit())
+    with open(empty_file, 'w') as f:
+        json.dump(sorted(empty), f)
+    print(f"{len(empty) - before:,} probed IDs recorded as empty in {PROBED_EMPTY_FILE}")
+
+
+if __name__ == '__main__':
+    profiling.from_argv("probe_planner")
+    if len(sys.argv) >= 3 and sys.argv[1] == "plan":
+        make_plan(sys.argv[2],
+                  cache_dir=sys.argv[3] if len(sys.argv) > 3 else "mgp_cache",
+                  max_id=int(sys.argv[4]) if len(sys.argv) > 4 else None)
+    elif len(sys.argv) >= 3 and sys.argv[1] == "run":
+        run_plan(sys.argv[2])
+    else:
+        print(__doc__)
+        sys.exit(1)
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+--profile mode shared by the src/ entry points.
+
+A script calls profiling.from_argv("<name>") first thing in its __main__
+block and wraps its logical steps in `with profiling.stage("load"):` and the
+like. Without --profile on the command line stage() does nothing. With it:
+
+    - the whole run is profiled with cProfile; cProfile and stages cover
+      the main thread only (stage() is a no-op in other threads)
+    - every stage records wall time, CPU time (process-wide, so worker
+      threads count) and the peak memory traced by tracemalloc while it ran;
+      a stage entered several times is summed (peak: the largest)
+    - at exit <dir>/<name>.prof (for `python -m pstats` or snakeviz) and
+      <dir>/<name>.json (stage table plus the slowest functions) are written
+    - if <dir>/<name>.json already existed, each stage is compared with it and
+      stages that got noticeably slower or bigger are flagged as regressions
+
+--profile writes to ./profiles, --profile=DIR elsewhere. tracemalloc slows
+allocation-heavy code down considerably, so compare profiled runs with
+profiled runs only.
+
+Usage: python profiling.py profiles/merge_checkpoints.json [older.json]
+"""
+
+import atexit
+import contextlib
+import cProfile
+import json
+import os
+import platform
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+
+DEFAULT_DIR = "profiles"
+TOP_FUNCTIONS = 25
+# A stage regresses when it is both this much slower/bigger relatively...
+REGRESSION_RATIO = 1.2
+# ...and by at least this much in absolute terms (noise on short stages)
+MIN_TIME_DELTA = 0.05      # seconds
+MIN_MEMORY_DELTA = 1.0     # MB
+
+MB = 1024 * 1024
+
+_session = None
+
+
+class ProfileSession:
+    def __init__(self, name, output_dir=DEFAULT_DIR):
+        self.name = name
+        self.output_dir = output_dir
+        self.stages = {}
+        # [name, running max of the traced peak] for the run and each open stage
+        self._stack = [["", 0]]
+        self.profiler = cProfile.Profile()
+        self.start_wall = time.perf_counter()
+        self.start_cpu = time.process_time()
+        tracemalloc.start()
+        self.profiler.enable()
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        # Nested stages are reported as "outer/inner"
+        full_name = "/".join([s[0] for s in self._stack[1:]] + [name])
+        self._stack[-1][1] = max(self._stack[-1][1], tracemalloc.get_traced_memory()[1])
+        tracemalloc.reset_peak()
+        self._stack.append([name, 0])
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+            _, frame = self._stack.pop()
+            peak = max(frame, tracemalloc.get_traced_memory()[1])
+            self._stack[-1][1] = max(self._stack[-1][1], peak)
+            entry = self.stages.setdefault(full_name, {"calls": 0, "wall_s": 0.0, "cpu_s": 0.0, "peak_mb": 0.0})
+            entry["calls"] += 1
+            entry["wall_s"] += wall
+            entry["cpu_s"] += cpu
+            entry["peak_mb"] = max(entry["peak_mb"], peak / MB)
+
+    def summary(self):
+        stats = pstats.Stats(self.profiler)
+        functions = []
+        for (filename, line, func), (_, calls, tottime, cumtime, _) in stats.stats.items():
+            functions.append({"function": f"{os.path.basename(filename)}:{line}({func})",
+                              "calls": calls, "tottime_s": tottime, "cumtime_s": cumtime})
+        functions.sort(key=lambda f: f["cumtime_s"], reverse=True)
+        return {
+            "name": self.name,
+            "argv": sys.argv[1:],
+            "python": platform.python_version(),
+            "timestamp": time.strftime('%Y-%m-%d %H:%M:%S'),
+            "total": {"wall_s": time.perf_counter() - self.start_wall,
+                      "cpu_s": time.process_time() - self.start_cpu,
+                      "peak_mb": max(self._stack[0][1], tracemalloc.get_traced_memory()[1]) / MB},
+            "stages": self.stages,
+            "top_functions": functions[:TOP_FUNCTIONS],
+        }
+
+    def finish(self):
+        self.profiler.disable()
+        summary = self.summary()
+        tracemalloc.stop()
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        prof_path = os.path.join(self.output_dir, f"{self.name}.prof")
+        json_path = os.path.join(self.output_dir, f"{self.name}.json")
+        previous = None
+        if os.path.exists(json_path):
+            with open(json_path, 'r') as f:
+                previous = json.load(f)
+        if previous:
+            summary["regressions"] = compare(previous, summary)
+
+        self.profiler.dump_stats(prof_path)
+        with open(json_path, 'w') as f:
+            json.dump(summary, f, indent=2)
+
+        print_report(summary, previous)
+        print(f"Profile: {prof_path}, summary: {json_path}")
+
+
+# -----------------------------------------------------------
+# Module-level API
+# -----------------------------------------------------------
+def start(name, output_dir=DEFAULT_DIR):
+    """Start profiling this process; the report is written at exit."""
+    global _session
+    if _session is None:
+        _session = ProfileSession(name, output_dir)
+        atexit.register(_finish)
+    return _session
+
+
+def _finish():
+    global _session
+    if _session is not None:
+        session, _session = _session, None
+        session.finish()
+
+
+def from_argv(name):
+    """
+    Start profiling if --profile[=DIR] is on the command line. The flag is
+    removed from sys.argv so positional argument parsing is unaffected.
+    """
+    for arg in sys.argv[1:]:
+        if arg == "--profile" or arg.startswith("--profile="):
+            sys.argv.remove(arg)
+            return start(name, arg.partition("=")[2] or DEFAULT_DIR)
+    return None
+
+
+def stage(name):
+    """Context manager timing one stage; a no-op unless profiling is on."""
+    if _session is None or threading.current_thread() is not threading.main_thread():
+        return contextlib.nullcontext()
+    return _session.stage(name)
+
+
+# -----------------------------------------------------------
+# Reports
+# -----------------------------------------------------------
+def compare(previous, current):
+    """Stages (and the total) that got slower or bigger than in `previous`."""
+    regressions = []
+    rows = [("total", previous.get("total", {}), current["total"])]
+    rows += [(name, previous.get("stages", {}).get(name), stats)
+             for name, stats in current["stages"].items()]
+    for name, before, after in rows:
+        if not before:
+            continue
+        for metric, min_delta in (("wall_s", MIN_TIME_DELTA), ("cpu_s", MIN_TIME_DELTA),
+                                  ("peak_mb", MIN_MEMORY_DELTA)):
+            old, new = before.get(metric, 0), after[metric]
+            if new - old >= min_delta and new > old * REGRESSION_RATIO:
+                regressions.append({"stage": name, "metric": metric, "previous": old, "current": new,
+                                    "ratio": new / old if old else None})
+    return regressions
+
+
+def print_report(summary, previous=None):
+    print(f"\n=== Profile: {summary['name']} ===")
+    print(f"{'stage':<24} {'calls':>6} {'wall s':>9} {'cpu s':>9} {'peak MB':>9}")
+    rows = list(summary["stages"].items()) + [("total", dict(summary["total"], calls=1))]
+    for name, s in rows:
+        print(f"{name:<24} {s['calls']:>6} {s['wall_s']:>9.2f} {s['cpu_s']:>9.2f} {s['peak_mb']:>9.1f}")
+
+    if previous is None:
+        return
+    if previous.get("argv") != summary["argv"]:
+        print(f"Note: previous run ({previous.get('timestamp')}) had different arguments: "
+              f"{' '.join(previous.get('argv', []))}")
+    regressions = summary.get("regressions") or []
+    if not regressions:
+        print(f"No regressions against the previous run ({previous.get('timestamp')}).")
+        return
+    print(f"⚠ {len(regressions)} regression(s) against the previous run ({previous.get('timestamp')}):")
+    for r in regressions:
+        ratio = f"{r['ratio']:.2f}x" if r["ratio"] else "new"
+        print(f"  {r['stage']} {r['metric']}: {r['previous']:.2f} → {r['current']:.2f} ({ratio})")
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    with open(sys.argv[1], 'r') as f:
+        current = json.load(f)
+    older = None
+    if len(sys.argv) > 2:
+        with open(sys.argv[2], 'r') as f:
+            older = json.load(f)
+        current["regressions"] = compare(older, current)
+    print_report(current, older)
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Record-store deltas: which academics were added, changed or removed between
+two versions of a records file.
+
+diff_records() streams both versions and keeps only a content hash per ID
+of the old one, so it never holds two full datasets in memory. A Delta is
+saved as JSON:
+
+    {"added": {id: record}, "changed": {id: record}, "removed": [id, ...]}
+
+Derived data (aggregate_cube.py, genealogy_graph.py) applies a delta
+instead of being rebuilt from the whole dataset.
+
+Usage: python record_delta.py old.json new.json [delta.json]
+"""
+
+import hashlib
+import json
+import os
+import sys
+
+import profiling
+import record_store
+
+
+def record_hash(record):
+    """Content hash of one record, independent of key order."""
+    body = json.dumps(record, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.blake2b(body.encode('utf-8'), digest_size=16).digest()
+
+
+class Delta:
+    def __init__(self, added=None, changed=None, removed=None):
+        self.added = added or {}
+        self.changed = changed or {}
+        self.removed = sorted(removed or [], key=int)
+
+    def __len__(self):
+        return len(self.added) + len(self.changed) + len(self.removed)
+
+    @property
+    def upserts(self):
+        """Added and changed records together, {str ID: record}."""
+        return {**self.added, **self.changed}
+
+    def summary(self):
+        return f"{len(self.added):,} added, {len(self.changed):,} changed, {len(self.removed):,} removed"
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            json.dump({"added": self.added, "changed": self.changed, "removed": self.removed}, f)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r') as f:
+            data = json.load(f)
+        return cls(data.get("added"), data.get("changed"), data.get("removed"))
+
+
+def diff_records(old_file, new_file):
+    """Delta turning the records of old_file into those of new_file."""
+    old_hashes = {key: record_hash(record) for key, record in record_store.iter_records(old_file)}
+    added, changed = {}, {}
+    seen = set()
+    for key, record in record_store.iter_records(new_file):
+        seen.add(key)
+        before = old_hashes.get(key)
+        if before is None:
+            added[key] = record
+        elif before != record_hash(record):
+            changed[key] = record
+    return Delta(added, changed, old_hashes.keys() - seen)
+
+
+if __name__ == '__main__':
+    profiling.from_argv("record_delta")
+    if len(sys.argv) < 3:
+        print(__doc__)
+        sys.exit(1)
+    output = sys.argv[3] if len(sys.argv) > 3 else record_store.base_name(sys.argv[2]) + "_delta.json"
+    with profiling.stage("diff"):
+        delta = diff_records(sys.argv[1], sys.argv[2])
+    with profiling.stage("dump"):
+        delta.save(output)
+    print(f"{os.path.basename(sys.argv[2])}: {delta.summary()} → {output}")
@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+Ingest-time validation and normalisation of MGP academic records.
+
+normalise_record() checks a record against the shape the tools rely on and
+returns a cleaned copy in the same walk:
+
+    MGP_academic.ID            int (required; becomes the record key)
+    given/other/family_name    trimmed strings
+    MSC                        string
+    degrees[].schools          list of canonical school strings: Unicode NFC,
+                               whitespace collapsed and trimmed, duplicates and
+                               placeholders ("unknown", "none", ...) dropped
+    degrees[].country          list of trimmed strings; when it is parallel to
+                               schools, entries are dropped together with
+                               their school so the pairing holds
+    degrees[].dropped_schools  the placeholder strings taken out of schools,
+                               kept so nothing is lost silently
+    degrees[].advised by       {"1": id, "2": id, ...} with int IDs
+    descendants.advisees       list of int IDs
+    descendants.descendant_count  int
+
+Fields the schema does not know are kept as they are. A record that does not
+fit raises SchemaError with the path of the offending field; the batch and
+file helpers put such records in a quarantine file (one JSON object per line)
+instead of dropping them silently.
+
+When msgspec is installed it is used to decode raw response bodies, which is
+noticeably faster than json.loads; validation is the same either way.
+
+Usage: python record_schema.py all_academics_merged.json [output.json]
+"""
+
+import json
+import os
+import re
+import sys
+import unicodedata
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+import profiling
+import record_store
+
+PLACEHOLDER_SCHOOLS = {"", "unknown", "none", "n/a", "na", "null", "-", "?"}
+
+_SPACES = re.compile(r"\s+")
+
+
+class SchemaError(ValueError):
+    def __init__(self, path, message):
+        super().__init__(f"{path}: {message}")
+        self.path = path
+
+
+def decode(body):
+    """Decode a JSON response body (str or bytes)."""
+    if msgspec is not None:
+        try:
+            return msgspec.json.decode(body)
+        except msgspec.DecodeError as e:
+            # Same exception family as json.loads, so retry_policy treats it alike
+            raise ValueError(str(e)) from e
+    return json.loads(body)
+
+
+def canonical_school(name):
+    """
+    Canonical form of a school string, or None for placeholders. Punctuation
+    is left alone: school names are the keys of the geocoding files.
+    """
+    text = _SPACES.sub(" ", unicodedata.normalize("NFC", name)).strip()
+    if text.lower() in PLACEHOLDER_SCHOOLS:
+        return None
+    return text
+
+
+def _int(value, path):
+    if isinstance(value, bool):
+        raise SchemaError(path, f"expected an integer, got {value!r}")
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str) and value.strip().lstrip("-").isdigit():
+        return int(value.strip())
+    raise SchemaError(path, f"expected an integer, got {value!r}")
+
+
+def _text(value, path):
+    if value is None:
+        return ""
+    if isinstance(value, (str, int)) and not isinstance(value, bool):
+        return str(value).strip()
+    raise SchemaError(path, f"expected a string, got {type(value).__name__}")
+
+
+def _strings(value, path):
+    if value is None:
+        return []
+    if isinstance(value, str):
+        value = [value]
+    if not isinstance(value, list):
+        raise SchemaError(path, f"expected a list of strings, got {type(value).__name__}")
+    result = []
+    for i, item in enumerate(value):
+        if item is None:
+            continue
+        if not isinstance(item, str):
+            raise SchemaError(f"{path}[{i}]", f"expected a string, got {type(item).__name__}")
+        result.append(item)
+    return result
+
+
+def _degree(degree, path):
+    if not isinstance(degree, dict):
+        raise SchemaError(path, f"expected an object, got {type(degree).__name__}")
+    clean = dict(degree)
+
+    raw_schools = _strings(degree.get("schools"), f"{path}.schools")
+    raw_countries = [c.strip() for c in _strings(degree.get("country"), f"{path}.country")]
+    # A country list is either parallel to schools or one country for all of them
+    paired = len(raw_schools) > 1 and len(raw_countries) == len(raw_schools)
+    schools, countries, dropped = [], [], []
+    for i, raw in enumerate(raw_schools):
+        school = canonical_school(raw)
+        if school is None:
+            dropped.append(raw)
+            continue
+        if school in schools:
+            continue
+        schools.append(school)
+        if paired:
+            countries.append(raw_countries[i])
+    clean["schools"] = schools
+    clean["country"] = countries if paired else [c for c in raw_countries if c]
+    if dropped:
+        clean["dropped_schools"] = list(degree.get("dropped_schools") or []) + dropped
+    for field in ("degree_type", "degree_year", "thesis_title"):
+        if field in degree:
+            clean[field] = _text(degree[field], f"{path}.{field}")
+
+    advisors = degree.get("advised by")
+    if advisors is None:
+        advisors = {}
+    if isinstance(advisors, dict):
+        advisors = [advisors[k] for k in sorted(advisors, key=lambda k: (len(k), k))]
+    elif not isinstance(advisors, list):
+        raise SchemaError(f"{path}.advised by", f"expected an object or list, got {type(advisors).__name__}")
+    ids = []
+    for i, advisor_id in enumerate(advisors):
+        if advisor_id in (None, ""):
+            continue
+        advisor_id = _int(advisor_id, f"{path}.advised by[{i}]")
+        if advisor_id not in ids:
+            ids.append(advisor_id)
+    clean["advised by"] = {str(i): a for i, a in enumerate(ids, 1)}
+    return clean
+
+
+def normalise_record(record):
+    """Validate one record; returns (str ID, normalised copy) or raises SchemaError."""
+    if not isinstance(record, dict):
+        raise SchemaError("$", f"expected an object, got {type(record).__name__}")
+    mgp = record.get("MGP_academic")
+    if not isinstance(mgp, dict):
+        raise SchemaError("MGP_academic", "missing or not an object")
+    if "ID" not in mgp:
+        raise SchemaError("MGP_academic.ID", "missing")
+
+    clean = dict(mgp)
+    clean["ID"] = _int(mgp["ID"], "MGP_academic.ID")
+    for field in ("given_name", "other_names", "family_name"):
+        clean[field] = _text(mgp.get(field), f"MGP_academic.{field}")
+    if "MSC" in mgp:
+        clean["MSC"] = _text(mgp["MSC"], "MGP_academic.MSC")
+
+    student = mgp.get("student_data")
+    if student is not None:
+        if not isinstance(student, dict):
+            raise SchemaError("MGP_academic.student_data", "not an object")
+        student = dict(student)
+        degrees = student.get("degrees") or []
+        if not isinstance(degrees, list):
+            raise SchemaError("MGP_academic.student_data.degrees", "not a list")
+        student["degrees"] = [_degree(d, f"MGP_academic.student_data.degrees[{i}]")
+                              for i, d in enumerate(degrees)]
+
+        descendants = student.get("descendants")
+        if descendants is not None:
+            path = "MGP_academic.student_data.descendants"
+            if not isinstance(descendants, dict):
+                raise SchemaError(path, "not an object")
+            descendants = dict(descendants)
+            advisees = descendants.get("advisees") or []
+            if not isinstance(advisees, list):
+                raise SchemaError(f"{path}.advisees", "not a list")
+            descendants["advisees"] = [_int(a, f"{path}.advisees[{i}]") for i, a in enumerate(advisees)]
+            descendants["descendant_count"] = _int(descendants.get("descendant_count") or 0,
+                                                   f"{path}.descendant_count")
+            student["descendants"] = descendants
+        clean["student_data"] = student
+
+    normalised = dict(record)
+    normalised["MGP_academic"] = clean
+    return str(clean["ID"]), normalised
+
+
+class Quarantine:
+    """Appends rejected records to a JSON-lines side file."""
+
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+
+    def add(self, key, error, record):
+        self.count += 1
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps({"key": key, "error": str(error), "record": record}) + "\n")
+
+
+def quarantined_ids(path):
+    """The str IDs of the records in a quarantine file, where one can be told."""
+    ids = set()
+    if not os.path.exists(path):
+        return ids
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            entry = json.loads(line)
+            acad_id = entry.get("key")
+            record = entry.get("record")
+            if acad_id is None and isinstance(record, dict) and isinstance(record.get("MGP_academic"), dict):
+                acad_id = record["MGP_academic"].get("ID")
+            if acad_id is not None:
+                ids.add(str(acad_id))
+    return ids
+
+
+def normalise_batch(batch, quarantine=None):
+    """
+    Normalise an /acad/range response (a list of records or a dict keyed by
+    ID) into {str ID: record}. Malformed records go to quarantine.
+    """
+    if isinstance(batch, dict):
+        return normalise_items(batch.items(), quarantine)
+    if isinstance(batch, list):
+        return normalise_items(((None, r) for r in batch), quarantine)
+    if quarantine is not None:
+        quarantine.add(None, SchemaError("$", f"expected a list or object, got {type(batch).__name__}"), batch)
+    return {}
+
+
+def normalise_items(items, quarantine=None):
+    """Normalise (key, record) pairs into {str ID: record}; see normalise_batch."""
+    records = {}
+    for key, record in items:
+        try:
+            acad_id, clean = normalise_record(record)
+        except SchemaError as e:
+            if quarantine is not None:
+                quarantine.add(key, e, record)
+            continue
+        records[acad_id] = clean
+    return records
+
+
+def normalise_file(input_file, output_file=None, quarantine_file=None):
+    """
+    Stream a records file through normalise_record. Valid records are written
+    to output_file (default: <input>_normalised.json), rejected ones to
+    quarantine_file (default: <input>_quarantine.jsonl).
+    Returns (valid count, quarantined count).
+    """
+    base = record_store.base_name(input_file)
+    output_file = output_file or base + "_normalised" + input_file[len(base):]
+    quarantine_file = quarantine_file or base + "_quarantine.jsonl"
+    if os.path.exists(quarantine_file):
+        os.remove(quarantine_file)
+    quarantine = Quarantine(quarantine_file)
+
+    print(f"Validating {os.path.basename(input_file)}...")
+    with profiling.stage("validate"):
+        records = normalise_items(record_store.iter_records(input_file), quarantine)
+    with profiling.stage("dump"):
+        record_store.write_records(records, output_file)
+
+    print(f"✓ {len(records):,} valid records written to {os.path.basename(output_file)}")
+    if quarantine.count:
+        print(f"⚠ {quarantine.count:,} malformed records quarantined in {os.path.basename(quarantine_file)}")
+    return len(records), quarantine.count
+
+
+if __name__ == '__main__':
+    profiling.from_argv("record_schema")
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    normalise_file(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else None)
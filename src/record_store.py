@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Read and write the academics "databases": JSON objects keyed by
+stringified MGP ID, as produced by cache_mgp.py and the merge tools.
+
+The format is picked from the file name:
+
+    *.json      pretty-printed JSON (indent=2), as before
+    *.json.zst  compact JSON in zstd-compressed segments
+    *.sqlite    SQLite database with indexed columns (see sqlite_store.py)
+
+A .zst file is a sequence of independent zstd frames, each holding the JSON
+text of SEGMENT_RECORDS records; decompressed back to back they form one
+JSON document, so readers stream it transparently. If <file>.dict exists it
+is a zstd dictionary trained on MGP_academic records and is used for every
+frame, which helps a lot on this very repetitive structure.
+
+iter_records() streams (id, record) pairs without building the whole dict,
+so a multi-GB file can be scanned or converted with bounded memory.
+"""
+
+import io
+import json
+import os
+import shutil
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+CHUNK_SIZE = 1024 * 1024
+SEGMENT_RECORDS = 256
+ZSTD_LEVEL = 10
+DICT_SIZE = 112 * 1024
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\n\r"
+
+
+def is_compressed(path):
+    return path.endswith(".zst")
+
+
+def is_sqlite(path):
+    return path.endswith(".sqlite") or path.endswith(".db")
+
+
+def base_name(path):
+    """Path without its .json / .json.zst / .sqlite extension."""
+    for ext in (".json.zst", ".json", ".sqlite", ".db"):
+        if path.endswith(ext):
+            return path[:-len(ext)]
+    return path
+
+
+def dictionary_path(path):
+    return path + ".dict"
+
+
+def move_records(src, dst):
+    """
+    Rename a records file; its dictionary is copied so both stay readable.
+    The copy goes to a temp file first and both are moved into place only
+    once it is complete.
+    """
+    dict_tmp = None
+    if os.path.exists(dictionary_path(src)):
+        dict_tmp = dictionary_path(dst) + ".tmp"
+        shutil.copyfile(dictionary_path(src), dict_tmp)
+    os.replace(src, dst)
+    if dict_tmp is not None:
+        os.replace(dict_tmp, dictionary_path(dst))
+
+
+def _require_zstd():
+    if zstandard is None:
+        raise RuntimeError("zstandard is required for .zst files (pip install zstandard)")
+
+
+def _load_dictionary(path):
+    dict_file = dictionary_path(path)
+    if not os.path.exists(dict_file):
+        return None
+    with open(dict_file, 'rb') as f:
+        return zstandard.ZstdCompressionDict(f.read())
+
+
+def _open_zstd(path):
+    _require_zstd()
+    decompressor = zstandard.ZstdDecompressor(dict_data=_load_dictionary(path))
+    raw = open(path, 'rb')
+    return decompressor.stream_reader(raw, read_across_frames=True, closefd=True)
+
+
+def open_text(path):
+    """Open a records file for reading as text, decompressing if needed."""
+    if not is_compressed(path):
+        return open(path, 'r', encoding='utf-8')
+    return io.TextIOWrapper(io.BufferedReader(_open_zstd(path), CHUNK_SIZE), encoding='utf-8')
+
+
+def _skip_ws(buf, pos):
+    while pos < len(buf) and buf[pos] in _WHITESPACE:
+        pos += 1
+    return pos
+
+
+def iter_records(path, chunk_size=CHUNK_SIZE):
+    """
+    Yield (key, record) pairs from a top-level JSON object one at a time.
+
+    Only the current chunk and the record being decoded are held in memory.
+    """
+    if is_sqlite(path):
+        import sqlite_store
+        yield from sqlite_store.iter_records(path)
+        return
+
+    with open_text(path) as f:
+        buf = f.read(chunk_size)
+        eof = not buf
+        pos = _skip_ws(buf, 0)
+
+        if pos >= len(buf) or buf[pos] != '{':
+            raise ValueError(f"{path}: expected a JSON object of records")
+        pos += 1
+
+        while True:
+            try:
+                p = _skip_ws(buf, pos)
+                if p < len(buf) and buf[p] == '}':
+                    return
+                if p < len(buf) and buf[p] == ',':
+                    p = _skip_ws(buf, p + 1)
+                key, p = _decoder.raw_decode(buf, p)
+                p = _skip_ws(buf, p)
+                if p >= len(buf) or buf[p] != ':':
+                    raise json.JSONDecodeError("Expecting ':'", buf, p)
+                value, p = _decoder.raw_decode(buf, _skip_ws(buf, p + 1))
+                # Make sure the value was not cut off at the end of the buffer
+                if _skip_ws(buf, p) >= len(buf) and not eof:
+                    raise json.JSONDecodeError("Incomplete value", buf, p)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                chunk = f.read(chunk_size)
+                eof = not chunk
+                buf = buf[pos:] + chunk
+                pos = 0
+                continue
+
+            yield key, value
+            pos = p
+
+
+def load_records(path):
+    """Load a whole records file into a dict."""
+    if is_sqlite(path):
+        import sqlite_store
+        return sqlite_store.load_records(path)
+    if is_compressed(path):
+        # One bulk decompress + loads is much faster than json.load on a text stream
+        with _open_zstd(path) as reader:
+            return json.loads(reader.read())
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def train_dictionary(data, dict_size=DICT_SIZE, max_samples=20000):
+    """Train a zstd dictionary on the compact JSON of (a sample of) the records."""
+    _require_zstd()
+    samples = []
+    step = max(1, len(data) // max_samples)
+    for i, record in enumerate(data.values()):
+        if i % step == 0:
+            samples.append(json.dumps(record, separators=(',', ':')).encode('utf-8'))
+    return zstandard.train_dictionary(dict_size, samples)
+
+
+def _write_segments(data, path, dictionary, level):
+    compressor = zstandard.ZstdCompressor(level=level, dict_data=dictionary)
+    with open(path, 'wb') as f:
+        items = iter(data.items())
+        first = True
+        while True:
+            parts = []
+            for key, record in items:
+                parts.append(("{" if first else ",") + json.dumps(key) + ":" +
+                             json.dumps(record, separators=(',', ':')))
+                first = False
+                if len(parts) >= SEGMENT_RECORDS:
+                    break
+            if not parts:
+                break
+            f.write(compressor.compress("".join(parts).encode('utf-8')))
+        f.write(compressor.compress(b"{}" if first else b"}"))
+
+
+def write_records(data, path, dictionary=None, train=False, level=ZSTD_LEVEL):
+    """
+    Write a records dict; the format follows the file name (see module doc).
+
+    For .zst files, dictionary is a zstandard.ZstdCompressionDict to use; with
+    train=True one is trained on data first. Either way it is saved as
+    <path>.dict. Without one, an existing <path>.dict is reused. The data and
+    a new dictionary are written to temp files and only replace the old pair
+    once both are complete, so an interrupted write leaves the old file
+    readable.
+    """
+    if is_sqlite(path):
+        import sqlite_store
+        sqlite_store.write_records(data, path)
+        return
+
+    if not is_compressed(path):
+        with open(path, 'w') as f:
+            json.dump(data, f, indent=2)
+        return
+
+    _require_zstd()
+    if dictionary is None and train and data:
+        dictionary = train_dictionary(data)
+    dict_tmp = None
+    if dictionary is None:
+        dictionary = _load_dictionary(path)
+    else:
+        dict_tmp = dictionary_path(path) + ".tmp"
+        with open(dict_tmp, 'wb') as f:
+            f.write(dictionary.as_bytes())
+
+    tmp_path = path + ".tmp"
+    _write_segments(data, tmp_path, dictionary, level)
+    os.replace(tmp_path, path)
+    if dict_tmp is not None:
+        os.replace(dict_tmp, dictionary_path(path))
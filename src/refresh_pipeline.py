@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Single-process refresh: merge → concat → reorder → gap check → transfer.
+
+Running merge_checkpoints.py, concat_backups.py, reorder_json.py,
+check_backup_gaps.py and transfer_new_records.py one after another parses
+and dumps the same dataset many times. Here the stages share one in-memory
+record set and only the final artifacts are written:
+
+    <cache_dir>/all_academics_merged.json            checkpoints + all_academics (merge_checkpoints.py)
+    <cache_dir>/all_academics_merged_complete.json   merged, concatenated, ID-ordered
+    <cache_dir>/all_academics_merged_complete_missing_ids.json
+    <cache_dir>/all_academics_checkpoints.json       updated with new records (if present)
+
+As with transfer_new_records.py, the records transferred are those of the
+merge (all_academics_merged.json), not of the concatenated backups.
+
+Every input file is fingerprinted by content (BLAKE2 of its bytes; the hash is
+reused while size and mtime are unchanged) and every stage gets a key built
+from its inputs and the keys of the stages before it. Keys and artifact
+fingerprints are kept in pipeline_state.json; a stage whose key is unchanged
+and whose artifact is intact is skipped, and when a later stage needs the
+records of a skipped stage they are read back from its artifact instead of
+being rebuilt.
+
+Usage: python refresh_pipeline.py [cache_dir] [--force]
+"""
+
+import hashlib
+import json
+import os
+import sys
+import time
+
+import check_backup_gaps
+import concat_backups
+import merge_checkpoints
+import profiling
+import record_store
+import sqlite_store
+
+STATE_FILE = "pipeline_state.json"
+HASH_CHUNK = 4 * 1024 * 1024
+
+
+# -----------------------------------------------------------
+# Fingerprints
+# -----------------------------------------------------------
+def file_fingerprint(path, known=None):
+    """
+    Content hash of a file, as {"size", "mtime_ns", "hash"}. If `known` is the
+    previous fingerprint and size and mtime still match, its hash is reused.
+    """
+    st = os.stat(path)
+    if known and known.get("size") == st.st_size and known.get("mtime_ns") == st.st_mtime_ns:
+        return known
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(HASH_CHUNK)
+            if not chunk:
+                break
+            h.update(chunk)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "hash": h.hexdigest()}
+
+
+def combine(*parts):
+    h = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        h.update(str(part).encode('utf-8'))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+# -----------------------------------------------------------
+# Stages
+# -----------------------------------------------------------
+class Stage:
+    """
+    One pipeline step. run(pipeline, records) gets the record set produced by
+    the stage named `after` and returns its own record set (or None for
+    stages that only write a report). artifact is the file the stage writes,
+    if any, and load(pipeline) reads the stage's record set back from it.
+    """
+
+    def __init__(self, name, run, after=None, inputs=lambda p: [], artifact=None, load=None):
+        self.name = name
+        self.run = run
+        self.after = after
+        self.inputs = inputs
+        self.artifact = artifact
+        self.load = load
+
+
+def run_merge(pipeline, _):
+    records = {}
+    for path in pipeline.checkpoint_files:
+        records.update(record_store.load_records(path))
+    if pipeline.all_academics_file:
+        records.update(record_store.load_records(pipeline.all_academics_file))
+    record_store.write_records(records, pipeline.merged_path)
+    print(f"  {len(pipeline.checkpoint_files)} checkpoint files → {len(records):,} unique records "
+          f"in {os.path.basename(pipeline.merged_path)}")
+    return records
+
+
+def run_concat(pipeline, merged):
+    records = {}
+    for path in pipeline.backup_files:
+        records.update(record_store.load_records(path))
+    before = len(records)
+    # The fresh merge is newer than any backup, so it wins on duplicates
+    records.update(merged)
+    print(f"  {len(pipeline.backup_files)} backups ({before:,} records) + merge → {len(records):,} records")
+    return records
+
+
+def run_reorder(pipeline, records):
+    ordered = {str(i): records[str(i)] for i in sorted(int(k) for k in records)}
+    record_store.write_records(ordered, pipeline.output_path)
+    print(f"  Wrote {len(ordered):,} records in ID order to {os.path.basename(pipeline.output_path)}")
+    return ordered
+
+
+def run_gaps(pipeline, records):
+    ids = sorted(int(k) for k in records)
+    present = set(ids)
+    missing_ids = [i for i in range(ids[0], ids[-1] + 1) if i not in present] if ids else []
+    gaps = check_backup_gaps.group_gaps(missing_ids)
+    check_backup_gaps.save_missing_report(pipeline.gaps_path, missing_ids, gaps)
+    if ids:
+        print(f"  {len(missing_ids):,} missing IDs in {len(gaps):,} gaps "
+              f"(coverage {100 * len(ids) / (ids[-1] - ids[0] + 1):.2f}%)")
+    return None
+
+
+def run_transfer(pipeline, records):
+    target = pipeline.transfer_path
+    if record_store.is_sqlite(target):
+        new_ids = records.keys() - sqlite_store.record_ids(target)
+        sqlite_store.upsert_records(target, ((k, records[k]) for k in new_ids))
+    else:
+        target_data = record_store.load_records(target)
+        new_ids = records.keys() - target_data.keys()
+        if new_ids:
+            for acad_id in new_ids:
+                target_data[acad_id] = records[acad_id]
+            record_store.write_records(target_data, target)
+    print(f"  {len(new_ids):,} new records transferred to {os.path.basename(target)}")
+    return None
+
+
+# -----------------------------------------------------------
+# Runner
+# -----------------------------------------------------------
+class Pipeline:
+    def __init__(self, cache_dir="mgp_cache", output_file="all_academics_merged_complete.json",
+                 transfer_file="all_academics_checkpoints.json", merged_file="all_academics_merged.json"):
+        self.cache_dir = cache_dir
+        self.merged_path = os.path.join(cache_dir, merged_file)
+        self.output_path = os.path.join(cache_dir, output_file)
+        self.gaps_path = record_store.base_name(self.output_path) + '_missing_ids.json'
+        self.transfer_path = os.path.join(cache_dir, transfer_file)
+        self.state_path = os.path.join(cache_dir, STATE_FILE)
+
+        self.checkpoint_files = merge_checkpoints.find_checkpoint_files(cache_dir)
+        self.all_academics_file = merge_checkpoints.find_all_academics_file(cache_dir)
+        self.backup_files = concat_backups.find_backup_files(cache_dir)
+
+        self.stages = [
+            Stage("merge", run_merge,
+                  inputs=lambda p: p.checkpoint_files + ([p.all_academics_file] if p.all_academics_file else []),
+                  artifact=self.merged_path, load=lambda p: record_store.load_records(p.merged_path)),
+            Stage("concat", run_concat, after="merge", inputs=lambda p: p.backup_files),
+            Stage("reorder", run_reorder, after="concat", artifact=self.output_path,
+                  load=lambda p: record_store.load_records(p.output_path)),
+            Stage("gaps", run_gaps, after="reorder", artifact=self.gaps_path),
+        ]
+        if os.path.exists(self.transfer_path):
+            # The target is both input and artifact of this stage
+            self.stages.append(Stage("transfer", run_transfer, after="merge",
+                                     inputs=lambda p: [p.transfer_path], artifact=self.transfer_path))
+
+        self.state = {"files": {}, "stages": {}}
+        if os.path.exists(self.state_path):
+            with open(self.state_path, 'r') as f:
+                self.state = json.load(f)
+
+    def fingerprint(self, path):
+        fp = file_fingerprint(path, self.state["files"].get(path))
+        self.state["files"][path] = fp
+        return fp["hash"]
+
+    def stage_keys(self):
+        """Key of each stage: its name, its input files and the key of the stage it reads from."""
+        keys = {}
+        for stage in self.stages:
+            keys[stage.name] = combine(stage.name, keys.get(stage.after, ""),
+                                       *(self.fingerprint(p) for p in stage.inputs(self)))
+        return keys
+
+    def _artifact_intact(self, stage):
+        if stage.artifact is None:
+            return True
+        recorded = self.state.get("artifacts", {}).get(stage.artifact)
+        return os.path.exists(stage.artifact) and recorded == self.fingerprint(stage.artifact)
+
+    def plan(self, keys, force=False):
+        """
+        Decide what each stage does: "run" when its key changed or its artifact
+        is missing or modified, "load" when it is unchanged but a later stage
+        that runs needs its record set and it can be read from its artifact,
+        "skip" otherwise.
+        """
+        done = self.state.get("stages", {})
+        action = {}
+        for stage in self.stages:
+            fresh = not force and done.get(stage.name) == keys[stage.name] and self._artifact_intact(stage)
+            action[stage.name] = "skip" if fresh else "run"
+        by_name = {stage.name: stage for stage in self.stages}
+        for stage in reversed(self.stages):
+            if action[stage.name] == "run" and stage.after:
+                source = by_name[stage.after]
+                if action[source.name] == "skip":
+                    action[source.name] = "load" if source.load else "run"
+        return action
+
+    def run(self, force=False):
+        keys = self.stage_keys()
+        action = self.plan(keys, force)
+        if all(a == "skip" for a in action.values()):
+            print("Nothing changed since the last run; all stages skipped.")
+            self.save_state()
+            return
+
+        timings = {}
+        outputs = {}
+        for i, stage in enumerate(self.stages):
+            start = time.perf_counter()
+            if action[stage.name] == "skip":
+                print(f"[{stage.name}] unchanged, skipped")
+                continue
+            if action[stage.name] == "load":
+                print(f"[{stage.name}] unchanged, reading {os.path.basename(stage.artifact)}")
+                with profiling.stage(f"{stage.name}_load"):
+                    outputs[stage.name] = stage.load(self)
+            else:
+                print(f"[{stage.name}]")
+                with profiling.stage(stage.name):
+                    result = stage.run(self, outputs.get(stage.after))
+                if result is not None:
+                    outputs[stage.name] = result
+                self.state["stages"][stage.name] = keys[stage.name]
+                if stage.artifact is not None:
+                    self.state.setdefault("artifacts", {})[stage.artifact] = self.fingerprint(stage.artifact)
+            timings[stage.name] = time.perf_counter() - start
+
+            # Drop record sets no later stage reads
+            if stage.after and not any(s.after == stage.after for s in self.stages[i + 1:]):
+                outputs.pop(stage.after, None)
+
+        # transfer rewrites its own input; key it on the new content
+        if action.get("transfer") == "run":
+            self.state["stages"]["transfer"] = self.stage_keys()["transfer"]
+        self.save_state()
+        print("\nStage times: " + ", ".join(f"{name} {t:.1f}s" for name, t in timings.items()))
+
+    def save_state(self):
+        with open(self.state_path, 'w') as f:
+            json.dump(self.state, f, indent=2)
+
+
+def run_pipeline(cache_dir="mgp_cache", force=False, **kwargs):
+    print(f"\n=== Refresh pipeline ({cache_dir}) ===\n")
+    Pipeline(cache_dir, **kwargs).run(force=force)
+
+
+if __name__ == '__main__':
+    profiling.from_argv("refresh_pipeline")
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    run_pipeline(args[0] if args else "mgp_cache", force="--force" in sys.argv)
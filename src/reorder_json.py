@@ -1,9 +1,11 @@
 #!/usr/bin/env python3
 
-import json
 import os
 from collections import OrderedDict
 
+import profiling
+import record_store
+
 def reorder_json_by_id(input_file="mgp_cache/all_academics_merged_complete.json"):
     """
     Reorder JSON file so IDs are in numerical order from smallest to largest.
@@ -17,8 +19,8 @@ def reorder_json_by_id(input_file="mgp_cache/all_academics_merged_complete.json"
     
     # Load the file
     print("Loading file...")
-    with open(input_file, 'r') as f:
-        data = json.load(f)
+    with profiling.stage("load"):
+        data = record_store.load_records(input_file)
     
     original_size = os.path.getsize(input_file) / (1024 * 1024)
     
@@ -36,36 +38,38 @@ def reorder_json_by_id(input_file="mgp_cache/all_academics_merged_complete.json"
     
     # Sort IDs numerically
     print(f"\nSorting {len(ids):,} IDs numerically...")
-    sorted_ids = sorted(ids)
-    
-    # Create new ordered dictionary
-    print("Creating reordered dictionary...")
-    ordered_data = OrderedDict()
-    
-    for i, id_num in enumerate(sorted_ids):
-        ordered_data[str(id_num)] = data[str(id_num)]
+    with profiling.stage("sort"):
+        sorted_ids = sorted(ids)
         
-        # Progress indicator
-        if (i + 1) % 10000 == 0:
-            print(f"  Processed {i+1:,}/{len(sorted_ids):,} records...")
+        # Create new ordered dictionary
+        print("Creating reordered dictionary...")
+        ordered_data = OrderedDict()
+        
+        for i, id_num in enumerate(sorted_ids):
+            ordered_data[str(id_num)] = data[str(id_num)]
+            
+            # Progress indicator
+            if (i + 1) % 10000 == 0:
+                print(f"  Processed {i+1:,}/{len(sorted_ids):,} records...")
     
     # Save reordered file
     print(f"\nSaving reordered file...")
     
     # Create backup first
-    backup_file = input_file.replace('.json', '_unordered_backup.json')
+    base = record_store.base_name(input_file)
+    backup_file = base + '_unordered_backup' + input_file[len(base):]
     print(f"  Creating backup: {os.path.basename(backup_file)}")
-    os.rename(input_file, backup_file)
+    record_store.move_records(input_file, backup_file)
     
     # Save ordered version
-    with open(input_file, 'w') as f:
-        json.dump(ordered_data, f, indent=2)
+    with profiling.stage("dump"):
+        record_store.write_records(ordered_data, input_file)
     
     new_size = os.path.getsize(input_file) / (1024 * 1024)
     
     # Verify
-    with open(input_file, 'r') as f:
-        verify_data = json.load(f)
+    with profiling.stage("verify"):
+        verify_data = record_store.load_records(input_file)
     
     first_key_after = list(verify_data.keys())[0]
     last_key_after = list(verify_data.keys())[-1]
@@ -81,6 +85,8 @@ def reorder_json_by_id(input_file="mgp_cache/all_academics_merged_complete.json"
     print(f"Reordered file saved to: {os.path.basename(input_file)}")
 
 if __name__ == '__main__':
+    profiling.from_argv("reorder_json")
+    
     # Reorder all_academics_merged_complete.json
     reorder_json_by_id("mgp_cache/all_academics_merged_complete.json")
     
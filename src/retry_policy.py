@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Shared retry policy for everything that talks to the MGP API or Nominatim.
+
+- classify() sorts failures into timeout / connection / rate_limited (429) /
+  server (5xx) / not_found (404) / auth (401, 403) / client (other 4xx).
+  Only the first four are worth retrying; a 404 is a real answer.
+- RetryPolicy computes exponential backoff with full jitter and honours
+  Retry-After.
+- CircuitBreaker stops sending requests for a while after a run of
+  failures, so a struggling server is not hammered.
+- RetryQueue persists IDs or ranges that still failed after all attempts,
+  so they are retried later instead of being dropped or marked not found.
+"""
+
+import email.utils
+import json
+import os
+import random
+import time
+
+import requests
+
+RETRYABLE = {"timeout", "connection", "rate_limited", "server"}
+
+
+class HTTPStatusError(RuntimeError):
+    """Non-2xx response. The message keeps the status code, e.g. "... 401"."""
+
+    def __init__(self, message, status, retry_after=None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+class RetriesExhausted(RuntimeError):
+    def __init__(self, error, attempts):
+        super().__init__(f"{error} (after {attempts} attempts)")
+        self.error = error
+        self.attempts = attempts
+        self.kind = classify(error)
+
+
+def parse_retry_after(value):
+    """Retry-After is either delay-seconds or an HTTP date; returns seconds or None."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+def raise_for_status(response, what="Error executing query"):
+    """Raise HTTPStatusError for a non-2xx requests.Response."""
+    if not response.ok:
+        raise HTTPStatusError(f"{what}: {response.status_code}", response.status_code,
+                              parse_retry_after(response.headers.get("Retry-After")))
+
+
+def classify(error):
+    if isinstance(error, RetriesExhausted):
+        return error.kind
+    if isinstance(error, HTTPStatusError):
+        if error.status == 429:
+            return "rate_limited"
+        if error.status >= 500:
+            return "server"
+        if error.status == 404:
+            return "not_found"
+        if error.status in (401, 403):
+            return "auth"
+        return "client"
+    if isinstance(error, (requests.exceptions.Timeout, TimeoutError)):
+        return "timeout"
+    if isinstance(error, (requests.exceptions.ConnectionError, ConnectionError)):
+        return "connection"
+    if isinstance(error, ValueError):
+        # Truncated or garbled body; usually transient
+        return "server"
+    return "other"
+
+
+class RetryPolicy:
+    def __init__(self, max_attempts=5, base_delay=1.0, max_delay=60.0, rng=None):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.rng = rng or random.Random()
+
+    def delay(self, attempt, retry_after=None):
+        """Seconds to wait before retry number `attempt` (1-based)."""
+        if retry_after is not None:
+            return min(self.max_delay, retry_after)
+        ceiling = min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+        return self.rng.uniform(0, ceiling)
+
+
+class CircuitBreaker:
+    """
+    Closed: requests flow. After failure_threshold consecutive retryable
+    failures it opens for reset_timeout seconds; then one trial request is let
+    through (half-open) and its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.times_opened = 0
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def wait(self, sleep=time.sleep):
+        """Block while the circuit is open."""
+        if self.state == "open":
+            remaining = self.reset_timeout - (time.monotonic() - self.opened_at)
+            print(f"  Circuit open, pausing {remaining:.0f}s...")
+            sleep(remaining)
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == "half-open" or self.failures >= self.failure_threshold:
+            if self.state != "open":
+                self.times_opened += 1
+            self.opened_at = time.monotonic()
+
+
+def call_with_retry(func, policy=None, breaker=None, sleep=time.sleep):
+    """
+    Call func() until it succeeds, a non-retryable error is raised (re-raised
+    as is), or policy.max_attempts is reached (RetriesExhausted).
+    """
+    policy = policy or RetryPolicy()
+    for attempt in range(1, policy.max_attempts + 1):
+        if breaker is not None:
+            breaker.wait(sleep)
+        try:
+            result = func()
+        except Exception as e:
+            kind = classify(e)
+            if kind not in RETRYABLE:
+                if breaker is not None:
+                    breaker.record_success()  # the server answered; it is not struggling
+                raise
+            if breaker is not None:
+                breaker.record_failure()
+            if attempt == policy.max_attempts:
+                raise RetriesExhausted(e, attempt) from e
+            sleep(policy.delay(attempt, getattr(e, "retry_after", None)))
+            continue
+        if breaker is not None:
+            breaker.record_success()
+        return result
+
+
+class RetryQueue:
+    """
+    JSON file of work items that failed after every retry, with the last
+    error kind, so the next run picks them up first.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.items = {}
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                for entry in json.load(f):
+                    self.items[json.dumps(entry["item"])] = entry
+
+    def __len__(self):
+        return len(self.items)
+
+    def add(self, item, error):
+        key = json.dumps(item)
+        entry = self.items.setdefault(key, {"item": item, "attempts": 0})
+        entry["attempts"] += 1
+        entry["reason"] = classify(getattr(error, "error", error))
+        entry["error"] = str(error)[:200]
+
+    def discard(self, item):
+        self.items.pop(json.dumps(item), None)
+
+    def pending(self):
+        return [entry["item"] for entry in self.items.values()]
+
+    def save(self):
+        with open(self.path, 'w') as f:
+            json.dump(list(self.items.values()), f, indent=2)
@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+Spatial index over the geocoded universities.
+
+SpatialIndex keeps the schools of university_coordinates_partial.json in
+NumPy arrays sorted by a 1° latitude/longitude grid cell, so a query only
+looks at the cells its box or circle touches:
+
+    bbox(south, west, north, east)   schools in a box (west > east crosses
+                                     the antimeridian)
+    within(lat, lon, radius_km)      schools within a great-circle radius
+    nearest(lat, lon, k)             the k closest schools
+    nearest_many(lats, lons, k)      the same for a batch of points at once
+
+Distances are haversine, vectorised over the candidate arrays.
+
+build() also stores, per school, the IDs and degree years of the academics
+who graduated there (CSR arrays: one offset per school into flat ID/year
+arrays), so academics_near() answers "academics who graduated within 50 km
+of X" from the .npz alone, without scanning the records.
+
+Usage:
+    python spatial_index.py build university_coordinates_partial.json all_academics_merged_complete.json [spatial_index.npz]
+    python spatial_index.py near spatial_index.npz "University of Cambridge" 50 [year_from] [year_to]
+    python spatial_index.py near spatial_index.npz 52.2,0.12 50
+"""
+
+import json
+import sys
+from collections import defaultdict
+
+import numpy as np
+
+import academic_model
+import profiling
+import record_schema
+import record_store
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = EARTH_RADIUS_KM * np.pi / 180
+CELL_DEG = 1.0
+N_ROWS = int(180 / CELL_DEG)
+N_COLS = int(360 / CELL_DEG)
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    """Great-circle distance in km; arguments broadcast like NumPy arrays."""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(a, dtype=np.float64)) for a in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def _cell_rows(lat):
+    return np.clip(((np.asarray(lat) + 90) / CELL_DEG).astype(np.int64), 0, N_ROWS - 1)
+
+
+def _cell_cols(lon):
+    return np.clip(((np.asarray(lon) + 180) / CELL_DEG).astype(np.int64), 0, N_COLS - 1)
+
+
+class SpatialIndex:
+    def __init__(self, names, lat, lon, offsets=None, ids=None, years=None):
+        """
+        names/lat/lon are parallel arrays, one entry per school. offsets, ids
+        and years (optional) are the per-school academic lists: the academics
+        of school i are ids[offsets[i]:offsets[i + 1]].
+        """
+        keys = _cell_rows(lat) * N_COLS + _cell_cols(lon)
+        order = np.argsort(keys, kind="stable")
+        self.keys = keys[order]
+        self.names = np.asarray(names)[order]
+        self.lat = np.asarray(lat, dtype=np.float64)[order]
+        self.lon = np.asarray(lon, dtype=np.float64)[order]
+        self.position = {name: i for i, name in enumerate(self.names.tolist())}
+        self.offsets = self.ids = self.years = None
+        if offsets is not None:
+            # Re-slice the academic lists into the sorted school order
+            offsets = np.asarray(offsets)
+            counts = np.diff(offsets)[order]
+            take = np.concatenate([np.arange(offsets[i], offsets[i + 1]) for i in order]) \
+                if len(order) else np.zeros(0, dtype=np.int64)
+            self.offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+            self.ids = np.asarray(ids)[take]
+            self.years = np.asarray(years)[take]
+
+    def __len__(self):
+        return len(self.names)
+
+    @classmethod
+    def from_coords(cls, coords):
+        """From {school: [lat, lon] or None}, as written by geocode_uni.py."""
+        items = [(name, latlon) for name, latlon in coords.items() if latlon]
+        return cls([n for n, _ in items],
+                   [float(ll[0]) for _, ll in items],
+                   [float(ll[1]) for _, ll in items])
+
+    # -------------------------------------------------------
+    # Persistence
+    # -------------------------------------------------------
+    def save(self, path):
+        arrays = {"names": self.names.astype(str), "lat": self.lat, "lon": self.lon}
+        if self.offsets is not None:
+            arrays.update(offsets=self.offsets, ids=self.ids, years=self.years)
+        np.savez_compressed(path, **arrays)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as z:
+            if "offsets" in z:
+                return cls(z["names"], z["lat"], z["lon"], z["offsets"], z["ids"], z["years"])
+            return cls(z["names"], z["lat"], z["lon"])
+
+    # -------------------------------------------------------
+    # Queries
+    # -------------------------------------------------------
+    def _candidates(self, south, west, north, east):
+        """Positions of schools in the grid cells covering the box."""
+        c0, c1 = _cell_cols(west), _cell_cols(east)
+        if west <= east:
+            col_ranges = [(c0, c1)]
+        elif c0 <= c1:
+            # Wraps almost all the way round, back into the starting cell
+            col_ranges = [(0, N_COLS - 1)]
+        else:
+            col_ranges = [(c0, N_COLS - 1), (0, c1)]
+        rows = np.arange(_cell_rows(south), _cell_rows(north) + 1)
+        slices = []
+        for c0, c1 in col_ranges:
+            starts = np.searchsorted(self.keys, rows * N_COLS + c0, side="left")
+            stops = np.searchsorted(self.keys, rows * N_COLS + c1, side="right")
+            slices.extend(np.arange(a, b) for a, b in zip(starts, stops) if b > a)
+        return np.concatenate(slices) if slices else np.zeros(0, dtype=np.int64)
+
+    def bbox(self, south, west, north, east):
+        """Names of the schools inside the box."""
+        pos = self._candidates(south, west, north, east)
+        lat, lon = self.lat[pos], self.lon[pos]
+        inside = (lat >= south) & (lat <= north)
+        if west <= east:
+            inside &= (lon >= west) & (lon <= east)
+        else:
+            inside &= (lon >= west) | (lon <= east)
+        return self.names[pos[inside]].tolist()
+
+    def _within(self, lat, lon, radius_km):
+        """(positions, distances) of schools within radius_km, nearest first."""
+        dlat = radius_km / KM_PER_DEGREE
+        south, north = lat - dlat, lat + dlat
+        # Widest longitude offset of the circle: asin(sin(r / R) / cos(lat))
+        sin_dlon = np.sin(min(np.pi / 2, radius_km / EARTH_RADIUS_KM)) / max(np.cos(np.radians(lat)), 1e-12)
+        if south <= -90 or north >= 90 or sin_dlon >= 1:
+            # Circle reaches a pole: every longitude
+            west, east = -180.0, 180.0
+        else:
+            dlon = np.degrees(np.arcsin(sin_dlon))
+            west, east = lon - dlon, lon + dlon
+            if west < -180:
+                west += 360
+            if east > 180:
+                east -= 360
+        pos = self._candidates(max(-90.0, south), west, min(90.0, north), east)
+        dist = haversine(lat, lon, self.lat[pos], self.lon[pos])
+        keep = dist <= radius_km
+        pos, dist = pos[keep], dist[keep]
+        order = np.argsort(dist, kind="stable")
+        return pos[order], dist[order]
+
+    def within(self, lat, lon, radius_km):
+        """[(school, km)] within radius_km of a point, nearest first."""
+        pos, dist = self._within(lat, lon, radius_km)
+        return list(zip(self.names[pos].tolist(), dist.tolist()))
+
+    def nearest(self, lat, lon, k=10):
+        """[(school, km)] for the k schools closest to a point."""
+        k = min(k, len(self))
+        radius = 50.0
+        while k:
+            pos, dist = self._within(lat, lon, radius)
+            if len(pos) >= k or radius >= np.pi * EARTH_RADIUS_KM:
+                return list(zip(self.names[pos[:k]].tolist(), dist[:k].tolist()))
+            radius *= 4
+        return []
+
+    def nearest_many(self, lats, lons, k=1, chunk=256):
+        """
+        k nearest schools for many points: (positions, km) arrays of shape
+        (len(lats), k), from a chunked query × school distance matrix.
+        """
+        lats, lons = np.asarray(lats, dtype=np.float64), np.asarray(lons, dtype=np.float64)
+        k = min(k, len(self))
+        positions = np.zeros((len(lats), k), dtype=np.int64)
+        distances = np.zeros((len(lats), k))
+        for start in range(0, len(lats), chunk):
+            stop = start + chunk
+            dist = haversine(lats[start:stop, None], lons[start:stop, None], self.lat[None, :], self.lon[None, :])
+            part = np.argpartition(dist, k - 1, axis=1)[:, :k] if k < len(self) else \
+                np.tile(np.arange(len(self)), (len(dist), 1))
+            part_dist = np.take_along_axis(dist, part, axis=1)
+            order = np.argsort(part_dist, axis=1, kind="stable")
+            positions[start:stop] = np.take_along_axis(part, order, axis=1)
+            distances[start:stop] = np.take_along_axis(part_dist, order, axis=1)
+        return positions, distances
+
+    def locate(self, name):
+        """(lat, lon) of a school, or None if it was not geocoded."""
+        i = self.position.get(record_schema.canonical_school(name) or name, self.position.get(name))
+        return None if i is None else (float(self.lat[i]), float(self.lon[i]))
+
+    # -------------------------------------------------------
+    # Academics
+    # -------------------------------------------------------
+    def academics_near(self, lat, lon, radius_km, year_from=None, year_to=None):
+        """
+        [(ID, school, km)] for academics with a degree from a school within
+        radius_km, optionally limited to degree years in [year_from, year_to].
+        Each academic appears once, with the nearest such school.
+        """
+        if self.offsets is None:
+            raise ValueError("index has no academic lists; build it with build()")
+        pos, dist = self._within(lat, lon, radius_km)
+        result = {}
+        for i, km in zip(pos.tolist(), dist.tolist()):
+            lo, hi = self.offsets[i], self.offsets[i + 1]
+            ids, years = self.ids[lo:hi], self.years[lo:hi]
+            if year_from is not None or year_to is not None:
+                keep = years >= 0
+                if year_from is not None:
+                    keep &= years >= year_from
+                if year_to is not None:
+                    keep &= years <= year_to
+                ids = ids[keep]
+            school = str(self.names[i])
+            for acad_id in ids.tolist():
+                # Schools come nearest first, so the first hit is the closest
+                result.setdefault(acad_id, (acad_id, school, km))
+        return list(result.values())
+
+
+def school_academics(records):
+    """{canonical school: [(ID, degree year or -1)]} over raw records."""
+    by_school = defaultdict(list)
+    for record in records:
+        try:
+            acad_id = int(record["MGP_academic"]["ID"])
+        except (KeyError, TypeError, ValueError):
+            continue
+        for degree in academic_model.iter_degrees(record):
+            year = academic_model.parse_year(degree.get("degree_year"))
+            for school in degree.get("schools") or []:
+                school = record_schema.canonical_school(school or "")
+                if school:
+                    by_school[school].append((acad_id, -1 if year is None else year))
+    return by_school
+
+
+def build(coords_file, records_file, output_file="spatial_index.npz"):
+    """Build the index with per-school academic lists and save it as .npz."""
+    print(f"Loading {coords_file}...")
+    with open(coords_file, "r", encoding="utf-8") as f:
+        coords = {record_schema.canonical_school(k) or k: v for k, v in json.load(f).items() if v}
+
+    print(f"Scanning {records_file}...")
+    with profiling.stage("extract"):
+        by_school = school_academics(record for _, record in record_store.iter_records(records_file))
+
+    names = list(coords)
+    offsets, ids, years = [0], [], []
+    for name in names:
+        entries = by_school.get(name, ())
+        ids.extend(i for i, _ in entries)
+        years.extend(y for _, y in entries)
+        offsets.append(len(ids))
+
+    index = SpatialIndex(names, [coords[n][0] for n in names], [coords[n][1] for n in names],
+                         np.array(offsets, dtype=np.int64), np.array(ids, dtype=np.int64),
+                         np.array(years, dtype=np.int16))
+    with profiling.stage("dump"):
+        index.save(output_file)
+    matched = sum(1 for n in names if n in by_school)
+    print(f"✓ {len(index):,} schools ({matched:,} with academics, {len(ids):,} degrees) saved to {output_file}")
+    return index
+
+
+if __name__ == '__main__':
+    profiling.from_argv("spatial_index")
+    if len(sys.argv) >= 4 and sys.argv[1] == "build":
+        build(sys.argv[2], sys.argv[3], sys.argv[4] if len(sys.argv) > 4 else "spatial_index.npz")
+    elif len(sys.argv) >= 5 and sys.argv[1] == "near":
+        with profiling.stage("load"):
+            index = SpatialIndex.load(sys.argv[2])
+        place, radius = sys.argv[3], float(sys.argv[4])
+        if "," in place and all(p.strip().lstrip("-").replace(".", "", 1).isdigit() for p in place.split(",")):
+            point = tuple(float(p) for p in place.split(","))
+        else:
+            point = index.locate(place)
+            if point is None:
+                print(f"{place!r} is not in the index")
+                sys.exit(1)
+        year_from = int(sys.argv[5]) if len(sys.argv) > 5 else None
+        year_to = int(sys.argv[6]) if len(sys.argv) > 6 else None
+
+        with profiling.stage("query"):
+            schools = index.within(*point, radius)
+            academics = index.academics_near(*point, radius, year_from, year_to)
+        print(f"{len(schools):,} schools and {len(academics):,} academics within {radius:g} km of {place}")
+        for school, km in schools[:10]:
+            print(f"  {km:7.1f} km  {school}")
+    else:
+        print(__doc__)
+        sys.exit(1)
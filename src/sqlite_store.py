@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+"""
+SQLite backend for the academics "databases".
+
+A *.sqlite / *.db file keeps every record as its compact JSON text, next to
+columns extracted from it, so questions about the data are answered with
+indexed SQL instead of parsing and scanning the whole JSON dict:
+
+    academics           id, given_name, other_names, family_name, year, record
+    academic_schools    id, school, country, year   (one row per degree school)
+    academic_advisors   id, advisor_id
+
+record_store dispatches on the file name, so load_records / iter_records /
+write_records (and every tool built on them) work with these files as they
+do with .json and .json.zst. write_records() replaces the contents in a
+single transaction and only writes the records whose JSON changed, so
+frequent checkpoint saves are cheap and an interrupted save leaves the
+previous contents intact. upsert_records() adds records in batched
+transactions on a WAL-mode database.
+
+Usage:
+    python sqlite_store.py import all_academics_merged.json academics.sqlite
+    python sqlite_store.py stats academics.sqlite
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import time
+
+import academic_model
+import profiling
+import record_store
+
+BATCH_SIZE = 5000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS academics (
+    id INTEGER PRIMARY KEY,
+    given_name TEXT,
+    other_names TEXT,
+    family_name TEXT,
+    year INTEGER,
+    record TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS academic_schools (
+    id INTEGER NOT NULL,
+    school TEXT NOT NULL,
+    country TEXT,
+    year INTEGER
+);
+CREATE TABLE IF NOT EXISTS academic_advisors (
+    id INTEGER NOT NULL,
+    advisor_id INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS academics_name ON academics (family_name, given_name);
+CREATE INDEX IF NOT EXISTS academics_year ON academics (year);
+CREATE INDEX IF NOT EXISTS schools_id ON academic_schools (id);
+CREATE INDEX IF NOT EXISTS schools_school ON academic_schools (school, year);
+CREATE INDEX IF NOT EXISTS schools_country ON academic_schools (country, year);
+CREATE INDEX IF NOT EXISTS advisors_id ON academic_advisors (id);
+CREATE INDEX IF NOT EXISTS advisors_advisor ON academic_advisors (advisor_id);
+"""
+
+
+def connect(path, wal=True):
+    """Open (creating if needed) a records database in autocommit mode."""
+    conn = sqlite3.connect(path, timeout=60, isolation_level=None)
+    conn.execute("PRAGMA busy_timeout = 60000")
+    if wal:
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def _rows(key, record):
+    """Column values for one record: (academic row, school rows, advisor rows)."""
+    acad_id = int(key)
+    mgp = record.get("MGP_academic") or {}
+    schools = []
+    first_year = None
+    for degree in academic_model.iter_degrees(record):
+        year = academic_model.parse_year(degree.get("degree_year"))
+        if first_year is None:
+            first_year = year
+        names = degree.get("schools") or []
+        countries = degree.get("country") or []
+        if isinstance(names, str):
+            names = [names]
+        if isinstance(countries, str):
+            countries = [countries]
+        for i, school in enumerate(names):
+            if school:
+                country = countries[i] if i < len(countries) else (countries[-1] if countries else None)
+                schools.append((acad_id, school, country or None, year))
+    advisors = [(acad_id, a) for a in academic_model.advisor_ids(record)]
+    academic = (acad_id, mgp.get("given_name") or None, mgp.get("other_names") or None,
+                mgp.get("family_name") or None, first_year,
+                json.dumps(record, separators=(',', ':')))
+    return academic, schools, advisors
+
+
+def _text_hash(text):
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+
+
+def _write_rows(conn, rows):
+    """Replace the rows of some academics; the caller holds the transaction."""
+    academics, schools, advisors = [], [], []
+    for academic, school_rows, advisor_rows in rows:
+        academics.append(academic)
+        schools.extend(school_rows)
+        advisors.extend(advisor_rows)
+    ids = [(a[0],) for a in academics]
+    conn.executemany("DELETE FROM academic_schools WHERE id = ?", ids)
+    conn.executemany("DELETE FROM academic_advisors WHERE id = ?", ids)
+    conn.executemany("INSERT OR REPLACE INTO academics VALUES (?, ?, ?, ?, ?, ?)", academics)
+    conn.executemany("INSERT INTO academic_schools VALUES (?, ?, ?, ?)", schools)
+    conn.executemany("INSERT INTO academic_advisors VALUES (?, ?)", advisors)
+
+
+def _delete_rows(conn, ids):
+    rows = [(int(i),) for i in ids]
+    for table in ("academics", "academic_schools", "academic_advisors"):
+        conn.executemany(f"DELETE FROM {table} WHERE id = ?", rows)
+
+
+def _insert_batch(conn, batch):
+    rows = [_rows(key, record) for key, record in batch]
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        _write_rows(conn, rows)
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def upsert_records(path, items, batch_size=BATCH_SIZE):
+    """
+    Insert or replace records from a dict or an iterable of (key, record)
+    pairs, batch_size per transaction. Returns the number written.
+    """
+    if isinstance(items, dict):
+        items = items.items()
+    conn = connect(path)
+    total = 0
+    batch = []
+    try:
+        for item in items:
+            batch.append(item)
+            if len(batch) >= batch_size:
+                _insert_batch(conn, batch)
+                total += len(batch)
+                batch = []
+        if batch:
+            _insert_batch(conn, batch)
+            total += len(batch)
+    finally:
+        conn.close()
+    return total
+
+
+def write_records(data, path, batch_size=BATCH_SIZE):
+    """
+    Make the database hold exactly the records of data (a dict or an
+    iterable of (key, record) pairs), in one transaction. Records whose JSON
+    is unchanged are not rewritten and records no longer present are
+    deleted. Returns (written, deleted).
+    """
+    if isinstance(data, dict):
+        data = data.items()
+    conn = connect(path)
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        stored = {acad_id: _text_hash(text) for acad_id, text in conn.execute("SELECT id, record FROM academics")}
+        written = 0
+        batch = []
+        for key, record in data:
+            rows = _rows(key, record)
+            if stored.pop(rows[0][0], None) == _text_hash(rows[0][5]):
+                continue
+            batch.append(rows)
+            if len(batch) >= batch_size:
+                _write_rows(conn, batch)
+                written += len(batch)
+                batch = []
+        if batch:
+            _write_rows(conn, batch)
+            written += len(batch)
+        _delete_rows(conn, stored)
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+    return written, len(stored)
+
+
+def delete_records(path, ids):
+    conn = connect(path)
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        _delete_rows(conn, ids)
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+
+def iter_records(path):
+    """Yield (str ID, record) in ID order."""
+    conn = connect(path)
+    try:
+        for acad_id, record in conn.execute("SELECT id, record FROM academics ORDER BY id"):
+            yield str(acad_id), json.loads(record)
+    finally:
+        conn.close()
+
+
+def load_records(path):
+    return dict(iter_records(path))
+
+
+def get_record(path, acad_id):
+    conn = connect(path)
+    row = conn.execute("SELECT record FROM academics WHERE id = ?", (int(acad_id),)).fetchone()
+    conn.close()
+    return json.loads(row[0]) if row else None
+
+
+# -----------------------------------------------------------
+# Indexed queries
+# -----------------------------------------------------------
+def record_ids(path):
+    """Set of stringified IDs, the same keys the JSON files use."""
+    conn = connect(path)
+    ids = {str(row[0]) for row in conn.execute("SELECT id FROM academics")}
+    conn.close()
+    return ids
+
+
+def coverage(path):
+    """(min ID, max ID, number of records); IDs are None for an empty database."""
+    conn = connect(path)
+    row = conn.execute("SELECT MIN(id), MAX(id), COUNT(*) FROM academics").fetchone()
+    conn.close()
+    return row
+
+
+def gap_ranges(path):
+    """Missing ID ranges between the lowest and highest ID, as (start, end) pairs."""
+    conn = connect(path)
+    gaps = conn.execute(
+        "SELECT prev + 1, id - 1 FROM "
+        "(SELECT id, LAG(id) OVER (ORDER BY id) AS prev FROM academics) "
+        "WHERE id - prev > 1 ORDER BY id").fetchall()
+    conn.close()
+    return gaps
+
+
+def ids_by_school(path, school, year_from=None, year_to=None):
+    sql = "SELECT DISTINCT id FROM academic_schools WHERE school = ?"
+    params = [school]
+    if year_from is not None:
+        sql += " AND year >= ?"
+        params.append(year_from)
+    if year_to is not None:
+        sql += " AND year <= ?"
+        params.append(year_to)
+    conn = connect(path)
+    ids = [row[0] for row in conn.execute(sql + " ORDER BY id", params)]
+    conn.close()
+    return ids
+
+
+def student_ids(path, advisor_id):
+    conn = connect(path)
+    ids = [row[0] for row in conn.execute(
+        "SELECT DISTINCT id FROM academic_advisors WHERE advisor_id = ? ORDER BY id", (advisor_id,))]
+    conn.close()
+    return ids
+
+
+def counts_by_year(path):
+    conn = connect(path)
+    counts = dict(conn.execute(
+        "SELECT year, COUNT(*) FROM academics WHERE year IS NOT NULL GROUP BY year ORDER BY year"))
+    conn.close()
+    return counts
+
+
+def counts_by_country(path):
+    conn = connect(path)
+    counts = dict(conn.execute(
+        "SELECT country, COUNT(DISTINCT id) FROM academic_schools WHERE country IS NOT NULL "
+        "GROUP BY country ORDER BY 2 DESC"))
+    conn.close()
+    return counts
+
+
+def import_file(source_file, db_path):
+    """Bulk-load any records file (.json, .json.zst) into a database."""
+    print(f"Importing {os.path.basename(source_file)} into {os.path.basename(db_path)}...")
+    start = time.perf_counter()
+    with profiling.stage("import"):
+        written, deleted = write_records(record_store.iter_records(source_file), db_path)
+    elapsed = time.perf_counter() - start
+    total = coverage(db_path)[2]
+    print(f"✓ {total:,} records in {elapsed:.1f}s ({written:,} written, {deleted:,} removed, "
+          f"{written / elapsed if elapsed else 0:,.0f} records/s)")
+    print(f"Database size: {os.path.getsize(db_path) / (1024 * 1024):.2f} MB")
+
+
+def print_stats(db_path):
+    min_id, max_id, count = coverage(db_path)
+    if not count:
+        print("Database is empty")
+        return
+    gaps = gap_ranges(db_path)
+    print(f"Records: {count:,} (IDs {min_id:,} to {max_id:,})")
+    print(f"Coverage: {100 * count / (max_id - min_id + 1):.2f}% with {len(gaps):,} gaps")
+    top = list(counts_by_country(db_path).items())[:10]
+    if top:
+        print("Top countries: " + ", ".join(f"{c} ({n:,})" for c, n in top))
+
+
+if __name__ == '__main__':
+    profiling.from_argv("sqlite_store")
+    if len(sys.argv) >= 4 and sys.argv[1] == "import":
+        import_file(sys.argv[2], sys.argv[3])
+    elif len(sys.argv) >= 3 and sys.argv[1] == "stats":
+        print_stats(sys.argv[2])
+    else:
+        print(__doc__)
+        sys.exit(1)
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Generate a synthetic MGP dataset shaped like the cached API records.
+
+Records are keyed by stringified ID and wrap an "MGP_academic" object with
+names, MSC code, degrees (schools, year, country, thesis, advisors) and the
+list of advisees, exactly like the files written by cache_mgp.py.
+
+Which IDs exist follows the 404 density recorded in the ids_not_found*.json
+files, so gap analysis and crawls see realistic holes.
+"""
+
+import json
+import os
+import glob
+import random
+
+RAW_CACHE_DIR = os.path.join(os.path.dirname(__file__), "..", "data", "raw", "mgp_cache")
+COORDS_FILE = os.path.join(os.path.dirname(__file__), "..", "data", "raw", "university",
+                           "university_coordinates_partial.json")
+
+BUCKET_SIZE = 1000
+DEFAULT_NOT_FOUND_RATE = 0.02
+
+GIVEN_NAMES = [
+    "Carl", "Emmy", "David", "Sophie", "Leonhard", "Ada", "Henri", "Maria", "John",
+    "Olga", "Srinivasa", "Mary", "Kurt", "Grace", "Alan", "Sofia", "Paul", "Julia",
+    "Andrey", "Hermann", "Wei", "Yuki", "Ahmed", "Lucia", "Pierre", "Ingrid",
+]
+FAMILY_NAMES = [
+    "Gauss", "Noether", "Hilbert", "Germain", "Euler", "Lovelace", "Poincare",
+    "Agnesi", "Neumann", "Ladyzhenskaya", "Ramanujan", "Cartwright", "Goedel",
+    "Hopper", "Turing", "Kovalevskaya", "Erdos", "Robinson", "Kolmogorov", "Weyl",
+    "Chen", "Tanaka", "Hassan", "Rossi", "Dupont", "Larsen", "Keller", "Smith",
+]
+DEGREE_TYPES = ["Ph.D.", "Dr. rer. nat.", "Dr. phil.", "D.Sc.", "M.Sc."]
+MSC_CODES = ["05", "11", "14", "20", "35", "46", "53", "60", "62", "68", "81", "90"]
+THESIS_WORDS = [
+    "On", "the", "theory", "of", "linear", "operators", "algebraic", "varieties",
+    "stochastic", "processes", "boundary", "value", "problems", "finite", "groups",
+    "and", "applications", "to", "number", "fields", "spectral", "analysis",
+]
+FALLBACK_SCHOOLS = [
+    "Massachusetts Institute of Technology, United States",
+    "Universiteit van Amsterdam, Netherlands",
+    "Georg-August-Universität Göttingen, Germany",
+    "University of Cambridge, United Kingdom",
+]
+
+
+def load_not_found_ids(cache_dir=RAW_CACHE_DIR):
+    """
+    Load every ids_not_found*.json file and return (sorted IDs, covered ranges).
+
+    Each file covers the span between its smallest and largest ID, which is
+    how the files were produced by download_missing_ids.py.
+    """
+    not_found = []
+    ranges = []
+
+    for path in sorted(glob.glob(os.path.join(cache_dir, "ids_not_found*.json"))):
+        with open(path, 'r') as f:
+            ids = json.load(f)
+        if ids:
+            not_found.extend(ids)
+            ranges.append((min(ids), max(ids)))
+
+    return sorted(set(not_found)), ranges
+
+
+def not_found_density(cache_dir=RAW_CACHE_DIR, bucket_size=BUCKET_SIZE):
+    """
+    Estimate the fraction of missing IDs per bucket of bucket_size IDs.
+
+    Returns a dict of bucket index -> 404 rate for buckets inside a range
+    that was actually crawled.
+    """
+    not_found, ranges = load_not_found_ids(cache_dir)
+    counts = {}
+    for acad_id in not_found:
+        bucket = acad_id // bucket_size
+        counts[bucket] = counts.get(bucket, 0) + 1
+
+    density = {}
+    for start, end in ranges:
+        for bucket in range(start // bucket_size, end // bucket_size + 1):
+            density[bucket] = counts.get(bucket, 0) / bucket_size
+    return density
+
+
+def load_school_names(coords_file=COORDS_FILE):
+    """Use the geocoded university names so extraction and geocoding look real."""
+    if os.path.exists(coords_file):
+        with open(coords_file, 'r', encoding='utf-8') as f:
+            return list(json.load(f).keys())
+    return list(FALLBACK_SCHOOLS)
+
+
+def generate_dataset(n_records=10000, start_id=1, seed=0, density=None, schools=None):
+    """
+    Generate n_records synthetic academics.
+
+    Args:
+        n_records: Number of records to produce
+        start_id: First candidate ID
+        seed: Random seed (same seed -> same dataset)
+        density: Bucket -> 404 rate dict (default: from ids_not_found*.json)
+        schools: School names to draw from (default: geocoded universities)
+
+    Returns a dict keyed by stringified ID, like all_academics.json.
+    """
+    rng = random.Random(seed)
+    if density is None:
+        density = not_found_density()
+    if schools is None:
+        schools = load_school_names()
+
+    # A few very popular schools, long tail for the rest
+    school_weights = [1.0 / (rank + 1) for rank in range(len(schools))]
+
+    data = {}
+    by_year = []  # (year, id) of generated academics, used to pick advisors
+    acad_id = start_id
+
+    while len(data) < n_records:
+        rate = density.get(acad_id // BUCKET_SIZE, DEFAULT_NOT_FOUND_RATE)
+        if rng.random() < rate:
+            acad_id += 1
+            continue
+
+        year = int(rng.triangular(1700, 2024, 2000))
+        school = rng.choices(schools, weights=school_weights)[0]
+        country = school.rsplit(",", 1)[-1].strip()
+
+        advisor_list = []
+        if by_year:
+            for _ in range(rng.choice([1, 1, 1, 2])):
+                advisor_year, advisor_id = by_year[rng.randrange(len(by_year))]
+                if advisor_year <= year - 15 and advisor_id not in advisor_list:
+                    advisor_list.append(advisor_id)
+        advisors = {str(slot): advisor_id for slot, advisor_id in enumerate(advisor_list, 1)}
+
+        data[str(acad_id)] = {
+            "MGP_academic": {
+                "ID": acad_id,
+                "given_name": rng.choice(GIVEN_NAMES),
+                "other_names": rng.choice(["", "", "", "Maria", "J."]),
+                "family_name": rng.choice(FAMILY_NAMES),
+                "MSC": rng.choice(MSC_CODES),
+                "student_data": {
+                    "degrees": [
+                        {
+                            "degree_type": rng.choice(DEGREE_TYPES),
+                            "schools": [school],
+                            "degree_year": str(year),
+                            "country": [country],
+                            "thesis_title": " ".join(rng.choices(THESIS_WORDS, k=rng.randint(4, 14))),
+                            "advised by": advisors,
+                        }
+                    ],
+                    "descendants": {
+                        "advisees": [],
+                        "descendant_count": 0,
+                    },
+                },
+            }
+        }
+
+        for advisor_id in advisors.values():
+            advisor = data[str(advisor_id)]["MGP_academic"]["student_data"]["descendants"]
+            advisor["advisees"].append(acad_id)
+            advisor["descendant_count"] += 1
+
+        by_year.append((year, acad_id))
+        acad_id += 1
+
+    return data
+
+
+def write_checkpoints(data, output_dir, batch_ids=1000):
+    """
+    Split a dataset into checkpoint_<stop>.json files, mimicking cache_mgp.py.
+
+    Like the real crawler, each checkpoint holds everything fetched so far,
+    so consecutive files overlap heavily.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    ids = sorted(int(acad_id) for acad_id in data)
+    if not ids:
+        return []
+
+    written = []
+    accumulated = {}
+    next_stop = ids[0] + batch_ids
+    for acad_id in ids:
+        if acad_id >= next_stop:
+            path = os.path.join(output_dir, f"checkpoint_{next_stop}.json")
+            with open(path, 'w') as f:
+                json.dump(accumulated, f, indent=2)
+            written.append(path)
+            next_stop += batch_ids * ((acad_id - next_stop) // batch_ids + 1)
+        accumulated[str(acad_id)] = data[str(acad_id)]
+
+    path = os.path.join(output_dir, f"checkpoint_{ids[-1] + 1}.json")
+    with open(path, 'w') as f:
+        json.dump(accumulated, f, indent=2)
+    written.append(path)
+    return written
+
+
+if __name__ == '__main__':
+    dataset = generate_dataset(n_records=10000, start_id=1, seed=0)
+    os.makedirs("mgp_cache", exist_ok=True)
+    with open("mgp_cache/synthetic_academics.json", 'w') as f:
+        json.dump(dataset, f, indent=2)
+    print(f"Generated {len(dataset):,} synthetic academics")
@@ -1,8 +1,11 @@
 #!/usr/bin/env python3
 
-import json
 import os
 
+import profiling
+import record_store
+import sqlite_store
+
 def transfer_new_records(
     source_file="mgp_cache/all_academics_merged.json",
     target_file="mgp_cache/all_academics_checkpoints.json"
@@ -25,19 +28,24 @@ def transfer_new_records(
     
     # Load source file (all_academics_merged.json)
     print(f"Loading {os.path.basename(source_file)}...")
-    with open(source_file, 'r') as f:
-        merged_data = json.load(f)
+    with profiling.stage("load"):
+        merged_data = record_store.load_records(source_file)
     
     merged_ids = set(merged_data.keys())
     print(f"  ✓ Loaded {len(merged_data):,} records")
     
     # Load target file (all_academics_checkpoints.json)
     print(f"Loading {os.path.basename(target_file)}...")
-    with open(target_file, 'r') as f:
-        checkpoints_data = json.load(f)
-    
-    checkpoints_ids = set(checkpoints_data.keys())
-    print(f"  ✓ Loaded {len(checkpoints_data):,} records\n")
+    target_is_db = record_store.is_sqlite(target_file)
+    with profiling.stage("load"):
+        if target_is_db:
+            # Only the IDs are needed; new records are inserted in place
+            checkpoints_data = None
+            checkpoints_ids = sqlite_store.record_ids(target_file)
+        else:
+            checkpoints_data = record_store.load_records(target_file)
+            checkpoints_ids = set(checkpoints_data.keys())
+    print(f"  ✓ Loaded {len(checkpoints_ids):,} records\n")
     
     # Find new IDs (in merged but not in checkpoints)
     new_ids = merged_ids - checkpoints_ids
@@ -51,24 +59,31 @@ def transfer_new_records(
     
     # Add new records to checkpoints
     print("Transferring new records...")
-    for acad_id in new_ids:
-        checkpoints_data[acad_id] = merged_data[acad_id]
-    
-    # Save updated checkpoints file
-    print(f"Saving updated {os.path.basename(target_file)}...")
-    with open(target_file, 'w') as f:
-        json.dump(checkpoints_data, f, indent=2)
+    if target_is_db:
+        with profiling.stage("dump"):
+            sqlite_store.upsert_records(target_file, ((acad_id, merged_data[acad_id]) for acad_id in new_ids))
+        min_id, max_id, total = sqlite_store.coverage(target_file)
+    else:
+        for acad_id in new_ids:
+            checkpoints_data[acad_id] = merged_data[acad_id]
+        
+        # Save updated checkpoints file
+        print(f"Saving updated {os.path.basename(target_file)}...")
+        with profiling.stage("dump"):
+            record_store.write_records(checkpoints_data, target_file)
+        
+        all_ids = [int(id) for id in checkpoints_data.keys()]
+        min_id, max_id, total = min(all_ids), max(all_ids), len(all_ids)
     
     file_size = os.path.getsize(target_file) / (1024 * 1024)
     
     print(f"\n=== Transfer Complete ===")
-    print(f"Total records in checkpoints file: {len(checkpoints_data):,}")
+    print(f"Total records in checkpoints file: {total:,}")
     print(f"New records added: {len(new_ids):,}")
     print(f"File size: {file_size:.2f} MB")
     
     # Show ID range
-    all_ids = sorted([int(id) for id in checkpoints_data.keys()])
-    print(f"ID range: {min(all_ids):,} to {max(all_ids):,}")
+    print(f"ID range: {min_id:,} to {max_id:,}")
     
     # Show what was added
     new_ids_sorted = sorted([int(id) for id in new_ids])
@@ -77,6 +92,7 @@ def transfer_new_records(
     print(f"\n✓ Successfully updated {target_file}")
 
 if __name__ == '__main__':
+    profiling.from_argv("transfer_new_records")
     transfer_new_records(
         source_file="mgp_cache/all_academics_merged.json",
         target_file="mgp_cache/all_academics_checkpoints.json"
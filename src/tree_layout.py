@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Offline family-tree layouts for the largest lineages.
+
+A lineage is everything reachable through students from a root academic
+(one with no known advisor). It is turned into a tree by a breadth-first
+walk: an academic with several advisors in the lineage hangs under the one
+that reaches them in the fewest generations. Two layouts are computed with
+NumPy, one level at a time:
+
+    layered   x = centre of the node's span of leaves, y = generation
+    radial    the same leaf spans as angles around the root, radius = generation
+
+Each lineage is written as one little-endian binary file the browser can
+slice into typed arrays without parsing:
+
+    int32   ids[n]        academic IDs, in breadth-first order
+    int32   parents[n]    index of the parent in ids (-1 for the root)
+    float32 layered[n*2]  x, y pairs
+    float32 radial[n*2]   x, y pairs
+
+index.json lists every file with its node count, byte offsets and a
+fingerprint of the tree's structure. On the next run a lineage whose
+fingerprint is unchanged keeps its file; only changed lineages are laid out
+and written again.
+
+Usage: python tree_layout.py all_academics_merged_complete.json [layouts] [top_n]
+"""
+
+import hashlib
+import json
+import os
+import sys
+from collections import deque
+
+import numpy as np
+
+import profiling
+from genealogy_graph import GenealogyGraph
+
+TOP_N = 50
+LAYOUT_VERSION = 1     # bump when the layout maths change, to force a rewrite
+INDEX_FILE = "index.json"
+
+
+def lineage_roots(graph, top_n=TOP_N):
+    """[(root ID, descendant count)] of the top_n largest lineages."""
+    roots = [i for i, advisors in graph.advisors.items() if not any(a in graph for a in advisors)]
+    sizes = []
+    for root in roots:
+        if not graph.students.get(root):
+            continue
+        metrics = graph.metrics.get(root) if graph.metrics is not None else None
+        sizes.append((root, (metrics or graph.node_metrics(root))[0]))
+    sizes.sort(key=lambda item: (-item[1], item[0]))
+    return sizes[:top_n]
+
+
+def lineage_tree(graph, root):
+    """Breadth-first spanning tree of a lineage: (ids, parents, depths) arrays."""
+    ids, parents, depths = [root], [-1], [0]
+    index = {root: 0}
+    queue = deque([0])
+    while queue:
+        i = queue.popleft()
+        for student in sorted(graph.students.get(ids[i], ())):
+            if student in index:
+                continue
+            index[student] = len(ids)
+            ids.append(student)
+            parents.append(i)
+            depths.append(depths[i] + 1)
+            queue.append(index[student])
+    return (np.array(ids, dtype=np.int32), np.array(parents, dtype=np.int32),
+            np.array(depths, dtype=np.int32))
+
+
+def fingerprint(ids, parents):
+    h = hashlib.blake2b(digest_size=16)
+    h.update(str(LAYOUT_VERSION).encode())
+    h.update(ids.tobytes())
+    h.update(parents.tobytes())
+    return h.hexdigest()
+
+
+def layered_layout(parents, depths):
+    """
+    (x, width) for a tree in breadth-first order: width is the number of
+    leaves under each node and x the centre of its span of leaves.
+    """
+    n = len(parents)
+    levels = np.searchsorted(depths, np.arange(depths[-1] + 2))
+    has_children = np.bincount(parents[1:], minlength=n) > 0
+    width = np.where(has_children, 0.0, 1.0)
+    # Leaf counts, bottom level up
+    for d in range(depths[-1], 0, -1):
+        lo, hi = levels[d], levels[d + 1]
+        np.add.at(width, parents[lo:hi], width[lo:hi])
+
+    # Each child's span starts where its earlier siblings' spans end
+    start = np.zeros(n)
+    for d in range(1, depths[-1] + 1):
+        lo, hi = levels[d], levels[d + 1]
+        level_parents = parents[lo:hi]
+        before = np.cumsum(width[lo:hi]) - width[lo:hi]
+        first = np.r_[True, level_parents[1:] != level_parents[:-1]]
+        group = np.cumsum(first) - 1
+        start[lo:hi] = start[level_parents] + before - before[first][group]
+    return start + width / 2, width
+
+
+def layouts(parents, depths):
+    """(layered, radial) float32 arrays of x, y pairs."""
+    x, width = layered_layout(parents, depths)
+    layered = np.column_stack([x, depths]).astype(np.float32)
+    angle = 2 * np.pi * x / width[0]
+    radial = np.column_stack([depths * np.cos(angle), depths * np.sin(angle)]).astype(np.float32)
+    return layered, radial
+
+
+def write_lineage(path, ids, parents, layered, radial):
+    """Write the binary arrays; returns their {name: [byte offset, dtype, length]}."""
+    arrays = [("ids", ids.astype('<i4')), ("parents", parents.astype('<i4')),
+              ("layered", layered.astype('<f4').ravel()), ("radial", radial.astype('<f4').ravel())]
+    layout, offset = {}, 0
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        for name, array in arrays:
+            f.write(array.tobytes())
+            layout[name] = [offset, array.dtype.str.lstrip('<'), len(array)]
+            offset += array.nbytes
+    os.replace(tmp_path, path)
+    return layout
+
+
+def export_layouts(graph, output_dir="layouts", top_n=TOP_N):
+    """Lay out the top_n lineages into output_dir, rewriting only changed ones."""
+    os.makedirs(output_dir, exist_ok=True)
+    index_path = os.path.join(output_dir, INDEX_FILE)
+    previous = {}
+    if os.path.exists(index_path):
+        with open(index_path, 'r') as f:
+            previous = json.load(f).get("lineages", {})
+
+    lineages = {}
+    written = 0
+    for root, size in lineage_roots(graph, top_n):
+        ids, parents, depths = lineage_tree(graph, root)
+        fp = fingerprint(ids, parents)
+        file_name = f"{root}.bin"
+        old = previous.get(str(root))
+        if old and old["fingerprint"] == fp and os.path.exists(os.path.join(output_dir, file_name)):
+            lineages[str(root)] = old
+            continue
+        with profiling.stage("layout"):
+            layered, radial = layouts(parents, depths)
+        arrays = write_lineage(os.path.join(output_dir, file_name), ids, parents, layered, radial)
+        name, year = graph.info.get(root, ("", None))
+        lineages[str(root)] = {"file": file_name, "name": name, "year": year, "nodes": len(ids),
+                               "descendants": size, "generations": int(depths[-1]),
+                               "fingerprint": fp, "arrays": arrays}
+        written += 1
+
+    # Lineages that fell out of the top N
+    for key, old in previous.items():
+        if key not in lineages:
+            stale = os.path.join(output_dir, old["file"])
+            if os.path.exists(stale):
+                os.remove(stale)
+
+    with open(index_path, 'w') as f:
+        json.dump({"version": LAYOUT_VERSION, "lineages": lineages}, f, separators=(',', ':'))
+    print(f"✓ {len(lineages)} lineages in {output_dir}/: {written} laid out, "
+          f"{len(lineages) - written} unchanged")
+    return lineages
+
+
+if __name__ == '__main__':
+    profiling.from_argv("tree_layout")
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    print(f"Loading {os.path.basename(sys.argv[1])}...")
+    with profiling.stage("load"):
+        genealogy = GenealogyGraph.from_file(sys.argv[1])
+    export_layouts(genealogy,
+                   sys.argv[2] if len(sys.argv) > 2 else "layouts",
+                   int(sys.argv[3]) if len(sys.argv) > 3 else TOP_N)